@@ -1,29 +1,40 @@
-from flask import Flask, request, jsonify
-import joblib
+from flask import Flask, Response, g, request, jsonify
 import numpy as np
 from utils import (
     get_product_by_barcode,
     extract_product_details,
-    compute_features,
-    get_model_metadata
+    fetch_product_details,
+    get_cache_stats,
+    metrics,
+    product_features,
+    product_index
 )
+from features import FeatureSpec, load_feature_order, product_values, user_values
+from health import CanaryMonitor
+from logging_setup import REQUEST_LOGGER, configure_logging
+from metrics import StageTimer
+from model_registry import ModelRegistry, METADATA_FILENAME
+from product_features import CATEGORY_CACHE_BYTES, CatalogFeatures
+from profiles import ProfileExistsError, ProfileStore, UnknownUserError
+from ranking import rank_products
+from score_cache import ScoreCache
+import csv
+import hmac
+import itertools
 import os
 import logging
+import threading
+import time
 from datetime import datetime
 
 # --- ADD THIS: CORS ---
 from flask_cors import CORS
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('nutriscore.log'),
-        logging.StreamHandler()
-    ]
-)
+# Configure logging (see logging_setup for the NUTRISCORE_LOG_* options)
+configure_logging()
 logger = logging.getLogger(__name__)
+# Per-request info lines, sampled by NUTRISCORE_LOG_SAMPLE_RATE
+request_logger = logging.getLogger(REQUEST_LOGGER)
 
 app = Flask(__name__)
 CORS(app)  # <-- Enable CORS for all routes
@@ -31,78 +42,420 @@ CORS(app)  # <-- Enable CORS for all routes
 # Get the root directory of the project
 root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
+# Inference engine: "auto" memory-maps the packaged model artifact when it
+# exists and otherwise unpickles the sklearn model, "flat" always uses the
+# array predictor (identical results), "sklearn" always uses the pickle
+INFERENCE_ENGINE = os.environ.get("NUTRISCORE_INFERENCE", "auto").lower()
+if INFERENCE_ENGINE not in ("auto", "flat", "sklearn"):
+    raise SystemExit(f"Unknown inference engine: {INFERENCE_ENGINE}")
+
+model_path = os.environ.get("NUTRISCORE_MODEL_PATH",
+                            os.path.join(root_dir, "model/health_score_model.pkl"))
+artifact_path = os.environ.get("NUTRISCORE_MODEL_ARTIFACT",
+                               os.path.join(root_dir, "model/health_score_model"))
+metadata_path = os.environ.get("NUTRISCORE_MODEL_METADATA",
+                               os.path.join(os.path.dirname(model_path), METADATA_FILENAME))
+
+# Feature order saved with the model; every model input row is built in it
+feature_spec = FeatureSpec(load_feature_order(os.path.join(os.path.dirname(model_path), "feature_names.pkl")))
+FEATURE_ORDER = feature_spec.names
+
+# Labelled feature rows every reloaded model is validated against
+canary_path = os.environ.get("NUTRISCORE_CANARY_PATH",
+                             os.path.join(root_dir, "data/test_dataset.csv"))
+CANARY_ROWS = 256
+CANARY_MAX_MAE = os.environ.get("NUTRISCORE_CANARY_MAX_MAE")
+
+# Maximum number of (user, barcode) pairs accepted by /predict/batch
+MAX_BATCH_SIZE = 500
+
+# Largest top-k returned by /rank, and products scored per model call
+MAX_RANK_K = 100
+RANK_CHUNK_SIZE = int(os.environ.get("NUTRISCORE_RANK_CHUNK_SIZE", 10000))
+RANK_CATEGORY_CACHE_BYTES = int(os.environ.get("NUTRISCORE_RANK_CATEGORY_CACHE_BYTES", CATEGORY_CACHE_BYTES))
+
+# Add a Server-Timing header with per-stage timings to every response
+SERVER_TIMING = os.environ.get("NUTRISCORE_SERVER_TIMING", "").lower() in ("1", "true", "yes")
+
+# Admin endpoints require this token in X-Admin-Token and are disabled
+# without one (behind a reverse proxy every client looks local)
+ADMIN_TOKEN = os.environ.get("NUTRISCORE_ADMIN_TOKEN")
+
+# Dummy user and product used to exercise the model without network access
+SELF_TEST_USER = {
+    "age": 30,
+    "weight": 70,
+    "height": 170,
+    "sugar_level": 90,
+    "diabetes": 0,
+    "hypertension": 0
+}
+SELF_TEST_PRODUCT = {
+    "code": "test",
+    "product_name": "Test Product",
+    "nutriments": {
+        "sugars_100g": 5,
+        "sodium_100g": 0.1
+    }
+}
+
+def load_canary(path, max_rows=CANARY_ROWS):
+    """
+    Feature rows (and health scores, if present) from a dataset CSV, or
+    just the self-test row when the file does not exist.
+    """
+    if not path or not os.path.exists(path):
+        return feature_spec.row(SELF_TEST_USER, extract_product_details(SELF_TEST_PRODUCT)), None
+    with open(path, newline='') as f:
+        records = list(itertools.islice(csv.DictReader(f), max_rows))
+    columns = {name: [float(record[name]) for record in records] for name in FEATURE_ORDER}
+    X = feature_spec.from_columns(columns)
+    y = None
+    if records and "health_score" in records[0]:
+        y = np.array([float(record["health_score"]) for record in records], dtype=np.float64)
+    return X, y
+
 # Load the model with error handling
 try:
-    model_path = os.path.join(root_dir, "model/health_score_model.pkl")
-    model = joblib.load(model_path)
-    logger.info(f"Successfully loaded model from {model_path}")
+    canary_X, canary_y = load_canary(canary_path)
+    model_registry = ModelRegistry(
+        model_path, artifact_path, metadata_path,
+        engine=INFERENCE_ENGINE,
+        feature_order=FEATURE_ORDER,
+        canary_X=canary_X,
+        canary_y=canary_y,
+        max_canary_mae=float(CANARY_MAX_MAE) if CANARY_MAX_MAE else None
+    )
+    model_registry.current = model_registry.load()
+    logger.info(f"Loaded model version {model_registry.current.version} from {model_registry.current.source}")
 except Exception as e:
     logger.error(f"Failed to load model: {str(e)}")
     raise SystemExit(f"Failed to load model: {str(e)}")
 
+try:
+    model_registry.validate(model_registry.current)
+except ValueError as e:
+    logger.error(f"Model failed canary validation: {str(e)}")
+
+# Cache of recent predictions, scoped to the currently loaded model
+score_cache = ScoreCache.from_env(FEATURE_ORDER, model_version=model_registry.current.cache_key)
+model_registry.add_listener(lambda loaded: score_cache.set_model_version(loaded.cache_key))
+
+# Stored user profiles, so clients can send a user_id instead of the profile
+profile_store = ProfileStore.from_env()
+
+# Product-side columns of the offline index for /rank, materialised on
+# first use so workers that never rank do not pay for them
+_catalog = None
+_catalog_lock = threading.Lock()
+
+def get_catalog():
+    """Get the CatalogFeatures of the offline product index"""
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            start_time = time.perf_counter()
+            _catalog = CatalogFeatures.from_index(product_index, RANK_CHUNK_SIZE,
+                                                  category_cache_bytes=RANK_CATEGORY_CACHE_BYTES)
+            logger.info(f"Materialised features of {len(_catalog)} indexed products "
+                        f"in {time.perf_counter() - start_time:.2f}s ({_catalog.nbytes / 2**20:.1f} MiB)")
+        return _catalog
+
+metrics.describe("nutriscore_requests_total", "counter", "HTTP requests by endpoint, method and status")
+metrics.describe("nutriscore_request_duration_seconds", "summary", "Request latency by endpoint")
+metrics.describe("nutriscore_stage_duration_seconds", "summary", "Latency of each request stage by endpoint")
+metrics.describe("nutriscore_rank_products_scanned_total", "counter", "Products scored by /rank")
+
+def collect_cache_metrics():
+    """Product cache, score cache, upstream and model state for /metrics."""
+    products = get_cache_stats()
+    scores = score_cache.stats()
+    profiles = profile_store.stats()
+    return [
+        ("nutriscore_product_cache_lookups_total", "counter", "Product cache lookups by result", [
+            ({"result": "hit"}, products["hits"]),
+            ({"result": "negative_hit"}, products["negative_hits"]),
+            ({"result": "miss"}, products["misses"])
+        ]),
+        ("nutriscore_product_cache_disk_hits_total", "counter", "Product cache hits served from disk",
+         [({}, products["disk_hits"])]),
+        ("nutriscore_product_cache_evictions_total", "counter", "Products evicted from the memory cache",
+         [({}, products["evictions"])]),
+        ("nutriscore_product_cache_expirations_total", "counter", "Cached products dropped after their TTL",
+         [({}, products["expirations"])]),
+        ("nutriscore_product_cache_size", "gauge", "Products in the memory cache",
+         [({}, products["size"])]),
+        ("nutriscore_upstream_fetches_total", "counter",
+         "Open Food Facts lookups, executed or coalesced with an identical in-flight lookup", [
+             ({"mode": "executed"}, products["upstream"]["executed"]),
+             ({"mode": "coalesced"}, products["upstream"]["coalesced"])
+         ]),
+        ("nutriscore_score_cache_lookups_total", "counter", "Score cache lookups by result", [
+            ({"result": "hit"}, scores["hits"]),
+            ({"result": "miss"}, scores["misses"])
+        ]),
+        ("nutriscore_score_cache_evictions_total", "counter", "Scores evicted from the score cache",
+         [({}, scores["evictions"])]),
+        ("nutriscore_score_cache_invalidations_total", "counter", "Score cache flushes after a model change",
+         [({}, scores["invalidations"])]),
+        ("nutriscore_score_cache_size", "gauge", "Scores in the score cache",
+         [({}, scores["size"])]),
+        ("nutriscore_profile_cache_lookups_total", "counter", "User profile cache lookups by result", [
+            ({"result": "hit"}, profiles["hits"]),
+            ({"result": "miss"}, profiles["misses"])
+        ]),
+        ("nutriscore_product_features_lookups_total", "counter",
+         "Stored product feature lookups by result", [
+             ({"result": "hit"}, products["product_features"]["hits"]),
+             ({"result": "miss"}, products["product_features"]["misses"])
+         ]),
+        ("nutriscore_product_features_size", "gauge", "Products with stored product-side features",
+         [({}, products["product_features"]["size"])]),
+        ("nutriscore_model_info", "gauge", "Model currently serving predictions",
+         [({"version": model_registry.current.version}, 1)])
+    ]
+
+metrics.add_collector(collect_cache_metrics)
+
+def run_self_test():
+    """Score the dummy user and product with the current model."""
+    test_vector = feature_spec.row(SELF_TEST_USER, extract_product_details(SELF_TEST_PRODUCT))
+    score = model_registry.current.predict(test_vector)[0]
+    if not 0 <= score <= 100:
+        raise ValueError(f"Self-test score out of range: {score}")
+
+# Readiness comes from this self-test, re-run after every model swap and
+# periodically in the background
+health_monitor = CanaryMonitor.from_env(run_self_test)
+startup_check = health_monitor.self_test()
+if startup_check["status"] == "passed":
+    logger.info(f"Start-up self-test passed in {startup_check['latency_ms']:.2f} ms")
+else:
+    logger.error(f"Start-up self-test failed: {startup_check['error']}")
+
+def self_test_swapped_model(loaded):
+    """Re-run the self-test after a swap; a failure rolls the swap back."""
+    result = health_monitor.self_test()
+    if result["status"] != "passed":
+        raise ValueError(result["error"])
+
+model_registry.self_test = self_test_swapped_model
+
+def warm_up(rounds=3):
+    """
+    Run a few single-row and batch predictions so the first real request
+    does not pay one-off initialisation costs. Production workers call
+    this before accepting traffic.
+    """
+    row = feature_spec.row(SELF_TEST_USER, extract_product_details(SELF_TEST_PRODUCT))
+    batch = np.repeat(row, 64, axis=0)
+    model = model_registry.current.model
+    for _ in range(rounds):
+        model.predict(row)
+        model.predict(batch)
+    logger.info(f"Model warm-up completed in process {os.getpid()}")
+
+@app.before_request
+def start_request_timer():
+    g.timer = StageTimer()
+
+@app.after_request
+def record_request_metrics(response):
+    """Record request and stage latencies, and add the Server-Timing header if enabled."""
+    timer = g.get("timer")
+    if timer is None:
+        return response
+    total = timer.elapsed()
+    endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+    metrics.inc("nutriscore_requests_total", endpoint=endpoint, method=request.method,
+                status=response.status_code)
+    metrics.observe("nutriscore_request_duration_seconds", total, endpoint=endpoint)
+    for stage, seconds in timer.stages.items():
+        metrics.observe("nutriscore_stage_duration_seconds", seconds, endpoint=endpoint, stage=stage)
+    if SERVER_TIMING:
+        response.headers["Server-Timing"] = timer.server_timing(total)
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Request, stage, cache and upstream metrics in the Prometheus text format"""
+    return Response(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
 # Add model version endpoint
 @app.route('/model/version', methods=['GET'])
 def get_model_version():
     """Get current model version and metadata"""
-    return jsonify(get_model_metadata())
+    active = model_registry.current
+    return jsonify(dict(active.metadata, loaded_at=active.loaded_at))
+
+def is_admin_request():
+    """Admin requests need the configured token; none are accepted if it is unset."""
+    if not ADMIN_TOKEN:
+        return False
+    return hmac.compare_digest(request.headers.get("X-Admin-Token", ""), ADMIN_TOKEN)
+
+@app.route('/admin/model/reload', methods=['GET', 'POST'])
+def reload_model():
+    """
+    Load the model on disk in the background, validate it on the canary
+    set and swap it in. POST with ?wait=1 blocks until the reload has
+    finished; GET reports the outcome of the last reload.
+    """
+    if not is_admin_request():
+        return jsonify({"error": "Forbidden"}), 403
+
+    active = model_registry.current
+    if request.method == 'GET':
+        return jsonify({
+            "model_version": active.version,
+            "loaded_at": active.loaded_at,
+            "last_reload": model_registry.last_reload
+        })
+
+    wait = request.args.get("wait", "").lower() in ("1", "true", "yes")
+    logger.info(f"Model reload requested (current version {active.version})")
+    status = model_registry.reload(wait=wait, timeout=120)
+    if not wait or model_registry.reloading:
+        return jsonify({"status": "started", "model_version": active.version}), 202
+    return jsonify(status), 200 if status["status"] == "succeeded" else 422
+
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    """Get product and score cache hit/miss/eviction counters"""
+    stats = get_cache_stats()
+    stats["scores"] = score_cache.stats()
+    stats["profiles"] = profile_store.stats()
+    return jsonify(stats)
+
+def user_reference(data, default=None):
+    """
+    The user a request or batch item is for: a profile dict, or a stored
+    user ID as a string.
+    """
+    user = data.get("user")
+    # Only user_id may name a stored profile; a string "user" is not an ID
+    if user is not None and not isinstance(user, dict):
+        raise ValueError("'user' must be an object")
+    user_id = data.get("user_id")
+    if user_id is None:
+        return user or default
+    if user:
+        raise ValueError("Provide either 'user' or 'user_id', not both")
+    if not isinstance(user_id, (str, int)) or isinstance(user_id, bool):
+        raise ValueError("'user_id' must be a string")
+    return str(user_id)
+
+def resolve_user(user):
+    """
+    Validated user-side feature values for a profile dict, or for a
+    stored user ID (precomputed when the profile was saved).
+    """
+    if not user:
+        raise ValueError("'user' data is required")
+    if isinstance(user, str):
+        stored = profile_store.get(user)
+        if stored is None:
+            raise UnknownUserError(f"Unknown user_id: {user}")
+        return stored["values"]
+    return user_values(user)
+
+def profile_response(stored):
+    return {
+        "user_id": stored["user_id"],
+        "profile": stored["profile"],
+        "updated_at": datetime.fromtimestamp(stored["updated_at"]).isoformat()
+    }
+
+@app.route('/users', methods=['POST'])
+def create_user():
+    """Store a user profile; the body may include a user_id, otherwise one is generated"""
+    try:
+        data = request.get_json(force=True)
+        if not isinstance(data, dict):
+            raise ValueError("Request body must be a JSON object")
+        stored = profile_store.create(data, user_id=data.get("user_id"))
+        return jsonify(profile_response(stored)), 201
+    except ProfileExistsError as e:
+        return jsonify({"error": str(e)}), 409
+    except ValueError as e:
+        logger.error(f"Validation error: {str(e)}")
+        return jsonify({"error": str(e)}), 400
+
+@app.route('/users/<user_id>', methods=['GET', 'PUT'])
+def user_profile(user_id):
+    """Get a stored profile, or create or replace it with PUT"""
+    if request.method == 'GET':
+        stored = profile_store.get(user_id)
+        if stored is None:
+            return jsonify({"error": f"Unknown user_id: {user_id}"}), 404
+        return jsonify(profile_response(stored))
+    try:
+        stored = profile_store.put(user_id, request.get_json(force=True))
+        return jsonify(profile_response(stored))
+    except ValueError as e:
+        logger.error(f"Validation error: {str(e)}")
+        return jsonify({"error": str(e)}), 400
 
 @app.route('/predict', methods=['POST'])
 def predict():
     try:
-        start_time = datetime.now()
-        data = request.get_json(force=True)
+        timer = g.timer
+        with timer.stage("parse"):
+            data = request.get_json(force=True)
         
         # Input validation
         if not isinstance(data, dict):
             raise ValueError("Request body must be a JSON object")
             
-        user_data = data.get("user")
+        user = user_reference(data)
         barcode = data.get("barcode")
         
-        if not user_data:
-            raise ValueError("'user' data is required")
+        if not user:
+            raise ValueError("'user' or 'user_id' is required")
         if not barcode:
             raise ValueError("'barcode' is required")
+        
+        # Validate the user, or look up a stored profile
+        with timer.stage("user"):
+            user = resolve_user(user)
             
         # Log request
-        logger.info(f"Prediction request received for barcode: {barcode}")
+        request_logger.debug(f"Prediction request received for barcode: {barcode}")
         
-        # Get product details
-        product = get_product_by_barcode(barcode)
+        # Get product details, unless its features are already stored
+        with timer.stage("fetch"):
+            values, stored = product_features.lookup([str(barcode)])
+            product_details = stored[0]
+            if product_details is None:
+                product = get_product_by_barcode(barcode)
         
         # Extract and validate product details
-        product_details = extract_product_details(product)
+        if product_details is None:
+            with timer.stage("extract"):
+                product_details = extract_product_details(product)
+                values[0] = product_features.add(barcode, product_details)
         
-        # Compute features
-        features_dict = compute_features(user_data, product_details)
+        # Compute the feature vector in the model's feature order
+        with timer.stage("features"):
+            feature_vector = feature_spec.empty(1)
+            feature_spec.fill(feature_vector[0], user, values[0])
         
-        # Prepare feature vector
-        feature_vector = np.array([
-            features_dict["age"],
-            features_dict["weight"],
-            features_dict["height"],
-            features_dict["sugar_level"],
-            features_dict["diabetes"],
-            features_dict["hypertension"],
-            features_dict["sugar"],
-            features_dict["sodium"],
-            features_dict["sugar_per_kg"],
-            features_dict["sodium_per_kg"],
-            features_dict["preservative_count"]
-        ]).reshape(1, -1)
-        
-        # Get prediction
-        health_score = model.predict(feature_vector)[0]
+        # Get prediction (served from the score cache when possible)
+        active = model_registry.current
+        with timer.stage("predict"):
+            health_score = score_cache.predict(active.model, feature_vector, version=active.cache_key)[0]
         
         # Log prediction
-        logger.info(f"Prediction completed for barcode {barcode}. Score: {health_score:.2f}")
+        request_logger.info(f"Prediction completed for barcode {barcode}. Score: {health_score:.2f}",
+                            extra={"barcode": barcode, "health_score": float(health_score),
+                                   "duration_ms": timer.elapsed() * 1000})
         
         response = {
             "health_score": float(health_score),
             "product_details": product_details,
-            "computed_features": features_dict,
-            "model_version": get_model_metadata()["version"],
-            "prediction_time_ms": (datetime.now() - start_time).total_seconds() * 1000
+            "computed_features": feature_spec.as_dict(feature_vector[0]),
+            "model_version": active.version,
+            "prediction_time_ms": timer.elapsed() * 1000
         }
         
         return jsonify(response)
@@ -111,6 +464,9 @@ def predict():
         logger.error(f"Validation error: {str(e)}")
         return jsonify({"error": str(e)}), 400
         
+    except UnknownUserError as e:
+        return jsonify({"error": str(e)}), 404
+        
     except ConnectionError as e:
         logger.error(f"Connection error: {str(e)}")
         return jsonify({"error": "Failed to connect to product database"}), 503
@@ -122,60 +478,261 @@ def predict():
             "details": str(e)
         }), 500
 
-@app.route('/health', methods=['GET'])
-def health_check():
-    """Health check endpoint"""
+def parse_batch_items(data):
+    """
+    Normalise a batch request body into a list of (user, barcode) pairs.
+
+    Accepts either one user with many barcodes:
+        {"user": {...}, "barcodes": ["...", "..."]}
+    or explicit pairs, optionally falling back to a top-level user:
+        {"items": [{"user": {...}, "barcode": "..."}, ...]}
+    Any "user" may be replaced by the "user_id" of a stored profile.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Request body must be a JSON object")
+
+    default_user = user_reference(data)
+    barcodes = data.get("barcodes")
+    items = data.get("items")
+
+    if items is None and barcodes is None:
+        raise ValueError("Either 'items' or 'barcodes' is required")
+    if items is not None and barcodes is not None:
+        raise ValueError("Provide either 'items' or 'barcodes', not both")
+
+    if barcodes is not None:
+        if not isinstance(barcodes, list):
+            raise ValueError("'barcodes' must be a list")
+        if not default_user:
+            raise ValueError("'user' or 'user_id' is required")
+        pairs = [(default_user, barcode) for barcode in barcodes]
+    else:
+        if not isinstance(items, list):
+            raise ValueError("'items' must be a list")
+        pairs = []
+        for item in items:
+            if not isinstance(item, dict):
+                item = {"barcode": item}
+            try:
+                user = user_reference(item, default_user)
+            except ValueError as e:
+                # Reported for this item only, like a failed lookup
+                user = e
+            pairs.append((user, item.get("barcode")))
+
+    if not pairs:
+        raise ValueError("Batch must contain at least one item")
+    if len(pairs) > MAX_BATCH_SIZE:
+        raise ValueError(f"Batch size exceeds the maximum of {MAX_BATCH_SIZE} items")
+    return pairs
+
+@app.route('/predict/batch', methods=['POST'])
+def predict_batch():
+    """
+    Score many (user, barcode) pairs with a single model.predict call.
+
+    Each unique barcode is fetched once and lookups run concurrently.
+    Items that fail validation or lookup are reported individually and
+    do not fail the whole batch.
+    """
     try:
-        # Test model prediction with dummy data
-        test_data = {
-            "age": 30,
-            "weight": 70,
-            "height": 170,
-            "sugar_level": 90,
-            "diabetes": 0,
-            "hypertension": 0
-        }
-        test_product = {
-            "code": "test",
-            "product_name": "Test Product",
-            "nutriments": {
-                "sugars_100g": 5,
-                "sodium_100g": 0.1
-            }
-        }
-        
-        test_features = compute_features(test_data, extract_product_details(test_product))
-        test_vector = np.array([
-            test_features["age"],
-            test_features["weight"],
-            test_features["height"],
-            test_features["sugar_level"],
-            test_features["diabetes"],
-            test_features["hypertension"],
-            test_features["sugar"],
-            test_features["sodium"],
-            test_features["sugar_per_kg"],
-            test_features["sodium_per_kg"],
-            test_features["preservative_count"]
-        ]).reshape(1, -1)
-        
-        # Try to get a prediction
-        model.predict(test_vector)
-        
+        timer = g.timer
+        with timer.stage("parse"):
+            data = request.get_json(force=True)
+            pairs = parse_batch_items(data)
+
+        request_logger.debug(f"Batch prediction request received for {len(pairs)} items")
+
+        # Stored product features first, then fetch each remaining unique
+        # barcode once, concurrently
+        with timer.stage("fetch"):
+            barcodes = [str(barcode) if barcode else "" for _, barcode in pairs]
+            values, products = product_features.lookup(barcodes)
+            fetched = fetch_product_details(barcode for barcode, product_details in zip(barcodes, products)
+                                            if barcode and product_details is None)
+        fetched[""] = ValueError("'barcode' is required")
+
+        # Resolve users and products, collecting per-item errors
+        results = [None] * len(pairs)
+        row_items = []
+        users = []
+        # A sentinel, so an item without a user is still resolved (and rejected)
+        last_user, last_values = object(), None
+        with timer.stage("features"):
+            for i, (user_data, barcode) in enumerate(pairs):
+                product_details = products[i]
+                try:
+                    if product_details is None:
+                        product_details = fetched[barcodes[i]]
+                        if isinstance(product_details, Exception):
+                            raise product_details
+                        values[i] = product_values(product_details)
+                    # Items of a {"user", "barcodes"} batch share one user
+                    if isinstance(user_data, Exception):
+                        raise user_data
+                    if user_data is not last_user:
+                        last_values = resolve_user(user_data)
+                        last_user = user_data
+                except ValueError as e:
+                    results[i] = {"barcode": barcode, "error": str(e), "status": 400}
+                    continue
+                except UnknownUserError as e:
+                    results[i] = {"barcode": barcode, "error": str(e), "status": 404}
+                    continue
+                except ConnectionError:
+                    results[i] = {
+                        "barcode": barcode,
+                        "error": "Failed to connect to product database",
+                        "status": 503
+                    }
+                    continue
+                except Exception as e:
+                    # One bad item must not fail the rest of the batch
+                    logger.error(f"Unexpected error for batch item {i}: {str(e)}", exc_info=True)
+                    results[i] = {"barcode": barcode, "error": "An unexpected error occurred", "status": 500}
+                    continue
+                row_items.append((i, barcode, product_details))
+                users.append(last_values)
+
+            # Combine the user columns with the gathered product columns
+            if row_items:
+                X = feature_spec.empty(len(row_items))
+                user_columns = np.array(users, dtype=np.float64).T
+                product_columns = values[[i for i, _, _ in row_items]].T
+                feature_spec.fill_products(X, user_columns, *product_columns)
+
+        # One vectorized prediction over the whole feature matrix
+        active = model_registry.current
+        if row_items:
+            with timer.stage("predict"):
+                scores = score_cache.predict(active.model, X, version=active.cache_key)
+            for (i, barcode, product_details), row, score in zip(row_items, X, scores):
+                results[i] = {
+                    "barcode": barcode,
+                    "health_score": float(score),
+                    "product_details": product_details,
+                    "computed_features": feature_spec.as_dict(row)
+                }
+
+        request_logger.info(f"Batch prediction completed: {len(row_items)} scored, "
+                            f"{len(pairs) - len(row_items)} failed",
+                            extra={"items": len(pairs), "scored": len(row_items),
+                                   "duration_ms": timer.elapsed() * 1000})
+
         return jsonify({
-            "status": "healthy",
-            "model_version": get_model_metadata()["version"],
-            "last_updated": datetime.now().isoformat()
+            "results": results,
+            "count": len(pairs),
+            "succeeded": len(row_items),
+            "failed": len(pairs) - len(row_items),
+            "model_version": active.version,
+            "prediction_time_ms": timer.elapsed() * 1000
         })
-        
+
+    except ValueError as e:
+        logger.error(f"Validation error: {str(e)}")
+        return jsonify({"error": str(e)}), 400
+
     except Exception as e:
-        logger.error(f"Health check failed: {str(e)}", exc_info=True)
+        logger.error(f"Unexpected error: {str(e)}", exc_info=True)
+        return jsonify({
+            "error": "An unexpected error occurred",
+            "details": str(e)
+        }), 500
+
+@app.route('/rank', methods=['POST'])
+def rank():
+    """
+    Rank every product in the offline index for one user and return the
+    k healthiest, optionally within a category or below nutrient limits.
+    """
+    try:
+        timer = g.timer
+        with timer.stage("parse"):
+            data = request.get_json(force=True)
+        if not isinstance(data, dict):
+            raise ValueError("Request body must be a JSON object")
+        if product_index is None:
+            return jsonify({"error": "Ranking requires an offline product index (NUTRISCORE_PRODUCT_INDEX)"}), 503
+
+        try:
+            k = int(data.get("k", 20))
+        except (TypeError, ValueError):
+            raise ValueError("'k' must be an integer")
+        if not 1 <= k <= MAX_RANK_K:
+            raise ValueError(f"'k' must be between 1 and {MAX_RANK_K}")
+        filters = {name: data.get(name) for name in ("category", "max_sugar", "max_sodium")}
+        for name in ("max_sugar", "max_sodium"):
+            if filters[name] is not None and (isinstance(filters[name], bool) or
+                                              not isinstance(filters[name], (int, float))):
+                raise ValueError(f"'{name}' must be a number")
+
+        with timer.stage("user"):
+            user = resolve_user(user_reference(data))
+
+        active = model_registry.current
+        with timer.stage("rank"):
+            ranking = rank_products(get_catalog(), feature_spec, user, active.model, k=k,
+                                    chunk_size=RANK_CHUNK_SIZE, **filters)
+        metrics.inc("nutriscore_rank_products_scanned_total", ranking["scanned"])
+
+        request_logger.info(f"Ranked {ranking['scanned']} products in {ranking['scan_seconds']:.2f}s "
+                            f"({ranking['products_per_second']:,.0f} products/s)",
+                            extra={"scanned": ranking["scanned"], "k": k,
+                                   "duration_ms": timer.elapsed() * 1000})
+
+        return jsonify(dict(ranking, k=k, model_version=active.version,
+                            prediction_time_ms=timer.elapsed() * 1000))
+
+    except ValueError as e:
+        logger.error(f"Validation error: {str(e)}")
+        return jsonify({"error": str(e)}), 400
+
+    except UnknownUserError as e:
+        return jsonify({"error": str(e)}), 404
+
+    except Exception as e:
+        logger.error(f"Unexpected error: {str(e)}", exc_info=True)
+        return jsonify({
+            "error": "An unexpected error occurred",
+            "details": str(e)
+        }), 500
+
+@app.route('/health/live', methods=['GET'])
+def liveness():
+    """Liveness probe: the process is up and serving requests"""
+    return jsonify({"status": "alive"})
+
+@app.route('/health/ready', methods=['GET'])
+def readiness():
+    """
+    Readiness probe based on the self-test and the last background canary
+    prediction; it never runs the model itself.
+    """
+    ready, details = health_monitor.status()
+    return jsonify(dict(details,
+                        status="ready" if ready else "not_ready",
+                        model_version=model_registry.current.version)), 200 if ready else 503
+
+@app.route('/health', methods=['GET'])
+def health_check():
+    """Health check endpoint (same checks as /health/ready)"""
+    ready, details = health_monitor.status()
+    if not ready:
         return jsonify({
             "status": "unhealthy",
-            "error": str(e)
+            "error": details["reason"],
+            "canary": details["canary"]
         }), 500
+    return jsonify({
+        "status": "healthy",
+        "model_version": model_registry.current.version,
+        "last_updated": details["canary"]["checked_at"],
+        "canary": details["canary"]
+    })
 
 if __name__ == '__main__':
+    # kill -HUP <pid> reloads the model without restarting the server
+    model_registry.install_signal_handler()
     try:
         app.run(debug=True, host='0.0.0.0', port=5000)
     except Exception as e:
@@ -0,0 +1,178 @@
+# backend/features.py
+
+import os
+
+import joblib
+import numpy as np
+
+from additives import AdditiveMatcher
+
+# Every feature the backend can compute, in the order the model was
+# originally trained with (and the order used when no order is saved)
+FEATURE_ORDER = [
+    "age", "weight", "height", "sugar_level", "diabetes", "hypertension",
+    "sugar", "sodium", "sugar_per_kg", "sodium_per_kg", "preservative_count"
+]
+
+# Features reported as integers in API responses
+INTEGER_FEATURES = {"diabetes", "hypertension", "preservative_count"}
+
+REQUIRED_USER_FIELDS = ["age", "weight", "height", "sugar_level", "diabetes", "hypertension"]
+
+# Harmful additives counted as preservative_count, compiled once at start-up
+additive_matcher = AdditiveMatcher.from_env()
+
+
+def load_feature_order(path):
+    """Feature order saved next to the model, or FEATURE_ORDER if there is none."""
+    if path and os.path.exists(path):
+        return list(joblib.load(path))
+    return list(FEATURE_ORDER)
+
+
+def user_values(user_data):
+    """
+    Validate user health data.
+
+    Returns:
+        tuple: (age, weight, height, sugar_level, diabetes, hypertension)
+    """
+    if not user_data:
+        raise ValueError("Both user data and product details are required")
+    if not isinstance(user_data, dict):
+        raise ValueError("User data must be an object")
+    missing_fields = [field for field in REQUIRED_USER_FIELDS if field not in user_data]
+    if missing_fields:
+        raise ValueError(f"Missing required user fields: {', '.join(missing_fields)}")
+
+    try:
+        # Convert all numeric values to float
+        age = float(user_data["age"])
+        weight = float(user_data["weight"])
+        height = float(user_data["height"])
+        sugar_level = float(user_data["sugar_level"])
+
+        # Validate ranges
+        if not (0 < age <= 150):
+            raise ValueError("Invalid age value")
+        if not (20 <= weight <= 500):
+            raise ValueError("Invalid weight value")
+        if not (50 <= height <= 250):
+            raise ValueError("Invalid height value")
+
+    except (ValueError, TypeError):
+        raise ValueError("Invalid numerical values in user data")
+
+    return (age, weight, height, sugar_level,
+            int(bool(user_data["diabetes"])), int(bool(user_data["hypertension"])))
+
+
+def count_preservatives(ingredients_text):
+    """Number of harmful preservatives mentioned in an ingredients list."""
+    return additive_matcher.count(ingredients_text)
+
+
+def product_values(product_details):
+    """
+    Product-side inputs from extract_product_details output.
+
+    Returns:
+        tuple: (sugar, sodium, preservative_count)
+    """
+    if not product_details:
+        raise ValueError("Both user data and product details are required")
+    # extract_product_details has already matched the additives
+    additives = product_details.get("additives")
+    preservative_count = (len(additives) if additives is not None
+                          else count_preservatives(product_details.get("ingredients", "")))
+    return product_details.get("sugar", 0), product_details.get("sodium", 0), preservative_count
+
+
+class FeatureSpec:
+    """
+    Builds model input rows in a fixed feature order.
+
+    The order (usually the one saved with the model) is resolved to
+    column positions once, so filling a row writes the computed values
+    straight into a preallocated array without building a dict or list.
+    Training uses from_columns() with the same spec, so the model is fit
+    on exactly the matrix layout it is served with.
+    """
+
+    def __init__(self, feature_order=None, dtype=np.float64):
+        self.names = list(feature_order) if feature_order is not None else list(FEATURE_ORDER)
+        unknown = [name for name in self.names if name not in FEATURE_ORDER]
+        if unknown:
+            raise ValueError(f"Unknown features: {', '.join(unknown)}")
+        self.dtype = np.dtype(dtype)
+        self.n_features = len(self.names)
+        # (position in the row, position in FEATURE_ORDER) for every feature
+        self._columns = [(column, FEATURE_ORDER.index(name)) for column, name in enumerate(self.names)]
+        self._canonical = self.names == FEATURE_ORDER
+
+    def empty(self, n_rows):
+        """Preallocated, uninitialised (n_rows, n_features) matrix."""
+        return np.empty((n_rows, self.n_features), dtype=self.dtype)
+
+    def fill(self, out, user, product):
+        """
+        Write one row of features into out.
+
+        Args:
+            out: 1-D array of length n_features, e.g. a row of empty()
+            user: tuple from user_values()
+            product: tuple from product_values()
+        """
+        age, weight, height, sugar_level, diabetes, hypertension = user
+        sugar, sodium, preservative_count = product
+        # weight is validated to be at least 20 kg
+        values = (age, weight, height, sugar_level, diabetes, hypertension,
+                  sugar, sodium, sugar / weight, sodium / weight, preservative_count)
+        if self._canonical:
+            out[:] = values
+        else:
+            for column, source in self._columns:
+                out[column] = values[source]
+        return out
+
+    def fill_products(self, out, user, sugar, sodium, preservative_count):
+        """
+        Fill the rows of out for one user and many products, given one
+        array per product-side value (one entry per row of out). The user
+        values may be arrays too, to fill rows for many users at once.
+        """
+        age, weight, height, sugar_level, diabetes, hypertension = user
+        values = (age, weight, height, sugar_level, diabetes, hypertension,
+                  sugar, sodium, sugar / weight, sodium / weight, preservative_count)
+        for column, source in self._columns:
+            out[:, column] = values[source]
+        return out
+
+    def row(self, user_data, product_details):
+        """Validate one (user, product details) pair and return a (1, n_features) matrix."""
+        X = self.empty(1)
+        self.fill(X[0], user_values(user_data), product_values(product_details))
+        return X
+
+    def matrix(self, pairs):
+        """(len(pairs), n_features) matrix for validated (user, product details) pairs."""
+        X = self.empty(len(pairs))
+        for row, (user_data, product_details) in zip(X, pairs):
+            self.fill(row, user_values(user_data), product_values(product_details))
+        return X
+
+    def from_columns(self, columns):
+        """
+        Matrix from named feature columns, e.g. a training DataFrame or a
+        dict of lists read from a dataset CSV.
+        """
+        n_rows = len(columns[self.names[0]]) if self.names else 0
+        X = self.empty(n_rows)
+        for column, name in enumerate(self.names):
+            X[:, column] = columns[name]
+        return X
+
+    def as_dict(self, row):
+        """Feature values of one row by name, as reported in API responses."""
+        return {name: int(value) if name in INTEGER_FEATURES else float(value)
+                for name, value in zip(self.names, row)}
@@ -0,0 +1,226 @@
+# backend/forest.py
+
+import json
+import os
+import shutil
+from datetime import datetime
+
+import numpy as np
+
+# On-disk artifact format written by FlatForest.save
+ARTIFACT_FORMAT = "nutriscore-forest"
+ARTIFACT_FORMAT_VERSION = 1
+HEADER_FILE = "model.json"
+ARRAY_NAMES = ("feature", "threshold", "left", "right", "value", "roots")
+
+
+class FlatForest:
+    """
+    Array-backed RandomForestRegressor predictor.
+
+    All trees are concatenated into flat NumPy node arrays (feature,
+    threshold, left/right child, value) and evaluated level by level for
+    every tree and row at once. Leaves point back at themselves, so after
+    max_depth steps every (tree, row) cursor rests on its leaf.
+
+    Predictions are numerically identical to RandomForestRegressor.predict:
+    inputs are compared as float32 against float64 thresholds like sklearn
+    does, and per-tree outputs are summed in estimator order before
+    dividing by the number of trees.
+    """
+
+    def __init__(self, feature, threshold, left, right, value, roots, max_depth,
+                 n_features, feature_names=None, value_scale=None, value_offset=0.0,
+                 header=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.n_features_in_ = int(n_features)
+        self.feature_names = list(feature_names) if feature_names is not None else None
+        self.n_estimators = len(roots)
+        # Quantized leaf values are stored as integers: value * scale + offset
+        self.value_scale = value_scale
+        self.value_offset = value_offset
+        self.header = header or {}
+
+    @classmethod
+    def from_sklearn(cls, model):
+        """Export a fitted sklearn RandomForestRegressor."""
+        if getattr(model, "n_outputs_", 1) != 1:
+            raise ValueError("Only single-output forests are supported")
+
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            node_ids = np.arange(tree.node_count, dtype=np.int64)
+            is_leaf = tree.children_left == -1
+
+            # Leaves loop back to themselves; split children get the
+            # global offset of this tree
+            left = np.where(is_leaf, node_ids, tree.children_left) + offset
+            right = np.where(is_leaf, node_ids, tree.children_right) + offset
+
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(tree.threshold)
+            lefts.append(left)
+            rights.append(right)
+            values.append(tree.value[:, 0, 0])
+            roots.append(offset)
+
+            offset += tree.node_count
+            max_depth = max(max_depth, tree.max_depth)
+
+        return cls(
+            feature=np.concatenate(features).astype(np.intp),
+            threshold=np.concatenate(thresholds).astype(np.float64),
+            left=np.concatenate(lefts).astype(np.intp),
+            right=np.concatenate(rights).astype(np.intp),
+            value=np.concatenate(values).astype(np.float64),
+            roots=np.asarray(roots, dtype=np.intp),
+            max_depth=max_depth,
+            n_features=model.n_features_in_,
+            feature_names=getattr(model, "feature_names_in_", None)
+        )
+
+    def apply(self, X):
+        """Return the leaf node index reached in every tree, shape (n_trees, n_rows)."""
+        X = np.asarray(X)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features_in_:
+            raise ValueError(
+                f"X has {X.shape[1]} features, but the model expects {self.n_features_in_}"
+            )
+        # sklearn evaluates splits on float32 inputs
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if np.isnan(X).any():
+            raise ValueError("Input contains NaN")
+
+        n_rows = X.shape[0]
+        rows = np.arange(n_rows)
+        nodes = np.repeat(self.roots[:, None], n_rows, axis=1)
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return nodes
+
+    def predict(self, X):
+        leaf_values = self.value[self.apply(X)]
+        if self.value_scale is not None:
+            leaf_values = leaf_values * self.value_scale + self.value_offset
+        # cumsum adds trees strictly in order, matching sklearn's
+        # accumulation; a pairwise sum could differ in the last bit
+        total = np.cumsum(leaf_values, axis=0)[-1]
+        return total / self.n_estimators
+
+    def save(self, path, metadata=None, float32_thresholds=False, quantize_bits=None):
+        """
+        Write the forest as a versioned artifact directory: a JSON header
+        plus one .npy file per node array, loadable with memory mapping.
+
+        Args:
+            path: artifact directory, replaced atomically if it exists
+            metadata: extra JSON-serialisable fields stored in the header
+            float32_thresholds: store split thresholds as float32
+            quantize_bits: store leaf values as 8 or 16 bit integers
+
+        Returns:
+            dict: the header that was written
+        """
+        if self.value_scale is not None:
+            raise ValueError("Forest leaf values are already quantized")
+
+        arrays = {
+            "feature": self.feature.astype(np.min_scalar_type(max(self.n_features_in_ - 1, 0))),
+            "threshold": self.threshold.astype(np.float32 if float32_thresholds else np.float64),
+            "left": self.left.astype(np.int32),
+            "right": self.right.astype(np.int32),
+            "roots": self.roots.astype(np.int32),
+        }
+
+        quantization = None
+        if quantize_bits:
+            if quantize_bits not in (8, 16):
+                raise ValueError("quantize_bits must be 8 or 16")
+            levels = 2 ** quantize_bits - 1
+            low, high = float(self.value.min()), float(self.value.max())
+            scale = (high - low) / levels if high > low else 1.0
+            codes = np.rint((self.value - low) / scale)
+            arrays["value"] = codes.astype(np.uint8 if quantize_bits == 8 else np.uint16)
+            quantization = {"bits": quantize_bits, "scale": scale, "offset": low}
+        else:
+            arrays["value"] = self.value.astype(np.float64)
+
+        header = {
+            "format": ARTIFACT_FORMAT,
+            "format_version": ARTIFACT_FORMAT_VERSION,
+            "created_at": datetime.now().isoformat(),
+            "feature_names": self.feature_names,
+            "n_features": self.n_features_in_,
+            "n_estimators": self.n_estimators,
+            "max_depth": self.max_depth,
+            "node_count": int(len(self.value)),
+            "threshold_dtype": str(arrays["threshold"].dtype),
+            "value_quantization": quantization,
+            "arrays": {name: f"{name}.npy" for name in ARRAY_NAMES},
+        }
+        header.update(metadata or {})
+
+        # Build next to the target and swap it in, so readers never see
+        # a partially written artifact
+        tmp_path = path.rstrip(os.sep) + ".tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        for name, array in arrays.items():
+            np.save(os.path.join(tmp_path, f"{name}.npy"), np.ascontiguousarray(array))
+        with open(os.path.join(tmp_path, HEADER_FILE), "w") as f:
+            json.dump(header, f, indent=2)
+
+        old_path = path.rstrip(os.sep) + ".old"
+        if os.path.exists(path):
+            shutil.rmtree(old_path, ignore_errors=True)
+            os.replace(path, old_path)
+        os.replace(tmp_path, path)
+        shutil.rmtree(old_path, ignore_errors=True)
+        return header
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Load an artifact written by save. With mmap the node arrays are
+        mapped read-only instead of read into memory, so start-up cost
+        does not depend on the forest size and forked workers share the
+        pages through the OS page cache.
+        """
+        with open(os.path.join(path, HEADER_FILE)) as f:
+            header = json.load(f)
+        if header.get("format") != ARTIFACT_FORMAT:
+            raise ValueError(f"{path} is not a {ARTIFACT_FORMAT} artifact")
+        if header.get("format_version") != ARTIFACT_FORMAT_VERSION:
+            raise ValueError(f"Unsupported artifact format version: {header.get('format_version')}")
+
+        mmap_mode = "r" if mmap else None
+        arrays = {name: np.load(os.path.join(path, filename), mmap_mode=mmap_mode)
+                  for name, filename in header["arrays"].items()}
+
+        quantization = header.get("value_quantization")
+        return cls(
+            feature=arrays["feature"],
+            threshold=arrays["threshold"],
+            left=arrays["left"],
+            right=arrays["right"],
+            value=arrays["value"],
+            roots=arrays["roots"],
+            max_depth=header["max_depth"],
+            n_features=header["n_features"],
+            feature_names=header.get("feature_names"),
+            value_scale=quantization["scale"] if quantization else None,
+            value_offset=quantization["offset"] if quantization else 0.0,
+            header=header
+        )
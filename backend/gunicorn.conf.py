@@ -0,0 +1,44 @@
+# backend/gunicorn.conf.py
+"""
+Production server settings. Run from the backend directory:
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+The app (and with it the model) is loaded once in the master process and
+shared copy-on-write with the forked workers. Each worker warms up the
+model before it starts accepting connections.
+"""
+import gc
+import multiprocessing
+import os
+
+bind = os.environ.get("NUTRISCORE_BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("NUTRISCORE_WORKERS", multiprocessing.cpu_count()))
+worker_class = "gthread"
+threads = int(os.environ.get("NUTRISCORE_THREADS", 4))
+timeout = int(os.environ.get("NUTRISCORE_WORKER_TIMEOUT", 30))
+graceful_timeout = 30
+keepalive = 5
+
+# Load the model before forking so workers share its memory
+preload_app = True
+
+
+def when_ready(server):
+    # Move everything loaded so far, including the model, into the
+    # permanent GC generation. Collections in the workers then never
+    # touch those objects, which keeps the shared pages from being copied.
+    gc.freeze()
+    server.log.info(f"Model preloaded; {gc.get_freeze_count()} objects frozen before fork")
+
+
+def post_worker_init(worker):
+    from wsgi import health_monitor, model_registry, warm_up
+    # Workers forked after a HUP to the master start from the preloaded
+    # model; pick up a newer published model before taking traffic
+    model_registry.refresh_if_changed()
+    # HUP to a worker reloads its model in place
+    model_registry.install_signal_handler()
+    warm_up()
+    # Each worker runs its own background canary for readiness probes
+    health_monitor.ensure_started()
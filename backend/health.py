@@ -0,0 +1,100 @@
+# backend/health.py
+
+import os
+import threading
+import time
+from datetime import datetime
+
+
+class CanaryMonitor:
+    """
+    Runs a self-test prediction at start-up (and after every model swap)
+    and a canary prediction periodically in a background thread.
+    Readiness probes read the outcome of the last run instead of running
+    the model themselves.
+
+    The background thread is started lazily in the process that serves
+    probes, so it also runs in workers forked after start-up.
+    """
+
+    def __init__(self, check, interval=30.0, max_age=None):
+        self.check = check
+        self.interval = interval
+        # A canary older than this (e.g. a stuck thread) means not ready
+        self.max_age = max_age if max_age is not None else 3 * interval
+        self.self_test_result = None
+        self.last = None
+        self._thread_pid = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, check):
+        """Build a monitor configured from NUTRISCORE_HEALTH_* environment variables."""
+        return cls(check, interval=float(os.environ.get("NUTRISCORE_HEALTH_CANARY_INTERVAL", 30)))
+
+    def run_once(self):
+        """Run the check now and record its outcome and latency."""
+        start_time = time.perf_counter()
+        try:
+            self.check()
+            error = None
+        except Exception as e:
+            error = str(e)
+        result = {
+            "status": "passed" if error is None else "failed",
+            "latency_ms": (time.perf_counter() - start_time) * 1000,
+            "checked_at": datetime.now().isoformat(),
+            "_monotonic": time.monotonic()
+        }
+        if error is not None:
+            result["error"] = error
+        self.last = result
+        return result
+
+    def self_test(self):
+        """Run the check as the self-test that gates readiness."""
+        self.self_test_result = self.run_once()
+        return self.self_test_result
+
+    def ensure_started(self):
+        if self._thread_pid == os.getpid() or self.interval <= 0:
+            return
+        with self._lock:
+            if self._thread_pid == os.getpid():
+                return
+            threading.Thread(target=self._run, name="health-canary", daemon=True).start()
+            self._thread_pid = os.getpid()
+
+    def _run(self):
+        while True:
+            self.run_once()
+            time.sleep(self.interval)
+
+    def status(self):
+        """
+        Readiness from the start-up self-test and the last canary run.
+
+        Returns:
+            (ready, details dict)
+        """
+        self.ensure_started()
+        last = self.last
+        details = {"self_test": public(self.self_test_result), "canary": public(last)}
+        if last is None or self.self_test_result is None:
+            return False, dict(details, reason="Self-test has not run yet")
+        age = time.monotonic() - last["_monotonic"]
+        details["canary"]["age_seconds"] = age
+        if self.self_test_result["status"] != "passed":
+            return False, dict(details, reason="Self-test failed")
+        if last["status"] != "passed":
+            return False, dict(details, reason="Last canary prediction failed")
+        if self.interval > 0 and age > self.max_age:
+            return False, dict(details, reason="Canary prediction is stale")
+        return True, details
+
+
+def public(result):
+    """Copy of a check result without internal fields."""
+    if result is None:
+        return None
+    return {name: value for name, value in result.items() if not name.startswith("_")}
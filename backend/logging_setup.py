@@ -0,0 +1,155 @@
+# backend/logging_setup.py
+
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import threading
+from datetime import datetime, timezone
+
+# Per-request info lines go to this logger so they can be sampled
+REQUEST_LOGGER = "nutriscore.requests"
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Attributes every LogRecord has; anything else was passed via extra=
+STANDARD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line, including fields passed with extra=."""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "process": record.process,
+            "thread": record.threadName
+        }
+        for name, value in vars(record).items():
+            if name not in STANDARD_ATTRIBUTES and not name.startswith("_"):
+                entry[name] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Keep a random fraction of records at INFO and below; never drop warnings or errors."""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno > logging.INFO or self.rate >= 1 or random.random() < self.rate
+
+
+class ForkSafeQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler whose listener thread is (re)started lazily in the
+    process that logs, so forked server workers get their own listener
+    instead of writing into a queue nobody reads.
+    """
+
+    def __init__(self, targets):
+        super().__init__(queue.SimpleQueue())
+        self.targets = targets
+        self.listener = None
+        self._listener_pid = None
+        self._start_lock = threading.Lock()
+        if hasattr(os, "register_at_fork"):
+            # Another thread may hold the lock at fork time
+            os.register_at_fork(after_in_child=self._reset_lock)
+
+    def _reset_lock(self):
+        self._start_lock = threading.Lock()
+
+    def start_listener(self):
+        with self._start_lock:
+            if self._listener_pid == os.getpid():
+                return
+            self.queue = queue.SimpleQueue()
+            self.listener = logging.handlers.QueueListener(self.queue, *self.targets,
+                                                           respect_handler_level=True)
+            self.listener.start()
+            self._listener_pid = os.getpid()
+
+    def stop_listener(self):
+        if self.listener is not None and self._listener_pid == os.getpid():
+            self.listener.stop()
+            self._listener_pid = None
+
+    def prepare(self, record):
+        """
+        Resolve the message and traceback on the logging thread, but
+        leave the traceback separate so formatters can place it.
+        """
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        if self._listener_pid != os.getpid():
+            self.start_listener()
+        super().enqueue(record)
+
+
+def configure_logging():
+    """
+    Configure root logging from NUTRISCORE_LOG_* environment variables.
+
+    Records are written to stderr and, if NUTRISCORE_LOG_FILE is set,
+    to a size-rotated file. In async mode (the default) request
+    threads only put records on a queue and a listener thread formats
+    and writes them.
+    """
+    level = os.environ.get("NUTRISCORE_LOG_LEVEL", "INFO").upper()
+    log_format = os.environ.get("NUTRISCORE_LOG_FORMAT", "text").lower()
+    log_file = os.environ.get("NUTRISCORE_LOG_FILE")
+    max_bytes = int(os.environ.get("NUTRISCORE_LOG_MAX_BYTES", 10 * 1024 * 1024))
+    backups = int(os.environ.get("NUTRISCORE_LOG_BACKUPS", 5))
+    async_mode = os.environ.get("NUTRISCORE_LOG_ASYNC", "1").lower() in ("1", "true", "yes")
+    sample_rate = float(os.environ.get("NUTRISCORE_LOG_SAMPLE_RATE", 1.0))
+    if log_format not in ("text", "json"):
+        raise ValueError(f"Unknown log format: {log_format}")
+
+    formatter = JSONFormatter() if log_format == "json" else logging.Formatter(TEXT_FORMAT)
+    handlers = [logging.StreamHandler()]
+    if log_file:
+        handlers.append(logging.handlers.RotatingFileHandler(log_file, maxBytes=max_bytes,
+                                                             backupCount=backups))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.setLevel(level)
+
+    if async_mode:
+        queue_handler = ForkSafeQueueHandler(handlers)
+        queue_handler.start_listener()
+        root.addHandler(queue_handler)
+        # Flush queued records on shutdown
+        atexit.register(queue_handler.stop_listener)
+    else:
+        for handler in handlers:
+            root.addHandler(handler)
+
+    request_logger = logging.getLogger(REQUEST_LOGGER)
+    request_logger.filters = [f for f in request_logger.filters if not isinstance(f, SamplingFilter)]
+    if sample_rate < 1:
+        request_logger.addFilter(SamplingFilter(sample_rate))
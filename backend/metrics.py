@@ -0,0 +1,196 @@
+# backend/metrics.py
+
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+# Quantiles reported for every latency series
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class Summary:
+    """
+    Latency summary over a sliding window of the most recent
+    observations, plus all-time count and sum.
+
+    observe() only writes into a preallocated ring buffer; quantiles are
+    computed when the metrics are scraped.
+    """
+
+    def __init__(self, window=1024):
+        self._values = np.zeros(window, dtype=np.float64)
+        self._next = 0
+        self._filled = 0
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        with self._lock:
+            self._values[self._next] = value
+            self._next = (self._next + 1) % len(self._values)
+            self._filled = min(self._filled + 1, len(self._values))
+            self.count += 1
+            self.total += value
+
+    def snapshot(self, quantiles=QUANTILES):
+        """Return ({quantile: value}, count, sum)."""
+        with self._lock:
+            values = self._values[:self._filled].copy()
+            count, total = self.count, self.total
+        if len(values) == 0:
+            return {q: math.nan for q in quantiles}, count, total
+        return dict(zip(quantiles, np.quantile(values, quantiles))), count, total
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+               for value in labels.values())
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + "}"
+
+
+def format_value(value):
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry:
+    """
+    In-process counters and latency summaries rendered in the Prometheus
+    text exposition format.
+
+    Collectors registered with add_collector() are called at scrape time
+    and report values that are kept elsewhere, such as cache statistics.
+
+    Every process keeps its own registry. With worker_label, every sample
+    is labelled with the ID of the process that reports it, so series from
+    different gunicorn workers are never mixed up or mistaken for resets.
+    """
+
+    def __init__(self, window=1024, worker_label=True):
+        self.window = window
+        self.worker_label = worker_label
+        self._summaries = {}
+        self._counters = {}
+        self._descriptions = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """Build a registry configured from NUTRISCORE_METRICS_* environment variables."""
+        return cls(
+            window=int(os.environ.get("NUTRISCORE_METRICS_WINDOW", 1024)),
+            worker_label=os.environ.get("NUTRISCORE_METRICS_WORKER_LABEL", "1").lower() in ("1", "true", "yes")
+        )
+
+    def describe(self, name, metric_type, help_text):
+        self._descriptions[name] = (metric_type, help_text)
+
+    def observe(self, name, value, **labels):
+        """Record one latency observation (in seconds)."""
+        key = (name, tuple(labels.items()))
+        summary = self._summaries.get(key)
+        if summary is None:
+            with self._lock:
+                summary = self._summaries.setdefault(key, Summary(self.window))
+        summary.observe(value)
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(labels.items()))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def add_collector(self, collector):
+        """
+        Register collector() -> [(name, type, help, [(labels, value), ...]), ...]
+        to be called on every scrape.
+        """
+        self._collectors.append(collector)
+
+    def summaries(self):
+        """Current quantiles, count and sum of every summary, keyed by (name, labels)."""
+        with self._lock:
+            items = list(self._summaries.items())
+        return {key: summary.snapshot() for key, summary in items}
+
+    def render(self):
+        """Render all metrics in the Prometheus text format."""
+        families = {}
+
+        def family(name, metric_type):
+            if name not in families:
+                described_type, help_text = self._descriptions.get(name, (metric_type, ""))
+                families[name] = (described_type, help_text, [])
+            return families[name][2]
+
+        with self._lock:
+            counters = list(self._counters.items())
+        for (name, labels), value in counters:
+            family(name, "counter").append((name, dict(labels), value))
+
+        for (name, labels), (quantiles, count, total) in self.summaries().items():
+            samples = family(name, "summary")
+            for q, value in quantiles.items():
+                samples.append((name, dict(labels, quantile=q), value))
+            samples.append((name + "_sum", dict(labels), total))
+            samples.append((name + "_count", dict(labels), count))
+
+        for collector in self._collectors:
+            for name, metric_type, help_text, samples in collector():
+                self._descriptions.setdefault(name, (metric_type, help_text))
+                family(name, metric_type).extend((name, labels, value) for labels, value in samples)
+
+        # Read at scrape time: workers are forked after the registry is built
+        worker = {"worker": str(os.getpid())} if self.worker_label else {}
+        lines = []
+        for name, (metric_type, help_text, samples) in families.items():
+            if help_text:
+                lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for sample_name, labels, value in samples:
+                lines.append(f"{sample_name}{format_labels(dict(labels, **worker))} {format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class StageTimer:
+    """
+    Monotonic per-stage timings for one request.
+
+        with timer.stage("fetch"):
+            product = get_product_by_barcode(barcode)
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def elapsed(self):
+        """Seconds since the request started."""
+        return time.perf_counter() - self.start
+
+    def server_timing(self, total=None):
+        """Server-Timing header value with every stage and the total, in milliseconds."""
+        total = self.elapsed() if total is None else total
+        entries = [f"{name};dur={seconds * 1000:.3f}" for name, seconds in self.stages.items()]
+        entries.append(f"total;dur={total * 1000:.3f}")
+        return ", ".join(entries)
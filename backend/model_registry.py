@@ -0,0 +1,276 @@
+# backend/model_registry.py
+
+import hashlib
+import itertools
+import json
+import logging
+import os
+import signal
+import threading
+import time
+from datetime import datetime
+
+import joblib
+import numpy as np
+
+from forest import FlatForest, HEADER_FILE
+
+logger = logging.getLogger(__name__)
+
+# Sidecar written next to the model by notebooks/pipeline.py
+METADATA_FILENAME = "model_metadata.json"
+
+# Numbers every model loaded by this process
+_load_ids = itertools.count(1)
+
+
+def read_metadata(path):
+    """Read a model metadata sidecar, or return None if there is none."""
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class LoadedModel:
+    """A model together with the metadata it was published with."""
+
+    def __init__(self, model, metadata, source):
+        self.model = model
+        self.metadata = metadata
+        self.version = metadata["version"]
+        self.source = source
+        self.loaded_at = datetime.now().isoformat()
+        # Versions can repeat ("unknown" without a sidecar, or a model
+        # republished under the same version), so per-model caches are
+        # keyed by the load instead
+        self.load_id = next(_load_ids)
+        self.cache_key = f"{self.version}#{self.load_id}"
+
+    def predict(self, X):
+        return self.model.predict(X)
+
+
+class ModelRegistry:
+    """
+    Holds the model used for predictions and swaps in new versions.
+
+    Requests read `current` once and use that LoadedModel until they
+    finish. A reload loads and validates the new model in a background
+    thread and then replaces the reference with a single assignment, so
+    in-flight requests never wait for, or see, a partially loaded model.
+
+    If a self_test(loaded_model) callback is set, it runs after every
+    swap; when it raises, the previous model is swapped back in.
+    """
+
+    def __init__(self, model_path, artifact_path, metadata_path, engine="auto",
+                 feature_order=None, canary_X=None, canary_y=None, max_canary_mae=None):
+        if engine not in ("auto", "flat", "sklearn"):
+            raise ValueError(f"Unknown inference engine: {engine}")
+        self.model_path = model_path
+        self.artifact_path = artifact_path
+        self.metadata_path = metadata_path
+        self.engine = engine
+        self.feature_order = list(feature_order) if feature_order is not None else None
+        self.canary_X = canary_X
+        self.canary_y = canary_y
+        self.max_canary_mae = max_canary_mae
+        self.current = None
+        self.last_reload = None
+        self.self_test = None
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pending = False
+
+    def add_listener(self, callback):
+        """Call callback(loaded_model) after every successful swap."""
+        self._listeners.append(callback)
+
+    def load(self, strict=False):
+        """
+        Load the model from disk.
+
+        The packaged artifact is memory-mapped when it exists (unless the
+        engine is "sklearn"), otherwise the pickle is loaded. With strict,
+        a sidecar that describes a different model than the one loaded is
+        an error rather than a warning, so a reload never swaps in a
+        half-published model.
+        """
+        metadata = read_metadata(self.metadata_path)
+
+        if self.engine != "sklearn" and os.path.isdir(self.artifact_path):
+            model = FlatForest.load(self.artifact_path)
+            if model.feature_names and self.feature_order and model.feature_names != self.feature_order:
+                raise ValueError(f"Artifact feature order {model.feature_names} does not match {self.feature_order}")
+            if (os.path.exists(self.model_path) and
+                    os.path.getmtime(self.model_path) >
+                    os.path.getmtime(os.path.join(self.artifact_path, HEADER_FILE))):
+                logger.warning(f"{self.model_path} is newer than {self.artifact_path}; "
+                               f"re-run notebooks/package_model.py")
+            source = self.artifact_path
+            source_sha256 = model.header.get("source", {}).get("sha256")
+            header_version = model.header.get("model_version")
+        else:
+            model = joblib.load(self.model_path)
+            if self.engine == "flat":
+                model = FlatForest.from_sklearn(model)
+            source = self.model_path
+            source_sha256 = file_sha256(self.model_path) if metadata and metadata.get("model_sha256") else None
+            header_version = None
+
+        if metadata is None:
+            logger.warning(f"No model metadata at {self.metadata_path}; version and metrics are unknown")
+            metadata = {"version": header_version or "unknown", "training_date": None, "metrics": {}}
+        elif metadata.get("model_sha256") and source_sha256 and metadata["model_sha256"] != source_sha256:
+            message = f"{self.metadata_path} describes a different model than {source}"
+            if strict:
+                raise ValueError(message)
+            logger.warning(message)
+
+        return LoadedModel(model, metadata, source)
+
+    def validate(self, candidate):
+        """
+        Run the candidate on the canary set. Predictions must be finite
+        scores in [0, 100] and, if a maximum is configured, the mean
+        absolute error on labelled canary rows must not exceed it.
+        """
+        n_features = getattr(candidate.model, "n_features_in_", None)
+        if self.feature_order and n_features is not None and n_features != len(self.feature_order):
+            raise ValueError(f"Model expects {n_features} features, not {len(self.feature_order)}")
+        if self.canary_X is None or len(self.canary_X) == 0:
+            return {"rows": 0}
+
+        start_time = time.perf_counter()
+        predictions = candidate.predict(self.canary_X)
+        latency_ms = (time.perf_counter() - start_time) * 1000
+
+        if predictions.shape != (len(self.canary_X),):
+            raise ValueError(f"Canary predictions have shape {predictions.shape}")
+        if not np.isfinite(predictions).all():
+            raise ValueError("Canary predictions contain non-finite values")
+        if predictions.min() < 0 or predictions.max() > 100:
+            raise ValueError(f"Canary predictions outside [0, 100]: "
+                             f"{predictions.min():.2f}..{predictions.max():.2f}")
+
+        result = {"rows": len(self.canary_X), "latency_ms": latency_ms}
+        if self.canary_y is not None:
+            result["mae"] = float(np.abs(predictions - self.canary_y).mean())
+            if self.max_canary_mae is not None and result["mae"] > self.max_canary_mae:
+                raise ValueError(f"Canary MAE {result['mae']:.3f} exceeds {self.max_canary_mae}")
+        return result
+
+    def swap(self, candidate):
+        previous = self.current
+        self.current = candidate
+        for callback in self._listeners:
+            callback(candidate)
+        return previous
+
+    def reload(self, wait=False, timeout=None):
+        """
+        Start loading the model on disk in the background. A reload
+        requested while one is running is queued behind it.
+
+        Returns:
+            dict: status of the last finished reload (after waiting for
+            this one if wait is set)
+        """
+        with self._lock:
+            self._pending = True
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run_reloads, name="model-reload", daemon=True)
+                self._thread.start()
+            thread = self._thread
+        if wait:
+            thread.join(timeout)
+        return self.last_reload
+
+    @property
+    def reloading(self):
+        thread = self._thread
+        return thread is not None and thread.is_alive()
+
+    def _run_reloads(self):
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._thread = None
+                    return
+                self._pending = False
+            self.reload_now()
+
+    def reload_now(self):
+        """Load, validate and swap in the model on disk in this thread."""
+        start_time = time.perf_counter()
+        previous_version = self.current.version if self.current else None
+        rolled_back = False
+        try:
+            candidate = self.load(strict=True)
+            canary = self.validate(candidate)
+            previous = self.swap(candidate)
+            try:
+                if self.self_test is not None:
+                    self.self_test(candidate)
+            except Exception as e:
+                rolled_back = True
+                self.rollback(previous)
+                raise ValueError(f"Self-test failed after the swap: {str(e)}")
+        except Exception as e:
+            self.last_reload = {
+                "status": "failed",
+                "error": str(e),
+                "current_version": previous_version,
+                "rolled_back": rolled_back,
+                "seconds": time.perf_counter() - start_time,
+                "finished_at": datetime.now().isoformat()
+            }
+            logger.error(f"Model reload failed, keeping version {previous_version}: {str(e)}")
+            return self.last_reload
+
+        self.last_reload = {
+            "status": "succeeded",
+            "version": candidate.version,
+            "previous_version": previous_version,
+            "canary": canary,
+            "seconds": time.perf_counter() - start_time,
+            "finished_at": datetime.now().isoformat()
+        }
+        logger.info(f"Model reloaded from {candidate.source}: version {previous_version} -> "
+                    f"{candidate.version} in {self.last_reload['seconds']:.2f}s")
+        return self.last_reload
+
+    def rollback(self, previous):
+        """Swap the previous model back in and re-run its self-test."""
+        if previous is None:
+            return
+        self.swap(previous)
+        try:
+            self.self_test(previous)
+        except Exception as e:
+            logger.error(f"Self-test of restored version {previous.version} failed: {str(e)}")
+
+    def refresh_if_changed(self):
+        """Reload synchronously if the sidecar on disk names another version."""
+        metadata = read_metadata(self.metadata_path)
+        if metadata and self.current and metadata.get("version") != self.current.version:
+            return self.reload_now()
+        return None
+
+    def install_signal_handler(self, signum=getattr(signal, "SIGHUP", None)):
+        """Reload the model in the background when the process receives signum."""
+        if signum is None or threading.current_thread() is not threading.main_thread():
+            return False
+        # The handler only starts a thread, so it never blocks on the reload lock
+        signal.signal(signum, lambda *_: threading.Thread(target=self.reload, daemon=True).start())
+        return True
@@ -0,0 +1,272 @@
+# backend/off_server.py
+"""
+Local stand-in for the Open Food Facts v0 product API, for tests,
+benchmarks and offline deployments.
+
+    python off_server.py --products ../data/products.csv
+    python off_server.py --products ../data/product_index.db --port 8765
+    python off_server.py --synthetic --latency-ms 80 --error-rate 0.05
+
+Point the backend at it with
+NUTRISCORE_PRODUCT_API_URL=http://127.0.0.1:8765.
+
+Products come from a CSV (the tab-separated Open Food Facts dump, or a
+file shaped like data/products.csv) or from a product index built by
+data/build_product_index.py. With --synthetic, barcodes missing from
+the source get a product derived from the barcode. Other barcodes get
+the v0 "product not found" response.
+
+--latency-ms and --jitter-ms delay every response. --fail-first makes
+the first N requests for each barcode fail with --error-status, and
+--error-rate fails a random fraction of the rest, so retries, caching
+and batch fetching can be tested deterministically. GET /stats reports
+request counters (?barcode=... for one barcode).
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+
+from product_index import ProductIndex, row_to_product
+
+PRODUCT_PATH = re.compile(r"^/api/v0/product/(\d+)\.json$")
+
+# CSV column -> (index column, scale); the first column present is used
+CSV_COLUMNS = {
+    "code": [("code", 1), ("barcode", 1)],
+    "product_name": [("product_name", 1)],
+    "sugars_100g": [("sugars_100g", 1), ("sugar_g", 1)],
+    "sodium_100g": [("sodium_100g", 1), ("sodium_mg", 0.001)],
+    "salt_100g": [("salt_100g", 1)],
+    "ingredients_text": [("ingredients_text", 1), ("preservatives", 1)]
+}
+
+INGREDIENTS = ["sugar", "water", "salt", "wheat flour", "palm oil", "skimmed milk powder",
+               "cocoa butter", "glucose syrup", "citric acid", "natural flavouring", "yeast"]
+ADDITIVES = ["sodium benzoate", "aspartame", "sodium nitrite", "potassium sorbate",
+             "calcium propionate", "high fructose corn syrup"]
+
+
+def load_csv_products(path):
+    """
+    Products of a CSV file by barcode, in the shape of the v0 API.
+
+    Accepts the Open Food Facts column names or those of
+    data/products.csv (sugar_g, sodium_mg, preservatives).
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        header = f.readline()
+    sep = "\t" if "\t" in header else ","
+    columns = header.rstrip("\n").split(sep)
+
+    usecols = {}
+    for column, candidates in CSV_COLUMNS.items():
+        for source, scale in candidates:
+            if source in columns:
+                usecols[column] = (source, scale)
+                break
+    if "code" not in usecols:
+        raise ValueError(f"No 'code' or 'barcode' column in {path}")
+
+    df = pd.read_csv(path, sep=sep, usecols=[source for source, _ in usecols.values()], dtype=str,
+                     on_bad_lines='skip')
+    fields = {}
+    for column in CSV_COLUMNS:
+        if column not in usecols:
+            fields[column] = [None] * len(df)
+            continue
+        source, scale = usecols[column]
+        values = df[source]
+        if column in ("sugars_100g", "sodium_100g", "salt_100g"):
+            values = pd.to_numeric(values, errors='coerce') * scale
+        elif source == "preservatives":
+            values = values.where(values.str.lower() != "none")
+        fields[column] = values.astype(object).where(values.notna(), None).tolist()
+
+    products = {}
+    for row in zip(*(fields[column] for column in CSV_COLUMNS)):
+        code = (row[0] or "").strip()
+        if code.isdigit():
+            products[code] = row_to_product((code,) + row[1:])
+    return products
+
+
+def synthetic_product(barcode):
+    """Deterministic Open Food Facts style product for a barcode."""
+    random_state = random.Random(int(barcode))
+    items = random_state.sample(INGREDIENTS, random_state.randint(3, 8))
+    items += random_state.sample(ADDITIVES, random_state.choice([0, 0, 1, 2]))
+    random_state.shuffle(items)
+    return {
+        "code": barcode,
+        "product_name": f"Product {barcode}",
+        "nutriments": {
+            "sugars_100g": round(random_state.uniform(0, 60), 1),
+            "sodium_100g": round(random_state.uniform(0, 1.5), 3)
+        },
+        "ingredients_text": ", ".join(items)
+    }
+
+
+class ProductServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server answering /api/v0/product/<barcode>.json.
+
+    Args:
+        products: dict of barcode -> product, a ProductIndex, or None
+        synthetic: serve synthetic_product() for barcodes not in products
+        latency, jitter: seconds added to every response (jitter is uniform)
+        fail_first: failed requests for each barcode before it is served
+        error_rate: fraction of the remaining requests that fail
+        error_status: HTTP status of failed requests
+        seed: seed of the jitter and error_rate draws
+    """
+
+    daemon_threads = True
+    # Benchmarks and load tests open many connections at once
+    request_queue_size = 1024
+
+    def __init__(self, address, products=None, synthetic=False, latency=0.0, jitter=0.0,
+                 fail_first=0, error_rate=0.0, error_status=503, seed=None):
+        super().__init__(address, ProductRequestHandler)
+        self.products = products if products is not None else {}
+        self.synthetic = synthetic
+        self.latency = latency
+        self.jitter = jitter
+        self.fail_first = fail_first
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.reset()
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def reset(self):
+        """Zero the request counters (and with them the fail_first state)."""
+        with self._lock:
+            self.requests = Counter()
+            self.outcomes = Counter()
+
+    def lookup(self, barcode):
+        product = self.products.get(barcode)
+        if product is None and self.synthetic:
+            product = synthetic_product(barcode)
+        return product
+
+    def respond_to(self, barcode):
+        """Count a request and return (HTTP status, JSON payload)."""
+        with self._lock:
+            self.requests[barcode] += 1
+            attempt = self.requests[barcode]
+            failed = attempt <= self.fail_first or (self.error_rate and self._random.random() < self.error_rate)
+            delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay:
+            time.sleep(delay)
+        if failed:
+            outcome, status, payload = "error", self.error_status, {"status": 0, "status_verbose": "injected error"}
+        else:
+            product = self.lookup(barcode)
+            if product is None:
+                outcome, status, payload = "not_found", 200, {
+                    "status": 0, "code": barcode, "status_verbose": "product not found"
+                }
+            else:
+                outcome, status, payload = "found", 200, {
+                    "status": 1, "code": barcode, "status_verbose": "product found", "product": product
+                }
+        with self._lock:
+            self.outcomes[outcome] += 1
+        return status, payload
+
+    def stats(self, barcode=None):
+        with self._lock:
+            if barcode is not None:
+                return {"barcode": barcode, "requests": self.requests[barcode]}
+            return {"requests": sum(self.requests.values()), "barcodes": len(self.requests),
+                    **{outcome: self.outcomes[outcome] for outcome in ("found", "not_found", "error")}}
+
+
+class ProductRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; without this, delayed ACKs
+    # add ~40 ms to every keep-alive response
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        match = PRODUCT_PATH.match(url.path)
+        if match is not None:
+            self.send_json(*self.server.respond_to(match.group(1)))
+        elif url.path == "/stats":
+            barcode = parse_qs(url.query).get("barcode", [None])[0]
+            self.send_json(200, self.server.stats(barcode))
+        else:
+            self.send_json(404, {"status": 0, "status_verbose": "unknown endpoint"})
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def load_products(path):
+    """Products from a product index (.db) or a CSV file."""
+    if path.endswith(".db"):
+        return ProductIndex(path)
+    return load_csv_products(path)
+
+
+def start_server(host="127.0.0.1", port=0, **options):
+    """Start a ProductServer in a daemon thread and return it (see ProductServer.base_url)."""
+    server = ProductServer((host, port), **options)
+    threading.Thread(target=server.serve_forever, name="off-server", daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for the Open Food Facts v0 product API")
+    parser.add_argument("--products", help="CSV/TSV file or product index (.db) to serve")
+    parser.add_argument("--synthetic", action="store_true",
+                        help="serve a synthetic product for every barcode not in --products")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="delay added to every response")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="extra uniform random delay")
+    parser.add_argument("--fail-first", type=int, default=0,
+                        help="fail the first N requests for each barcode")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of other requests that fail")
+    parser.add_argument("--error-status", type=int, default=503, help="HTTP status of failed requests")
+    parser.add_argument("--seed", type=int, default=None, help="seed of the jitter and error draws")
+    args = parser.parse_args()
+    if not args.products and not args.synthetic:
+        parser.error("give --products, --synthetic or both")
+
+    products = load_products(args.products) if args.products else None
+    server = ProductServer((args.host, args.port), products=products, synthetic=args.synthetic,
+                           latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000,
+                           fail_first=args.fail_first, error_rate=args.error_rate,
+                           error_status=args.error_status, seed=args.seed)
+    source = args.products or "synthetic products"
+    print(f"Serving {source} on {server.base_url} "
+          f"(NUTRISCORE_PRODUCT_API_URL={server.base_url})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
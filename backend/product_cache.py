@@ -0,0 +1,207 @@
+# backend/product_cache.py
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Marker stored for barcodes that Open Food Facts does not know about
+NOT_FOUND = object()
+
+
+class LRUCache:
+    """
+    Thread-safe in-memory cache with least-recently-used eviction and
+    per-entry expiry.
+    """
+
+    def __init__(self, maxsize=5000):
+        if maxsize <= 0:
+            raise ValueError("Cache size must be positive")
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        """Return the cached value, or None if missing or expired."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class DiskCache:
+    """
+    SQLite-backed cache tier that survives restarts. Entries carry an
+    absolute wall-clock expiry so they stay valid across processes.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        conn = self._connect()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS products ("
+            " barcode TEXT PRIMARY KEY,"
+            " payload TEXT,"
+            " expires_at REAL NOT NULL)"
+        )
+        conn.commit()
+
+    def _connect(self):
+        # sqlite3 connections cannot be shared between threads or with
+        # forked worker processes
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key):
+        """Return the cached value, NOT_FOUND, or None if missing or expired."""
+        row = self._connect().execute(
+            "SELECT payload, expires_at FROM products WHERE barcode = ?", (key,)
+        ).fetchone()
+        if row is None or row[1] <= time.time():
+            return None
+        return NOT_FOUND if row[0] is None else json.loads(row[0])
+
+    def set(self, key, value, ttl):
+        payload = None if value is NOT_FOUND else json.dumps(value)
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO products (barcode, payload, expires_at) VALUES (?, ?, ?)",
+            (key, payload, time.time() + ttl)
+        )
+        conn.commit()
+
+    def purge_expired(self):
+        """Delete expired rows and return how many were removed."""
+        conn = self._connect()
+        cursor = conn.execute("DELETE FROM products WHERE expires_at <= ?", (time.time(),))
+        conn.commit()
+        return cursor.rowcount
+
+    def clear(self):
+        conn = self._connect()
+        conn.execute("DELETE FROM products")
+        conn.commit()
+
+
+class ProductCache:
+    """
+    Two-tier product cache: an in-memory LRU in front of an optional
+    on-disk tier. Products that were not found upstream are cached with
+    their own (usually shorter) TTL.
+    """
+
+    def __init__(self, maxsize=5000, ttl=86400, negative_ttl=3600, disk_path=None):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.memory = LRUCache(maxsize)
+        self.disk = DiskCache(disk_path) if disk_path else None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls):
+        """Build a cache configured from NUTRISCORE_CACHE_* environment variables."""
+        return cls(
+            maxsize=int(os.environ.get("NUTRISCORE_CACHE_SIZE", 5000)),
+            ttl=float(os.environ.get("NUTRISCORE_CACHE_TTL", 86400)),
+            negative_ttl=float(os.environ.get("NUTRISCORE_CACHE_NEGATIVE_TTL", 3600)),
+            disk_path=os.environ.get("NUTRISCORE_CACHE_PATH") or None
+        )
+
+    def get(self, barcode):
+        """
+        Look up a barcode.
+
+        Returns:
+            the cached product dict, NOT_FOUND for a cached miss upstream,
+            or None if the barcode is not cached.
+        """
+        value = self.memory.get(barcode)
+        if value is None and self.disk is not None:
+            value = self.disk.get(barcode)
+            if value is not None:
+                ttl = self.negative_ttl if value is NOT_FOUND else self.ttl
+                self.memory.set(barcode, value, ttl)
+                with self._lock:
+                    self.disk_hits += 1
+
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            elif value is NOT_FOUND:
+                self.negative_hits += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, barcode, product):
+        self._store(barcode, product, self.ttl)
+
+    def set_not_found(self, barcode):
+        self._store(barcode, NOT_FOUND, self.negative_ttl)
+
+    def _store(self, barcode, value, ttl):
+        if ttl <= 0:
+            return
+        self.memory.set(barcode, value, ttl)
+        if self.disk is not None:
+            self.disk.set(barcode, value, ttl)
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def stats(self):
+        """Counters describing cache effectiveness."""
+        lookups = self.hits + self.negative_hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "evictions": self.memory.evictions,
+            "expirations": self.memory.expirations,
+            "size": len(self.memory),
+            "max_size": self.memory.maxsize,
+            "hit_ratio": (self.hits + self.negative_hits) / lookups if lookups else 0.0,
+            "disk_enabled": self.disk is not None
+        }
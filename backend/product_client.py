@@ -0,0 +1,122 @@
+# backend/product_client.py
+
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Upstream statuses worth retrying; anything else is returned to the caller
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class HTTPConfig:
+    """Connection pool, timeout and retry settings for upstream requests."""
+
+    def __init__(self, pool_size=20, connect_timeout=3.05, read_timeout=10,
+                 retries=2, backoff=0.3, user_agent="NutriScore/1.0"):
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.user_agent = user_agent
+
+    @classmethod
+    def from_env(cls):
+        """Build a config from NUTRISCORE_HTTP_* environment variables."""
+        return cls(
+            pool_size=int(os.environ.get("NUTRISCORE_HTTP_POOL_SIZE", 20)),
+            connect_timeout=float(os.environ.get("NUTRISCORE_HTTP_CONNECT_TIMEOUT", 3.05)),
+            read_timeout=float(os.environ.get("NUTRISCORE_HTTP_READ_TIMEOUT", 10)),
+            retries=int(os.environ.get("NUTRISCORE_HTTP_RETRIES", 2)),
+            backoff=float(os.environ.get("NUTRISCORE_HTTP_BACKOFF", 0.3))
+        )
+
+    @property
+    def timeout(self):
+        """(connect, read) tuple accepted by requests"""
+        return (self.connect_timeout, self.read_timeout)
+
+
+def create_session(config):
+    """
+    Create a keep-alive session with a bounded connection pool and
+    retries with exponential backoff on connection errors and transient
+    upstream statuses.
+    """
+    retry = Retry(
+        total=config.retries,
+        connect=config.retries,
+        read=config.retries,
+        status=config.retries,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(["GET"]),
+        backoff_factor=config.backoff,
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    # pool_block caps open connections per host at pool_size
+    adapter = HTTPAdapter(
+        pool_connections=config.pool_size,
+        pool_maxsize=config.pool_size,
+        max_retries=retry,
+        pool_block=True
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["User-Agent"] = config.user_agent
+    return session
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls for the same key: the first caller runs the
+    function and every caller that arrives while it is running receives
+    the same result (or exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+        else:
+            try:
+                call.result = fn()
+            except BaseException as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def stats(self):
+        return {"executed": self.executed, "coalesced": self.coalesced}
@@ -0,0 +1,232 @@
+# backend/product_features.py
+
+import os
+import threading
+import time
+
+import numpy as np
+
+from features import count_preservatives, product_values
+from product_cache import LRUCache
+from product_index import normalize_category
+
+# Product-side feature columns, in the order of features.product_values()
+PRODUCT_FEATURES = ("sugar", "sodium", "preservative_count")
+
+# Memory for cached category masks per catalog
+CATEGORY_CACHE_BYTES = 64 * 1024 * 1024
+
+
+class ProductFeatureStore:
+    """
+    Product-side features (sugar, sodium, preservative_count) materialised
+    once per barcode.
+
+    The values live in one preallocated (capacity, 3) column array with a
+    barcode -> row index, next to the extracted product details, so a
+    product that was scored before is neither fetched nor re-extracted
+    (no ingredients scan), and a batch gathers all of its product columns
+    with one indexed read. Only the user columns and the *_per_kg ratios
+    are computed per request.
+
+    When the store is full the oldest row is reused. Rows expire after ttl
+    seconds, like the product cache they are derived from.
+    """
+
+    def __init__(self, capacity=100000, ttl=86400):
+        self.capacity = max(int(capacity), 0)
+        self.ttl = ttl
+        self.values = np.zeros((self.capacity, len(PRODUCT_FEATURES)), dtype=np.float64, order="F")
+        self.expires_at = np.zeros(self.capacity, dtype=np.float64)
+        self.codes = [None] * self.capacity
+        self.details = [None] * self.capacity
+        self.rows = {}
+        self.size = 0
+        self._next = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @classmethod
+    def from_env(cls):
+        """Build a store configured from NUTRISCORE_PRODUCT_FEATURES_* environment variables."""
+        return cls(
+            capacity=int(os.environ.get("NUTRISCORE_PRODUCT_FEATURES_SIZE", 100000)),
+            ttl=float(os.environ.get("NUTRISCORE_PRODUCT_FEATURES_TTL",
+                                     os.environ.get("NUTRISCORE_CACHE_TTL", 86400)))
+        )
+
+    def lookup(self, barcodes):
+        """
+        Stored features and details for many barcodes at once.
+
+        Returns:
+            (values, details): an (n, 3) array of product-side features and
+            a list of product details, in the order of barcodes. Barcodes
+            that are not stored (or have expired) get NaN values and None.
+        """
+        values = np.full((len(barcodes), len(PRODUCT_FEATURES)), np.nan)
+        details = [None] * len(barcodes)
+        positions = []
+        rows = []
+        now = time.monotonic()
+        with self._lock:
+            for i, barcode in enumerate(barcodes):
+                row = self.rows.get(barcode)
+                if row is not None and self.expires_at[row] > now:
+                    positions.append(i)
+                    rows.append(row)
+                    details[i] = self.details[row]
+            if rows:
+                values[positions] = self.values[rows]
+            self.hits += len(rows)
+            self.misses += len(barcodes) - len(rows)
+        return values, details
+
+    def add(self, barcode, product_details):
+        """
+        Materialise the product-side features of extracted product details.
+
+        Returns:
+            tuple: (sugar, sodium, preservative_count)
+        """
+        values = product_values(product_details)
+        if self.capacity == 0 or self.ttl <= 0:
+            return values
+        barcode = str(barcode)
+        with self._lock:
+            row = self.rows.get(barcode)
+            if row is None:
+                if self.size < self.capacity:
+                    row = self.size
+                    self.size += 1
+                else:
+                    # Reuse the oldest row
+                    row = self._next
+                    self._next = (row + 1) % self.capacity
+                    del self.rows[self.codes[row]]
+                    self.evictions += 1
+                self.rows[barcode] = row
+                self.codes[row] = barcode
+            self.values[row] = values
+            self.expires_at[row] = time.monotonic() + self.ttl
+            self.details[row] = product_details
+        return values
+
+    def clear(self):
+        with self._lock:
+            self.rows.clear()
+            self.codes = [None] * self.capacity
+            self.details = [None] * self.capacity
+            self.size = 0
+            self._next = 0
+
+    def __len__(self):
+        return self.size
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": self.size,
+            "capacity": self.capacity
+        }
+
+
+class CatalogFeatures:
+    """
+    Product-side feature columns of every scorable product in the offline
+    index, read and extracted once so ranking scores straight from arrays
+    without reading SQLite or scanning ingredients per request.
+
+    Rows follow the index's scan order. Barcodes are kept as fixed-width
+    bytes, so the columns cost about 40 bytes per product; names are read
+    from the index only for the products a ranking returns.
+
+    A category filter needs a mask of one byte per product. Recently used
+    masks are kept within category_cache_bytes, so a catalog of n
+    products holds about 40 * n bytes plus at most that budget; with a
+    budget below n bytes every category ranking builds its mask again.
+    """
+
+    def __init__(self, product_index, codes, values, category_cache_bytes=CATEGORY_CACHE_BYTES):
+        self.product_index = product_index
+        self.codes = codes
+        self.values = values
+        # Every mask has the same size, so the budget fixes how many fit
+        max_masks = int(category_cache_bytes) // max(len(codes), 1)
+        self._category_masks = LRUCache(max_masks) if max_masks > 0 else None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_index(cls, product_index, chunk_size=10000, category_cache_bytes=CATEGORY_CACHE_BYTES):
+        """Materialise the product-side columns of a ProductIndex."""
+        codes = []
+        blocks = []
+        for rows in product_index.scan(chunk_size):
+            chunk_codes, _, sugar, sodium, ingredients = zip(*rows)
+            block = np.empty((len(rows), len(PRODUCT_FEATURES)), dtype=np.float64)
+            block[:, 0] = sugar
+            block[:, 1] = sodium
+            block[:, 2] = np.fromiter((count_preservatives(text) for text in ingredients),
+                                      dtype=np.float64, count=len(rows))
+            codes.extend(chunk_codes)
+            blocks.append(block)
+        values = (np.concatenate(blocks) if blocks
+                  else np.empty((0, len(PRODUCT_FEATURES)), dtype=np.float64))
+        return cls(product_index, np.array(codes, dtype="S"), np.asfortranarray(values),
+                   category_cache_bytes=category_cache_bytes)
+
+    def __len__(self):
+        return len(self.codes)
+
+    @property
+    def nbytes(self):
+        """Memory held by the catalog columns and its cached category masks."""
+        masks = len(self._category_masks) * len(self) if self._category_masks is not None else 0
+        return self.codes.nbytes + self.values.nbytes + masks
+
+    def category_mask(self, category):
+        """Boolean array marking the products in a category."""
+        category = normalize_category(category)
+        with self._lock:
+            mask = self._category_masks.get(category) if self._category_masks is not None else None
+            if mask is None:
+                mask = np.fromiter(self.product_index.category_flags(category), dtype=bool,
+                                   count=len(self))
+                if self._category_masks is not None:
+                    self._category_masks.set(category, mask, float("inf"))
+        return mask
+
+    def chunks(self, chunk_size=10000, category=None, max_sugar=None, max_sodium=None):
+        """
+        Iterate over the products that pass the filters.
+
+        Yields:
+            (positions, values): catalog rows of at most chunk_size products
+            and their (n, 3) product-side features
+        """
+        mask = self.category_mask(category) if category else None
+        for start in range(0, len(self), chunk_size):
+            values = self.values[start:start + chunk_size]
+            keep = None if mask is None else mask[start:start + len(values)]
+            if max_sugar is not None:
+                below = values[:, 0] <= float(max_sugar)
+                keep = below if keep is None else keep & below
+            if max_sodium is not None:
+                below = values[:, 1] <= float(max_sodium)
+                keep = below if keep is None else keep & below
+            if keep is None:
+                yield np.arange(start, start + len(values)), values
+            elif keep.any():
+                yield start + np.flatnonzero(keep), values[keep]
+
+    def barcode(self, position):
+        return self.codes[position].decode()
+
+    def name(self, position):
+        """Product name of a catalog row, read from the index."""
+        product = self.product_index.get(self.barcode(position))
+        return None if product is None else product.get("product_name")
@@ -0,0 +1,143 @@
+# backend/product_index.py
+
+import os
+import sqlite3
+import threading
+
+# Columns stored per product, in table order
+INDEX_COLUMNS = ("code", "product_name", "sugars_100g", "sodium_100g", "salt_100g", "ingredients_text")
+
+# Open Food Facts derives sodium from salt with this factor
+SALT_TO_SODIUM = 1 / 2.5
+
+# Whole-tag match in the comma-separated categories: both sides are
+# wrapped in commas, so "en:snacks" does not match "en:salty-snacks"
+CATEGORY_MATCH = "instr(',' || replace(categories, ', ', ',') || ',', ',' || ? || ',') > 0"
+
+
+class ProductIndex:
+    """
+    Read-only barcode index built by data/build_product_index.py.
+
+    Lookups go through a memory-mapped SQLite file and return products in
+    the same shape as the Open Food Facts v0 API, so they can be passed
+    straight to extract_product_details.
+    """
+
+    def __init__(self, path, mmap_size=256 * 1024 * 1024):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Product index not found: {path}")
+        self.path = path
+        self.mmap_size = mmap_size
+        self._local = threading.local()
+        self._query = f"SELECT {', '.join(INDEX_COLUMNS)} FROM products WHERE code = ?"
+        # Fail fast on files that are not product indexes
+        self._connect().execute("SELECT 1 FROM products LIMIT 1")
+        # Indexes built before categories were added have no such column
+        self.has_categories = any(row[1] == "categories" for row in
+                                  self._connect().execute("PRAGMA table_info(products)"))
+
+    def _connect(self):
+        # sqlite3 connections cannot be shared between threads or with
+        # forked worker processes
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            uri = f"file:{os.path.abspath(self.path)}?mode=ro"
+            conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, barcode):
+        """Return the product for a barcode, or None if it is not indexed."""
+        row = self._connect().execute(self._query, (str(barcode),)).fetchone()
+        return None if row is None else row_to_product(row)
+
+    def __contains__(self, barcode):
+        return self._connect().execute(
+            "SELECT 1 FROM products WHERE code = ?", (str(barcode),)
+        ).fetchone() is not None
+
+    def __len__(self):
+        return self._connect().execute("SELECT COUNT(*) FROM products").fetchone()[0]
+
+    def scan(self, chunk_size=10000, category=None, max_sugar=None, max_sodium=None):
+        """
+        Iterate over every product that can be scored (one with a name), in
+        barcode order.
+
+        Missing nutrients are resolved in SQL exactly as row_to_product and
+        extract_product_details resolve them, so scores match /predict.
+
+        Yields:
+            lists of at most chunk_size (code, product_name, sugar, sodium,
+            ingredients_text) tuples
+        """
+        sugar = "COALESCE(sugars_100g, 0)"
+        sodium = "COALESCE(sodium_100g, salt_100g * ?, 0)"
+        conditions = ["product_name IS NOT NULL"]
+        params = [SALT_TO_SODIUM]
+        if category:
+            if not self.has_categories:
+                raise ValueError("The product index has no categories; rebuild it with "
+                                 "data/build_product_index.py")
+            conditions.append(CATEGORY_MATCH)
+            params.append(normalize_category(category))
+        if max_sugar is not None:
+            conditions.append(f"{sugar} <= ?")
+            params.append(float(max_sugar))
+        if max_sodium is not None:
+            conditions.append(f"{sodium} <= ?")
+            params.extend([SALT_TO_SODIUM, float(max_sodium)])
+
+        cursor = self._connect().execute(
+            f"SELECT code, product_name, {sugar}, {sodium}, ingredients_text FROM products "
+            f"WHERE {' AND '.join(conditions)} ORDER BY code", params
+        )
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                return
+            yield rows
+
+    def category_flags(self, category):
+        """
+        Whether each product of an unfiltered scan() is in a category,
+        in the same order.
+        """
+        if not self.has_categories:
+            raise ValueError("The product index has no categories; rebuild it with "
+                             "data/build_product_index.py")
+        cursor = self._connect().execute(
+            f"SELECT COALESCE({CATEGORY_MATCH}, 0) FROM products "
+            "WHERE product_name IS NOT NULL ORDER BY code", (normalize_category(category),)
+        )
+        return (row[0] for row in cursor)
+
+
+def normalize_category(category):
+    """Category tag as stored in the index: lower case, without surrounding spaces."""
+    return str(category).strip().lower()
+
+
+def row_to_product(row):
+    """Convert an index row into an Open Food Facts style product dict."""
+    code, product_name, sugars, sodium, salt, ingredients = row
+    if sodium is None and salt is not None:
+        sodium = salt * SALT_TO_SODIUM
+
+    nutriments = {}
+    if sugars is not None:
+        nutriments["sugars_100g"] = sugars
+    if sodium is not None:
+        nutriments["sodium_100g"] = sodium
+    if salt is not None:
+        nutriments["salt_100g"] = salt
+
+    product = {"code": code, "nutriments": nutriments}
+    if product_name is not None:
+        product["product_name"] = product_name
+    if ingredients is not None:
+        product["ingredients_text"] = ingredients
+    return product
@@ -0,0 +1,161 @@
+# backend/profiles.py
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from features import REQUIRED_USER_FIELDS, user_values
+from product_cache import LRUCache
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_PROFILE_DB = os.path.join(root_dir, "data/profiles.db")
+
+
+class ProfileExistsError(ValueError):
+    """Raised when creating a profile under a user ID that is taken."""
+
+
+class UnknownUserError(LookupError):
+    """Raised when a request refers to a user ID with no stored profile."""
+
+
+class ProfileStore:
+    """
+    User health profiles in SQLite, so clients can send a user_id instead
+    of the whole profile with every prediction.
+
+    Profiles are validated when they are written. Reads go through an
+    in-memory LRU that holds each profile together with its validated
+    user-side feature values, so a cached user costs no validation or
+    conversion per request. Under several worker processes, an update
+    reaches the other workers' caches within ttl seconds.
+    """
+
+    def __init__(self, path, maxsize=10000, ttl=60):
+        self.path = path
+        self.ttl = ttl
+        self.cache = LRUCache(maxsize)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._created = False
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls):
+        """Build a store configured from NUTRISCORE_PROFILE_* environment variables."""
+        return cls(
+            os.environ.get("NUTRISCORE_PROFILE_DB", DEFAULT_PROFILE_DB),
+            maxsize=int(os.environ.get("NUTRISCORE_PROFILE_CACHE_SIZE", 10000)),
+            ttl=float(os.environ.get("NUTRISCORE_PROFILE_CACHE_TTL", 60))
+        )
+
+    def _connect(self):
+        # sqlite3 connections cannot be shared between threads or with
+        # forked worker processes
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            # The database is created on first use, not when the app is imported
+            if not self._created:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            if not self._created:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS profiles ("
+                    " user_id TEXT PRIMARY KEY,"
+                    " profile TEXT NOT NULL,"
+                    " updated_at REAL NOT NULL)"
+                )
+                conn.commit()
+                self._created = True
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @staticmethod
+    def validate(user_data):
+        """
+        Check a profile and keep only the fields used for scoring.
+
+        Returns:
+            (profile dict, user-side feature values)
+        """
+        if not isinstance(user_data, dict):
+            raise ValueError("User profile must be a JSON object")
+        values = user_values(user_data)
+        return {field: user_data[field] for field in REQUIRED_USER_FIELDS}, values
+
+    def create(self, user_data, user_id=None):
+        """Store a new profile, generating a user ID if none is given."""
+        if user_id is None:
+            user_id = uuid.uuid4().hex
+        elif isinstance(user_id, bool) or not isinstance(user_id, (str, int)) or user_id == "":
+            raise ValueError("'user_id' must be a non-empty string")
+        user_id = str(user_id)
+        profile, values = self.validate(user_data)
+        updated_at = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("INSERT INTO profiles (user_id, profile, updated_at) VALUES (?, ?, ?)",
+                         (user_id, json.dumps(profile), updated_at))
+            conn.commit()
+        except sqlite3.IntegrityError:
+            raise ProfileExistsError(f"User already exists: {user_id}")
+        return self._cache(user_id, profile, values, updated_at)
+
+    def put(self, user_id, user_data):
+        """Create or replace the profile of user_id."""
+        profile, values = self.validate(user_data)
+        updated_at = time.time()
+        conn = self._connect()
+        conn.execute("INSERT OR REPLACE INTO profiles (user_id, profile, updated_at) VALUES (?, ?, ?)",
+                     (str(user_id), json.dumps(profile), updated_at))
+        conn.commit()
+        return self._cache(str(user_id), profile, values, updated_at)
+
+    def get(self, user_id):
+        """
+        Look up a user.
+
+        Returns:
+            dict with user_id, profile, values (the validated user-side
+            features) and updated_at, or None for an unknown user
+        """
+        user_id = str(user_id)
+        entry = self.cache.get(user_id)
+        if entry is not None:
+            with self._lock:
+                self.hits += 1
+            return entry
+        with self._lock:
+            self.misses += 1
+
+        row = self._connect().execute(
+            "SELECT profile, updated_at FROM profiles WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        profile = json.loads(row[0])
+        return self._cache(user_id, profile, user_values(profile), row[1])
+
+    def _cache(self, user_id, profile, values, updated_at):
+        entry = {"user_id": user_id, "profile": profile, "values": values, "updated_at": updated_at}
+        if self.ttl > 0:
+            self.cache.set(user_id, entry, self.ttl)
+        return entry
+
+    def stats(self):
+        """Counters describing cache effectiveness."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": self.cache.evictions,
+            "size": len(self.cache),
+            "max_size": self.cache.maxsize
+        }
@@ -0,0 +1,89 @@
+# backend/ranking.py
+
+import time
+
+import numpy as np
+
+
+def top_k(scores, k, keys):
+    """
+    Positions of the k highest scores, unordered (argpartition, no full
+    sort). Scores tied at the cut-off go to the lowest keys, so the
+    selection does not depend on the order of the input.
+    """
+    if len(scores) <= k:
+        return np.arange(len(scores))
+    cutoff = scores[np.argpartition(scores, len(scores) - k)[len(scores) - k]]
+    above = np.flatnonzero(scores > cutoff)
+    tied = np.flatnonzero(scores == cutoff)
+    tied = tied[np.argsort(keys[tied], kind="stable")[:k - len(above)]]
+    return np.concatenate([above, tied])
+
+
+def rank_products(catalog, feature_spec, user, model, k=20, chunk_size=10000, **filters):
+    """
+    Score every product in the catalog for one user and return the k
+    healthiest.
+
+    The product-side columns come straight from the materialised catalog;
+    only the user columns and the *_per_kg ratios are written per chunk,
+    into one reused feature matrix. Only the best k seen so far are kept
+    between chunks, so the feature rows held per request stay bounded by
+    chunk_size + k whatever the catalog size. A category filter also
+    needs a one-byte-per-product mask, which may come from the catalog's
+    mask cache; the catalog itself is shared by all requests (see
+    CatalogFeatures for its memory cost).
+
+    Args:
+        catalog: CatalogFeatures of the offline product index
+        feature_spec: FeatureSpec the model's input rows are built with
+        user: validated user-side values (features.user_values)
+        model: model with a predict(X) method
+        filters: category, max_sugar and max_sodium, see CatalogFeatures.chunks
+
+    Returns:
+        dict: the ranked products (best first) and scan statistics
+    """
+    start_time = time.perf_counter()
+    X = feature_spec.empty(chunk_size)
+    best_scores = np.empty(0, dtype=np.float64)
+    best_positions = np.empty(0, dtype=np.intp)
+    best_rows = feature_spec.empty(0)
+    scanned = 0
+    predict_seconds = 0.0
+
+    for positions, values in catalog.chunks(chunk_size, **filters):
+        n = len(positions)
+        feature_spec.fill_products(X[:n], user, values[:, 0], values[:, 1], values[:, 2])
+        predict_start = time.perf_counter()
+        scores = model.predict(X[:n])
+        predict_seconds += time.perf_counter() - predict_start
+        scanned += n
+
+        # Keep the best k of the previous best and this chunk
+        keep = top_k(scores, k, positions)
+        best_scores = np.concatenate([best_scores, scores[keep]])
+        best_positions = np.concatenate([best_positions, positions[keep]])
+        best_rows = np.concatenate([best_rows, X[keep]])
+        keep = top_k(best_scores, k, best_positions)
+        best_scores, best_positions, best_rows = best_scores[keep], best_positions[keep], best_rows[keep]
+
+    # Equal scores are listed in barcode order (the catalog's row order)
+    order = np.lexsort((best_positions, -best_scores))
+    seconds = time.perf_counter() - start_time
+    return {
+        "results": [
+            {
+                "rank": rank,
+                "barcode": catalog.barcode(best_positions[i]),
+                "name": catalog.name(best_positions[i]),
+                "health_score": float(best_scores[i]),
+                "computed_features": feature_spec.as_dict(best_rows[i])
+            }
+            for rank, i in enumerate(order, start=1)
+        ],
+        "scanned": scanned,
+        "scan_seconds": seconds,
+        "predict_seconds": predict_seconds,
+        "products_per_second": scanned / seconds if seconds > 0 else 0.0
+    }
@@ -0,0 +1,138 @@
+# backend/score_cache.py
+
+import os
+import threading
+
+import numpy as np
+
+from product_cache import LRUCache
+
+# Scores never expire on their own; they are dropped when the model changes
+NO_EXPIRY = float("inf")
+
+
+def parse_quantization(spec, feature_names):
+    """
+    Parse a quantization spec such as "age=1,weight=0.5,sugar=0.1" into a
+    per-feature step array (0 means the feature is used as-is).
+    """
+    steps = np.zeros(len(feature_names), dtype=np.float64)
+    if not spec:
+        return steps
+    for item in spec.split(","):
+        name, _, step = item.partition("=")
+        name = name.strip()
+        if name not in feature_names:
+            raise ValueError(f"Unknown feature in score cache quantization: {name}")
+        step = float(step)
+        if step < 0:
+            raise ValueError(f"Quantization step for {name} must not be negative")
+        steps[feature_names.index(name)] = step
+    return steps
+
+
+class ScoreCache:
+    """
+    Bounded LRU cache of model predictions keyed by (model, feature
+    vector). The model is identified by LoadedModel.cache_key, which is
+    unique for every load, so a model republished under the same
+    version never sees the previous model's scores.
+
+    With quantization steps configured, continuous features are snapped
+    to a grid before prediction, so nearby inputs share a cache entry and
+    every request for that grid cell gets the same score whether or not
+    it was cached.
+    """
+
+    def __init__(self, maxsize=10000, model_version=None, quantization_steps=None):
+        self.enabled = maxsize > 0
+        self.cache = LRUCache(maxsize) if self.enabled else None
+        self.model_version = model_version
+        self.steps = quantization_steps
+        if self.steps is not None and not self.steps.any():
+            self.steps = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @classmethod
+    def from_env(cls, feature_names, model_version=None):
+        """Build a cache configured from NUTRISCORE_SCORE_CACHE_* environment variables."""
+        return cls(
+            maxsize=int(os.environ.get("NUTRISCORE_SCORE_CACHE_SIZE", 10000)),
+            model_version=model_version,
+            quantization_steps=parse_quantization(
+                os.environ.get("NUTRISCORE_SCORE_CACHE_QUANTIZE", ""), feature_names
+            )
+        )
+
+    def set_model_version(self, version):
+        """Switch to a new model version, dropping every cached score."""
+        if version == self.model_version:
+            return
+        self.model_version = version
+        if self.enabled:
+            self.cache.clear()
+        with self._lock:
+            self.invalidations += 1
+
+    def quantize(self, X):
+        """Snap features with a quantization step to the nearest grid point."""
+        if self.steps is None:
+            return X
+        quantized = X.copy()
+        columns = self.steps > 0
+        quantized[:, columns] = np.round(X[:, columns] / self.steps[columns]) * self.steps[columns]
+        return quantized
+
+    def predict(self, model, X, version=None):
+        """
+        Predict scores for the rows of X, running the model only on rows
+        whose score is not cached.
+
+        Pass the version of the model being used, so a request that
+        started before a model swap never caches its scores under the
+        new version.
+        """
+        X = self.quantize(np.asarray(X, dtype=np.float64))
+        if not self.enabled:
+            return model.predict(X)
+
+        if version is None:
+            version = self.model_version
+        keys = [(version, row.tobytes()) for row in X]
+        scores = np.empty(len(X), dtype=np.float64)
+        missing = []
+        for i, key in enumerate(keys):
+            score = self.cache.get(key)
+            if score is None:
+                missing.append(i)
+            else:
+                scores[i] = score
+
+        if missing:
+            scores[missing] = model.predict(X[missing])
+            for i in missing:
+                self.cache.set(keys[i], float(scores[i]), NO_EXPIRY)
+
+        with self._lock:
+            self.hits += len(X) - len(missing)
+            self.misses += len(missing)
+        return scores
+
+    def stats(self):
+        """Counters describing cache effectiveness."""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "model_version": self.model_version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": self.cache.evictions if self.enabled else 0,
+            "invalidations": self.invalidations,
+            "size": len(self.cache) if self.enabled else 0,
+            "max_size": self.cache.maxsize if self.enabled else 0,
+            "quantized": self.steps is not None
+        }
@@ -0,0 +1,126 @@
+# backend/tests/conftest.py
+"""
+The backend runs against a local Open Food Facts server (off_server.py)
+and an offline product index built in a temporary directory. Everything
+the app reads at import time is configured here, before any test module
+imports it.
+"""
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+root_dir = os.path.dirname(backend_dir)
+sys.path.insert(0, backend_dir)
+sys.path.insert(0, os.path.join(root_dir, "data"))
+sys.path.insert(0, os.path.join(root_dir, "notebooks"))
+
+from build_product_index import build_index
+from off_server import start_server
+
+ADMIN_TOKEN = "test-admin-token"
+
+USER = {"age": 30, "weight": 70, "height": 170, "sugar_level": 90, "diabetes": 0, "hypertension": 0}
+
+# Served by the local upstream
+UPSTREAM_PRODUCTS = {
+    "3000000000001": {
+        "code": "3000000000001",
+        "product_name": "Cola",
+        "nutriments": {"sugars_100g": 10.6, "sodium_100g": 0.01},
+        "ingredients_text": "water, sugar, aspartame, sodium benzoate"
+    },
+    "3000000000002": {
+        "code": "3000000000002",
+        "product_name": "Crackers",
+        "nutriments": {"sugars_100g": 2.0, "sodium_100g": 0.8},
+        "ingredients_text": "wheat flour, salt, yeast"
+    },
+    # Extracting it fails with something other than a ValueError
+    "3000000000003": {
+        "code": "3000000000003",
+        "product_name": "Broken",
+        "nutriments": {"sugars_100g": 1.0},
+        "ingredients_text": 42
+    }
+}
+
+# Offline product index: (code, name, sugars, sodium, categories_tags)
+INDEX_PRODUCTS = [
+    ("4000000000001", "Corn flakes", 8.0, 0.6, "en:breakfast-cereals,en:cereals"),
+    ("4000000000002", "Muesli", 15.0, 0.05, "en:breakfast-cereals"),
+    ("4000000000003", "Chocolate cereal", 35.0, 0.3, "en:breakfast-cereals,en:chocolate-cereals"),
+    ("4000000000004", "Potato chips", 0.5, 0.7, "en:snacks,en:salty-snacks"),
+    ("4000000000005", "Pretzels", 2.0, 1.5, "en:salty-snacks"),
+    ("4000000000006", "Rice cakes", 0.4, 0.02, "en:snacks"),
+    ("4000000000007", "Sparkling water", 0.0, 0.0, "")
+]
+
+workdir = tempfile.mkdtemp(prefix="nutriscore-tests-")
+
+
+def write_index(path):
+    dump = os.path.join(workdir, "dump.tsv")
+    with open(dump, "w", encoding="utf-8") as f:
+        f.write("code\tproduct_name\tsugars_100g\tsodium_100g\tingredients_text\tcategories_tags\n")
+        for code, name, sugars, sodium, categories in INDEX_PRODUCTS:
+            f.write(f"{code}\t{name}\t{sugars}\t{sodium}\twater\t{categories}\n")
+    build_index(dump, path)
+
+
+def copy_model(model_dir):
+    os.makedirs(model_dir)
+    for name in ("health_score_model.pkl", "feature_names.pkl"):
+        shutil.copy(os.path.join(root_dir, "model", name), model_dir)
+
+
+upstream = start_server(products=UPSTREAM_PRODUCTS)
+write_index(os.path.join(workdir, "product_index.db"))
+copy_model(os.path.join(workdir, "model"))
+
+os.environ.update({
+    "NUTRISCORE_PRODUCT_API_URL": upstream.base_url,
+    "NUTRISCORE_PRODUCT_INDEX": os.path.join(workdir, "product_index.db"),
+    "NUTRISCORE_PROFILE_DB": os.path.join(workdir, "profiles.db"),
+    # The pickle in the temporary directory, so reload tests can replace it
+    "NUTRISCORE_MODEL_PATH": os.path.join(workdir, "model", "health_score_model.pkl"),
+    "NUTRISCORE_MODEL_ARTIFACT": os.path.join(workdir, "model", "health_score_model"),
+    "NUTRISCORE_ADMIN_TOKEN": ADMIN_TOKEN,
+    "NUTRISCORE_HTTP_BACKOFF": "0",
+    "NUTRISCORE_LOG_LEVEL": "CRITICAL"
+})
+os.environ.pop("NUTRISCORE_LOG_FILE", None)
+os.environ.pop("NUTRISCORE_CACHE_PATH", None)
+os.environ.pop("NUTRISCORE_OFFLINE", None)
+
+
+def pytest_sessionfinish(session, exitstatus):
+    upstream.shutdown()
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def backend():
+    import app
+    return app
+
+
+@pytest.fixture
+def client(backend):
+    return backend.app.test_client()
+
+
+@pytest.fixture(autouse=True)
+def fresh_upstream():
+    """Every test starts with empty product caches and a well-behaved upstream."""
+    import utils
+    utils.product_cache.clear()
+    utils.product_features.clear()
+    upstream.fail_first = 0
+    upstream.error_rate = 0.0
+    upstream.latency = 0.0
+    upstream.reset()
+    yield upstream
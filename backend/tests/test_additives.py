@@ -0,0 +1,85 @@
+import json
+import random
+
+import pytest
+
+from additives import SCAN_THRESHOLD, AdditiveMatcher
+from conftest import USER
+from features import count_preservatives
+
+OVERLAPPING = {
+    "E211": ["sodium benzoate", "e211"],
+    "BENZ": "benzoate",
+    "E202": ["potassium sorbate", "sorbate"],
+    "ATE": "ate",
+    "E2": "e2",
+    "E21": "e21"
+}
+
+
+def both(dictionary):
+    return (AdditiveMatcher(dictionary, scan_threshold=float("inf")),
+            AdditiveMatcher(dictionary, scan_threshold=0))
+
+
+def test_default_dictionary_counts_the_original_preservatives():
+    matcher = AdditiveMatcher()
+    assert matcher.transitions is None
+    assert count_preservatives("Water, Sugar, ASPARTAME, sodium benzoate") == 2
+    assert matcher.match("high fructose corn syrup, potassium sorbate, sodium nitrate") == ["E251", "HFCS", "E202"]
+    assert count_preservatives("") == count_preservatives(None) == 0
+
+
+def test_automaton_is_used_from_the_threshold():
+    dictionary = {f"X{i}": f"pattern{i}" for i in range(SCAN_THRESHOLD)}
+    assert AdditiveMatcher(dictionary).transitions is not None
+    del dictionary["X0"]
+    assert AdditiveMatcher(dictionary).transitions is None
+
+
+@pytest.mark.parametrize("text", [
+    "Sodium Benzoate (E211), potassium sorbate",
+    "e2e21e211",
+    "chocolate",
+    "benzoat, sorbat",
+    "SODIUM BENZOATE"
+])
+def test_automaton_matches_the_scan_on_overlapping_patterns(text):
+    scan, automaton = both(OVERLAPPING)
+    assert automaton.match(text) == scan.match(text)
+
+
+def test_automaton_matches_the_scan_on_random_texts():
+    rng = random.Random(0)
+    alphabet = "abe12 ,"
+    dictionary = {f"A{i}": ["".join(rng.choice(alphabet) for _ in range(rng.randint(1, 4)))
+                            for _ in range(rng.randint(1, 3))] for i in range(40)}
+    scan, automaton = both(dictionary)
+    for _ in range(500):
+        text = "".join(rng.choice(alphabet + alphabet.upper()) for _ in range(rng.randint(0, 40)))
+        assert automaton.find(text) == scan.find(text)
+
+
+def test_dictionary_from_env(tmp_path, monkeypatch):
+    path = tmp_path / "additives.json"
+    path.write_text(json.dumps({"E330": ["citric acid", "e330"], "E211": "sodium benzoate"}))
+    monkeypatch.setenv("NUTRISCORE_ADDITIVES", str(path))
+    matcher = AdditiveMatcher.from_env()
+    assert matcher.match("water, Citric Acid, E211") == ["E330"]
+    assert matcher.match("E330, sodium benzoate") == ["E330", "E211"]
+
+
+def test_invalid_dictionaries(tmp_path, monkeypatch):
+    with pytest.raises(ValueError, match="Empty pattern"):
+        AdditiveMatcher({"E1": ""})
+    path = tmp_path / "additives.json"
+    path.write_text(json.dumps(["sodium benzoate"]))
+    monkeypatch.setenv("NUTRISCORE_ADDITIVES", str(path))
+    with pytest.raises(ValueError, match="JSON object"):
+        AdditiveMatcher.from_env()
+
+
+def test_predict_reports_matched_additives(client):
+    body = client.post("/predict", json={"user": USER, "barcode": "3000000000001"}).get_json()
+    assert body["product_details"]["additives"] == ["E951", "E211"]
+    assert body["computed_features"]["preservative_count"] == 2
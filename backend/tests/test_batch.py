@@ -0,0 +1,75 @@
+from conftest import USER
+
+
+def batch(client, items):
+    response = client.post("/predict/batch", json={"items": items})
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_item_errors_do_not_fail_the_batch(client):
+    body = batch(client, [
+        {"user": USER, "barcode": "3000000000001"},
+        {"user": 5, "barcode": "3000000000001"},
+        {"user": "abc", "barcode": "3000000000001"},
+        {"user": {"age": 30}, "barcode": "3000000000001"},
+        {"user_id": "nobody", "barcode": "3000000000001"},
+        {"user": USER},
+        {"user": USER, "barcode": "3999999999997"},
+        {"user": USER, "barcode": "3000000000003"}
+    ])
+    results = body["results"]
+    assert (body["count"], body["succeeded"], body["failed"]) == (8, 1, 7)
+    assert results[0]["barcode"] == "3000000000001" and 0 <= results[0]["health_score"] <= 100
+    assert [result.get("status") for result in results] == [None, 400, 400, 400, 404, 400, 400, 500]
+    assert results[1]["error"] == "'user' must be an object"
+    assert results[2]["error"] == "'user' must be an object"
+    assert results[3]["error"].startswith("Missing required user fields")
+    assert results[5]["error"] == "'barcode' is required"
+    assert "Product not found" in results[6]["error"]
+    assert results[7]["error"] == "An unexpected error occurred"
+
+
+def test_one_user_for_many_barcodes(client):
+    response = client.post("/predict/batch", json={"user": USER, "barcodes": ["3000000000001", "4000000000001"]})
+    body = response.get_json()
+    assert response.status_code == 200
+    assert [result["barcode"] for result in body["results"]] == ["3000000000001", "4000000000001"]
+    assert body["succeeded"] == 2
+
+
+def test_items_fall_back_to_the_top_level_user(client):
+    body = client.post("/predict/batch", json={
+        "user": USER,
+        "items": [{"barcode": "3000000000001"}, "4000000000001", {"user": dict(USER, age=60), "barcode": "4000000000001"}]
+    }).get_json()
+    assert body["succeeded"] == 3
+    assert [result["computed_features"]["age"] for result in body["results"]] == [30.0, 30.0, 60.0]
+
+
+def test_batch_matches_single_predictions(client):
+    barcodes = ["3000000000001", "3000000000002", "4000000000003"]
+    body = batch(client, [{"user": USER, "barcode": barcode} for barcode in barcodes])
+    for barcode, result in zip(barcodes, body["results"]):
+        single = client.post("/predict", json={"user": USER, "barcode": barcode}).get_json()
+        assert result["health_score"] == single["health_score"]
+        assert result["computed_features"] == single["computed_features"]
+
+
+def test_malformed_batch_is_rejected(client):
+    assert client.post("/predict/batch", json={"user": "abc", "barcodes": ["1"]}).status_code == 400
+    assert client.post("/predict/batch", json={"items": []}).status_code == 400
+    assert client.post("/predict/batch", json={"items": [], "barcodes": []}).status_code == 400
+    assert client.post("/predict/batch", json={"barcodes": ["1"]}).status_code == 400
+    assert client.post("/predict/batch", json={"items": [{}] * 501}).status_code == 400
+    assert client.post("/predict/batch", json=[1, 2]).status_code == 400
+
+
+def test_items_without_a_user_are_rejected(client):
+    # Items with no user before any item with one
+    body = batch(client, [{"barcode": "4000000000001"}, {"barcode": "4000000000002"},
+                          {"user": USER, "barcode": "4000000000001"}])
+    results = body["results"]
+    assert (body["succeeded"], body["failed"]) == (1, 2)
+    assert [result.get("status") for result in results] == [400, 400, None]
+    assert results[0]["error"] == results[1]["error"] == "'user' data is required"
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+
+from features import FEATURE_ORDER, FeatureSpec, count_preservatives
+from ingest import read_products
+from interactions import generate_interactions, score_interactions
+from product_index import SALT_TO_SODIUM
+from utils import extract_product_details
+
+PRODUCTS = pd.DataFrame({
+    "code": ["1", "2", "3", "4"],
+    "product_name": ["Cola", "Crackers", "Water", "Jam"],
+    "sugars_100g": [10.6, 2.0, 0.0, 48.0],
+    "salt_100g": [0.03, 2.0, 0.0, 0.1],
+    "ingredients_text": ["water, sugar, aspartame, sodium benzoate", "wheat flour, salt", None,
+                         "fruit, sugar, potassium sorbate"]
+})
+
+
+def served_details(product):
+    return extract_product_details({
+        "code": product.code,
+        "product_name": product.product_name,
+        "nutriments": {"sugars_100g": product.sugars_100g, "salt_100g": product.salt_100g},
+        "ingredients_text": product.ingredients_text if isinstance(product.ingredients_text, str) else ""
+    })
+
+
+def test_training_rows_match_serving_rows():
+    interactions = generate_interactions(PRODUCTS, num_users=20, samples_per_user=4, seed=0)
+    spec = FeatureSpec()
+
+    for row in interactions.itertuples(index=False):
+        product = PRODUCTS[PRODUCTS["code"] == row.barcode].iloc[0]
+        user = {"age": row.age, "weight": row.weight, "height": row.height, "sugar_level": row.sugar_level,
+                "diabetes": row.diabetes, "hypertension": row.hypertension}
+        served = spec.row(user, served_details(product))[0]
+        trained = np.array([getattr(row, name) for name in FEATURE_ORDER])
+        np.testing.assert_array_equal(trained, served)
+
+
+def test_label_penalises_the_preservatives_the_model_sees():
+    interactions = generate_interactions(PRODUCTS, num_users=20, samples_per_user=4, seed=0)
+    counts = {code: count_preservatives(text if isinstance(text, str) else "")
+              for code, text in zip(PRODUCTS["code"], PRODUCTS["ingredients_text"])}
+    assert counts == {"1": 2, "2": 0, "3": 0, "4": 1}
+    assert [counts[code] for code in interactions["barcode"]] == interactions["preservative_count"].tolist()
+
+    products = PRODUCTS.set_index("code").loc[interactions["barcode"]]
+    expected = score_interactions(products["sugars_100g"].to_numpy() * 10, products["salt_100g"].to_numpy() * 1000,
+                                  interactions["preservative_count"].to_numpy(),
+                                  interactions["diabetes"].to_numpy(), interactions["hypertension"].to_numpy())
+    np.testing.assert_array_equal(interactions["health_score"].to_numpy(), expected)
+    # Only products with a counted preservative get the penalty
+    plain = score_interactions(np.array([0.0, 0.0]), np.array([0.0, 0.0]), np.array([0, 2]),
+                               np.array([0, 0]), np.array([0, 0]))
+    assert plain.tolist() == [100, 90]
+
+
+def test_ingest_keeps_products_without_ingredients(tmp_path):
+    dump = tmp_path / "dump.tsv"
+    dump.write_text("code\tproduct_name\tsugars_100g\tsalt_100g\tadditives\tingredients_text\n"
+                    "1\tCola\t10.6\t0.03\ten:e211\twater, sugar, sodium benzoate\n"
+                    "2\tWater\t0\t0\t\t\n"
+                    "3\tNo salt\t1.0\t\t\tsugar\n")
+    products, stats = read_products(str(dump))
+    assert products["code"].tolist() == ["1", "2"]
+    assert products["ingredients_text"].tolist() == ["water, sugar, sodium benzoate", ""]
+    assert stats["rows_parsed"] == 3
@@ -0,0 +1,51 @@
+import time
+
+from conftest import USER
+from utils import fetch_product_details
+
+
+def test_batch_lookups_run_concurrently(fresh_upstream, monkeypatch):
+    monkeypatch.setattr(fresh_upstream, "synthetic", True)
+    fresh_upstream.latency = 0.2
+    barcodes = [str(6000000000000 + i) for i in range(8)]
+
+    start = time.perf_counter()
+    results = fetch_product_details(barcodes)
+    elapsed = time.perf_counter() - start
+
+    assert sorted(results) == barcodes
+    assert all(results[barcode]["name"] == f"Product {barcode}" for barcode in barcodes)
+    assert elapsed < 8 * 0.2 / 2
+
+
+def test_lookup_errors_are_returned_per_barcode(fresh_upstream):
+    results = fetch_product_details(["3000000000001", "3999999999996", "3000000000003"])
+    assert results["3000000000001"]["name"] == "Cola"
+    assert isinstance(results["3999999999996"], ValueError)
+    assert isinstance(results["3000000000003"], AttributeError)
+
+
+def test_slow_lookups_time_out(fresh_upstream):
+    fresh_upstream.latency = 0.5
+    results = fetch_product_details(["3000000000002"], timeout=0.1)
+    assert isinstance(results["3000000000002"], ConnectionError)
+    # Let the abandoned lookup finish before the next test resets the caches
+    time.sleep(0.5)
+
+
+def test_duplicate_barcodes_are_fetched_once(client, fresh_upstream):
+    response = client.post("/predict/batch", json={"user": USER, "barcodes": ["3000000000002"] * 5})
+    body = response.get_json()
+    assert body["succeeded"] == 5
+    assert len({result["health_score"] for result in body["results"]}) == 1
+    assert fresh_upstream.stats("3000000000002")["requests"] == 1
+
+
+def test_upstream_failure_is_reported_per_item(client, fresh_upstream):
+    fresh_upstream.fail_first = 3
+    body = client.post("/predict/batch", json={"items": [
+        {"user": USER, "barcode": "3000000000001"},
+        {"user": USER, "barcode": "4000000000001"}
+    ]}).get_json()
+    assert body["results"][0]["status"] == 503
+    assert "health_score" in body["results"][1]
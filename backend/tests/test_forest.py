@@ -0,0 +1,66 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+
+from conftest import root_dir
+from features import FEATURE_ORDER
+from forest import FlatForest
+
+
+@pytest.fixture(scope="module")
+def dataset():
+    data = pd.read_csv(os.path.join(root_dir, "data", "test_dataset.csv"))
+    return data[FEATURE_ORDER].to_numpy(dtype=np.float64), data["health_score"].to_numpy()
+
+
+@pytest.fixture(scope="module")
+def model(dataset):
+    X, y = dataset
+    return RandomForestRegressor(n_estimators=20, max_depth=8, random_state=0).fit(X, y)
+
+
+def test_predictions_match_sklearn_exactly(model, dataset):
+    X, _ = dataset
+    forest = FlatForest.from_sklearn(model)
+    assert np.array_equal(forest.predict(X), model.predict(X))
+    for row in X[:20]:
+        assert forest.predict(row)[0] == model.predict(row.reshape(1, -1))[0]
+
+
+def test_leaves_match_sklearn(model, dataset):
+    X, _ = dataset
+    forest = FlatForest.from_sklearn(model)
+    leaves = forest.apply(X[:50]) - forest.roots[:, None]
+    assert np.array_equal(leaves.T, model.apply(X[:50].astype(np.float32)))
+
+
+def test_saved_artifact_predicts_the_same(tmp_path, model, dataset):
+    X, _ = dataset
+    path = str(tmp_path / "forest")
+    header = FlatForest.from_sklearn(model).save(path, metadata={"version": "test"})
+    assert header["n_estimators"] == 20
+
+    for mmap in (True, False):
+        loaded = FlatForest.load(path, mmap=mmap)
+        assert loaded.header["version"] == "test"
+        assert np.array_equal(loaded.predict(X), model.predict(X))
+
+
+def test_quantized_artifact_stays_close(tmp_path, model, dataset):
+    X, _ = dataset
+    path = str(tmp_path / "forest")
+    FlatForest.from_sklearn(model).save(path, quantize_bits=16)
+    loaded = FlatForest.load(path)
+    spread = model.predict(X).max() - model.predict(X).min()
+    assert np.abs(loaded.predict(X) - model.predict(X)).max() < spread / 2 ** 15
+
+
+def test_rejects_wrong_inputs(model):
+    forest = FlatForest.from_sklearn(model)
+    with pytest.raises(ValueError, match="features"):
+        forest.predict(np.zeros((1, len(FEATURE_ORDER) + 1)))
+    with pytest.raises(ValueError, match="NaN"):
+        forest.predict(np.full(len(FEATURE_ORDER), np.nan))
@@ -0,0 +1,103 @@
+import os
+import time
+
+from health import CanaryMonitor
+
+
+class Check:
+    def __init__(self):
+        self.calls = 0
+        self.error = None
+
+    def __call__(self):
+        self.calls += 1
+        if self.error:
+            raise ValueError(self.error)
+
+
+def test_not_ready_before_the_self_test():
+    ready, details = CanaryMonitor(Check(), interval=0).status()
+    assert not ready
+    assert details["reason"] == "Self-test has not run yet"
+
+
+def test_ready_after_a_passing_self_test():
+    check = Check()
+    monitor = CanaryMonitor(check, interval=0)
+    assert monitor.self_test()["status"] == "passed"
+    ready, details = monitor.status()
+    assert ready
+    assert "_monotonic" not in details["canary"]
+    assert details["self_test"]["latency_ms"] >= 0
+    # Probes read the last result instead of running the check
+    monitor.status()
+    assert check.calls == 1
+
+
+def test_failed_checks_are_not_ready():
+    check = Check()
+    monitor = CanaryMonitor(check, interval=0)
+    check.error = "Self-test score out of range"
+    assert monitor.self_test()["error"] == "Self-test score out of range"
+    assert monitor.status()[1]["reason"] == "Self-test failed"
+
+    check.error = None
+    monitor.self_test()
+    check.error = "model crashed"
+    monitor.run_once()
+    assert monitor.status()[1]["reason"] == "Last canary prediction failed"
+
+
+def test_stale_canary_is_not_ready():
+    monitor = CanaryMonitor(Check(), interval=30, max_age=0.05)
+    monitor._thread_pid = os.getpid()  # no background thread
+    monitor.self_test()
+    assert monitor.status()[0]
+    time.sleep(0.1)
+    ready, details = monitor.status()
+    assert not ready
+    assert details["reason"] == "Canary prediction is stale"
+
+
+def test_background_canary_runs_periodically():
+    check = Check()
+    monitor = CanaryMonitor(check, interval=0.02)
+    monitor.self_test()
+    monitor.status()
+    time.sleep(0.2)
+    # Park the thread for the rest of the session
+    monitor.interval = 3600
+    assert check.calls > 2
+
+
+def test_liveness(client):
+    response = client.get("/health/live")
+    assert response.status_code == 200
+    assert response.get_json() == {"status": "alive"}
+
+
+def test_readiness_and_health(backend, client):
+    ready = client.get("/health/ready")
+    assert ready.status_code == 200
+    body = ready.get_json()
+    assert body["status"] == "ready"
+    assert body["model_version"] == backend.model_registry.current.version
+    assert body["self_test"]["status"] == "passed"
+
+    health = client.get("/health").get_json()
+    assert health["status"] == "healthy"
+    assert health["last_updated"] == health["canary"]["checked_at"]
+
+
+def test_failing_canary_makes_the_app_unready(backend, client, monkeypatch):
+    monitor = backend.health_monitor
+    monkeypatch.setattr(monitor, "last", dict(monitor.last, status="failed", error="model crashed"))
+    ready = client.get("/health/ready")
+    assert ready.status_code == 503
+    assert ready.get_json()["status"] == "not_ready"
+
+    health = client.get("/health")
+    assert health.status_code == 500
+    assert health.get_json()["error"] == "Last canary prediction failed"
+    # Liveness does not depend on the model
+    assert client.get("/health/live").status_code == 200
@@ -0,0 +1,135 @@
+import json
+import logging
+import os
+import sys
+
+import pytest
+
+import logging_setup
+from logging_setup import (REQUEST_LOGGER, ForkSafeQueueHandler, JSONFormatter, SamplingFilter,
+                           configure_logging)
+
+
+class Capture(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def make_record(msg, *args, level=logging.INFO, **extra):
+    record = logging.LogRecord("test", level, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+@pytest.fixture
+def restore_logging():
+    """configure_logging replaces the root handlers; put the test session's back."""
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    request_filters = list(logging.getLogger(REQUEST_LOGGER).filters)
+    yield
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        if isinstance(handler, ForkSafeQueueHandler):
+            handler.stop_listener()
+    for handler in handlers:
+        root.addHandler(handler)
+    root.setLevel(level)
+    logging.getLogger(REQUEST_LOGGER).filters = request_filters
+
+
+def test_queue_handler_delivers_records_on_the_listener_thread():
+    target = Capture()
+    handler = ForkSafeQueueHandler([target])
+    try:
+        handler.handle(make_record("scored %s products", 3))
+    finally:
+        handler.stop_listener()
+    [record] = target.records
+    # The message is resolved before it is queued
+    assert (record.msg, record.args) == ("scored 3 products", None)
+
+
+def test_queue_handler_keeps_tracebacks_for_the_formatter():
+    target = Capture()
+    handler = ForkSafeQueueHandler([target])
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        record = logging.LogRecord("test", logging.ERROR, __file__, 1, "failed", None, sys.exc_info())
+    try:
+        handler.handle(record)
+    finally:
+        handler.stop_listener()
+    [queued] = target.records
+    assert queued.exc_info is None
+    assert "ValueError: boom" in queued.exc_text
+    assert "ValueError: boom" in json.loads(JSONFormatter().format(queued))["exception"]
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+def test_forked_child_starts_its_own_listener(tmp_path):
+    path = tmp_path / "child.log"
+    target = logging.FileHandler(path)
+    handler = ForkSafeQueueHandler([target])
+    handler.start_listener()
+    pid = os.fork()
+    if pid == 0:
+        # The parent's listener thread does not exist in the child
+        handler.handle(make_record("from the child"))
+        handler.stop_listener()
+        target.close()
+        os._exit(0)
+    os.waitpid(pid, 0)
+    handler.stop_listener()
+    target.close()
+    assert "from the child" in path.read_text()
+
+
+def test_json_formatter_includes_extra_fields():
+    entry = json.loads(JSONFormatter().format(make_record("ranked", level=logging.WARNING, scanned=7)))
+    assert (entry["message"], entry["level"], entry["scanned"]) == ("ranked", "WARNING", 7)
+    assert entry["process"] == os.getpid()
+
+
+def test_sampling_never_drops_warnings(monkeypatch):
+    monkeypatch.setattr(logging_setup.random, "random", lambda: 0.9)
+    sampler = SamplingFilter(0.5)
+    assert not sampler.filter(make_record("request"))
+    assert sampler.filter(make_record("slow upstream", level=logging.WARNING))
+    assert SamplingFilter(1.0).filter(make_record("request"))
+
+
+def test_configure_logging_writes_json_through_the_queue(tmp_path, monkeypatch, restore_logging):
+    log_file = tmp_path / "app.log"
+    monkeypatch.setenv("NUTRISCORE_LOG_FILE", str(log_file))
+    monkeypatch.setenv("NUTRISCORE_LOG_FORMAT", "json")
+    monkeypatch.setenv("NUTRISCORE_LOG_LEVEL", "INFO")
+    monkeypatch.setenv("NUTRISCORE_LOG_SAMPLE_RATE", "0")
+    configure_logging()
+
+    [handler] = logging.getLogger().handlers
+    assert isinstance(handler, ForkSafeQueueHandler)
+    logging.getLogger("test").info("started", extra={"port": 5000})
+    logging.getLogger(REQUEST_LOGGER).info("sampled out")
+    logging.getLogger(REQUEST_LOGGER).warning("kept")
+    handler.stop_listener()
+
+    entries = [json.loads(line) for line in log_file.read_text().splitlines()]
+    assert [entry["message"] for entry in entries] == ["started", "kept"]
+    assert entries[0]["port"] == 5000
+
+
+def test_configure_logging_sync_mode(monkeypatch, restore_logging):
+    monkeypatch.setenv("NUTRISCORE_LOG_ASYNC", "0")
+    monkeypatch.delenv("NUTRISCORE_LOG_FILE", raising=False)
+    configure_logging()
+    assert [type(handler) for handler in logging.getLogger().handlers] == [logging.StreamHandler]
+
+    monkeypatch.setenv("NUTRISCORE_LOG_FORMAT", "xml")
+    with pytest.raises(ValueError, match="Unknown log format"):
+        configure_logging()
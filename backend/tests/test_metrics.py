@@ -0,0 +1,82 @@
+import os
+import re
+
+import pytest
+
+from conftest import USER
+from metrics import MetricsRegistry, StageTimer, format_labels
+
+
+def sample(text, name, **labels):
+    """Value of the sample `name` whose labels include `labels`."""
+    for line in text.splitlines():
+        match = re.match(r"^(\w+)(?:\{(.*)\})? (\S+)$", line)
+        if not match or match.group(1) != name:
+            continue
+        found = dict(re.findall(r'(\w+)="((?:[^"\\]|\\.)*)"', match.group(2) or ""))
+        if all(found.get(key) == str(value) for key, value in labels.items()):
+            return float(match.group(3))
+    return None
+
+
+def test_summary_quantiles_cover_the_window():
+    registry = MetricsRegistry(window=100, worker_label=False)
+    for value in range(200):
+        registry.observe("latency_seconds", float(value), endpoint="/predict")
+    text = registry.render()
+    assert "# TYPE latency_seconds summary" in text
+    # Only the last 100 observations are in the window; count and sum are all-time
+    assert sample(text, "latency_seconds", quantile=0.5) == pytest.approx(149.5)
+    assert sample(text, "latency_seconds_count", endpoint="/predict") == 200
+    assert sample(text, "latency_seconds_sum") == sum(range(200))
+
+
+def test_counters_and_collectors():
+    registry = MetricsRegistry(worker_label=False)
+    registry.describe("requests_total", "counter", "Requests")
+    registry.inc("requests_total", status=200)
+    registry.inc("requests_total", 2, status=200)
+    registry.add_collector(lambda: [("cache_size", "gauge", "Cache size", [({}, 5)])])
+    text = registry.render()
+    assert "# HELP requests_total Requests" in text
+    assert sample(text, "requests_total", status=200) == 3
+    assert "# TYPE cache_size gauge" in text
+    assert sample(text, "cache_size") == 5
+
+
+def test_samples_carry_the_worker_label():
+    registry = MetricsRegistry()
+    registry.inc("requests_total")
+    assert sample(registry.render(), "requests_total", worker=os.getpid()) == 1
+    assert "worker" not in MetricsRegistry(worker_label=False).render()
+
+
+def test_label_values_are_escaped():
+    assert format_labels({"path": 'a"b\\c\nd'}) == '{path="a\\"b\\\\c\\nd"}'
+
+
+def test_stage_timer_server_timing():
+    timer = StageTimer()
+    with timer.stage("fetch"):
+        pass
+    header = timer.server_timing(0.5)
+    assert header.startswith("fetch;dur=")
+    assert header.endswith("total;dur=500.000")
+
+
+def test_metrics_endpoint_reports_requests(client):
+    client.post("/predict", json={"user": USER, "barcode": "4000000000001"})
+    client.post("/predict", json={"user": USER, "barcode": "abc"})
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.content_type.startswith("text/plain; version=0.0.4")
+
+    text = response.get_data(as_text=True)
+    worker = os.getpid()
+    assert sample(text, "nutriscore_requests_total", endpoint="/predict", status=200, worker=worker) >= 1
+    assert sample(text, "nutriscore_requests_total", endpoint="/predict", status=400, worker=worker) >= 1
+    assert sample(text, "nutriscore_request_duration_seconds_count", endpoint="/predict") >= 2
+    assert sample(text, "nutriscore_request_duration_seconds", endpoint="/predict", quantile=0.99) > 0
+    assert sample(text, "nutriscore_stage_duration_seconds_count", endpoint="/predict", stage="predict") >= 1
+    assert sample(text, "nutriscore_score_cache_size") is not None
+    assert "nutriscore_model_info{version=" in text
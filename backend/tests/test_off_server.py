@@ -0,0 +1,58 @@
+import requests
+
+from off_server import load_csv_products, start_server, synthetic_product
+
+
+def get(server, path):
+    response = requests.get(server.base_url + path, timeout=5)
+    return response.status_code, response.json()
+
+
+def test_serves_products_and_not_found(fresh_upstream):
+    status, body = get(fresh_upstream, "/api/v0/product/3000000000001.json")
+    assert (status, body["status"]) == (200, 1)
+    assert body["product"]["product_name"] == "Cola"
+
+    status, body = get(fresh_upstream, "/api/v0/product/3999999999999.json")
+    assert (status, body["status"], body["status_verbose"]) == (200, 0, "product not found")
+
+    assert get(fresh_upstream, "/stats")[1] == {"requests": 2, "barcodes": 2, "found": 1, "not_found": 1,
+                                               "error": 0}
+    assert get(fresh_upstream, "/stats?barcode=3000000000001")[1]["requests"] == 1
+
+
+def test_fail_first_then_serve(fresh_upstream):
+    fresh_upstream.fail_first = 2
+    statuses = [get(fresh_upstream, "/api/v0/product/3000000000002.json")[0] for _ in range(3)]
+    assert statuses == [503, 503, 200]
+    assert get(fresh_upstream, "/stats")[1]["error"] == 2
+
+
+def test_synthetic_products_and_seeded_errors():
+    def run():
+        server = start_server(synthetic=True, error_rate=0.5, seed=7)
+        try:
+            return [get(server, f"/api/v0/product/{1000 + i}.json") for i in range(20)]
+        finally:
+            server.shutdown()
+
+    first, second = run(), run()
+    assert first == second
+    statuses = {status for status, _ in first}
+    assert statuses == {200, 503}
+    for status, body in first:
+        if status == 200:
+            assert body["product"] == synthetic_product(body["code"])
+
+
+def test_load_products_csv(tmp_path):
+    path = tmp_path / "products.csv"
+    path.write_text("barcode,product_name,sugar_g,sodium_mg,preservatives\n"
+                    "5018374350930,Chocolate Bar,25,50,sodium benzoate\n"
+                    "5018374350931,Apple Juice,20,10,none\n"
+                    "not-a-barcode,Broken,1,1,none\n")
+    products = load_csv_products(str(path))
+    assert set(products) == {"5018374350930", "5018374350931"}
+    assert products["5018374350930"]["nutriments"]["sodium_100g"] == 0.05
+    assert products["5018374350930"]["ingredients_text"] == "sodium benzoate"
+    assert "ingredients_text" not in products["5018374350931"]
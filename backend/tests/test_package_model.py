@@ -0,0 +1,64 @@
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import root_dir
+from forest import FlatForest
+from model_registry import ModelRegistry, file_sha256
+from package_model import package_model
+
+MODEL_PATH = os.path.join(root_dir, "model", "health_score_model.pkl")
+FEATURES_PATH = os.path.join(root_dir, "model", "feature_names.pkl")
+TEST_PATH = os.path.join(root_dir, "data", "test_dataset.csv")
+
+
+@pytest.fixture(scope="module")
+def model():
+    return joblib.load(MODEL_PATH)
+
+
+@pytest.fixture(scope="module")
+def X_test():
+    features = list(joblib.load(FEATURES_PATH))
+    return pd.read_csv(TEST_PATH)[features].to_numpy(dtype=np.float64)
+
+
+def test_packaged_artifact_matches_the_pickle(tmp_path, model, X_test):
+    out = str(tmp_path / "artifact")
+    header = package_model(MODEL_PATH, FEATURES_PATH, out, test_path=TEST_PATH, model_version="v-test")
+
+    assert header["model_version"] == "v-test"
+    assert header["source"]["sha256"] == file_sha256(MODEL_PATH)
+    assert header["feature_names"] == list(joblib.load(FEATURES_PATH))
+    assert header["evaluation"]["identical"] is True
+    assert header["evaluation"]["test_rows"] == len(X_test)
+
+    packaged = FlatForest.load(out)
+    assert isinstance(packaged.feature, np.memmap)
+    assert np.array_equal(packaged.predict(X_test), model.predict(X_test))
+
+
+def test_quantized_artifact_reports_its_drift(tmp_path, X_test):
+    out = str(tmp_path / "artifact")
+    header = package_model(MODEL_PATH, FEATURES_PATH, out, test_path=TEST_PATH,
+                           float32_thresholds=True, quantize_bits=8)
+    assert header["threshold_dtype"] == "float32"
+    assert header["value_quantization"]["bits"] == 8
+    assert header["evaluation"]["max_abs_prediction_diff"] > 0
+    assert abs(header["evaluation"]["delta"]["mae"]) < 1
+
+
+def test_registry_prefers_the_artifact(tmp_path, model, X_test):
+    out = str(tmp_path / "artifact")
+    package_model(MODEL_PATH, FEATURES_PATH, out, model_version="v-test")
+    registry = ModelRegistry(MODEL_PATH, out, str(tmp_path / "missing.json"))
+    loaded = registry.load()
+    assert loaded.source == out
+    assert loaded.version == "v-test"
+    assert np.array_equal(loaded.predict(X_test), model.predict(X_test))
+
+    sklearn = ModelRegistry(MODEL_PATH, out, str(tmp_path / "missing.json"), engine="sklearn").load()
+    assert sklearn.source == MODEL_PATH
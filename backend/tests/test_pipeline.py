@@ -0,0 +1,79 @@
+import json
+import os
+
+import joblib
+import numpy as np
+import pytest
+
+from features import FEATURE_ORDER
+from forest import FlatForest
+from pipeline import parse_args, run
+
+
+@pytest.fixture
+def dump(tmp_path):
+    rng = np.random.default_rng(0)
+    path = tmp_path / "products.tsv"
+    lines = ["code\tproduct_name\tsugars_100g\tsalt_100g\tingredients_text"]
+    # Sugar and salt above the penalty caps keep the scores in a few
+    # buckets, so the stratified split works on a small dataset
+    for i in range(60):
+        ingredients = "water, sugar, sodium benzoate" if i % 3 == 0 else "water, sugar"
+        lines.append(f"{7000000000000 + i}\tProduct {i}\t{rng.uniform(5, 40):.1f}\t"
+                     f"{rng.uniform(3, 4):.2f}\t{ingredients}")
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+
+def pipeline_args(tmp_path, dump, *extra):
+    return parse_args(["--dump", dump, "--num-users", "100", "--samples-per-user", "5",
+                       "--params", '{"n_estimators": 10, "max_depth": 6}',
+                       "--model-version", "v-test",
+                       "--model-dir", str(tmp_path / "model"),
+                       "--cache-dir", str(tmp_path / "cache"), *extra])
+
+
+def test_pipeline_publishes_the_model(tmp_path, dump):
+    metadata = run(pipeline_args(tmp_path, dump))
+    model_dir = tmp_path / "model"
+
+    assert metadata["version"] == "v-test"
+    assert metadata["rows"] == {"train": 350, "test": 150}
+    assert metadata["params"] == {"n_estimators": 10, "max_depth": 6}
+    assert json.loads((model_dir / "model_metadata.json").read_text()) == metadata
+
+    model = joblib.load(model_dir / "health_score_model.pkl")
+    assert joblib.load(model_dir / "feature_names.pkl") == FEATURE_ORDER
+    artifact = FlatForest.load(str(model_dir / "health_score_model"))
+    assert artifact.header["model_version"] == "v-test"
+    assert artifact.header["source"]["sha256"] == metadata["model_sha256"]
+    assert artifact.header["evaluation"]["identical"] is True
+    X = np.random.default_rng(1).uniform(0, 100, size=(20, len(FEATURE_ORDER)))
+    assert np.array_equal(artifact.predict(X), model.predict(X))
+
+
+def test_unchanged_stages_are_cached(tmp_path, dump, capsys):
+    first = run(pipeline_args(tmp_path, dump))
+    capsys.readouterr()
+
+    second = run(pipeline_args(tmp_path, dump))
+    out = capsys.readouterr().out
+    for stage in ("ingest", "features", "split", "tune", "fit", "evaluate"):
+        assert f"[{stage}] cached" in out
+    assert second["pipeline"] == first["pipeline"]
+    assert second["model_sha256"] == first["model_sha256"]
+
+    # Other fixed parameters only re-run the stages that depend on them
+    third = run(pipeline_args(tmp_path, dump, "--force", "split"))
+    out = capsys.readouterr().out
+    assert "[features] cached" in out and "[split] running" in out
+    assert third["model_sha256"] == first["model_sha256"]
+
+
+def test_changed_sampling_reruns_features(tmp_path, dump, capsys):
+    run(pipeline_args(tmp_path, dump))
+    capsys.readouterr()
+    run(pipeline_args(tmp_path, dump, "--seed", "7"))
+    out = capsys.readouterr().out
+    assert "[ingest] cached" in out
+    assert "[features] running" in out and "[fit] running" in out
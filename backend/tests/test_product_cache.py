@@ -0,0 +1,88 @@
+import pytest
+
+import product_cache
+from conftest import USER
+from product_cache import NOT_FOUND, LRUCache, ProductCache
+
+
+class Clock:
+    """Stand-in for the time module, advanced by hand."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(product_cache, "time", clock)
+    return clock
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.set("a", 1, 60)
+    cache.set("b", 2, 60)
+    assert cache.get("a") == 1
+    cache.set("c", 3, 60)
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+    assert cache.evictions == 1
+
+
+def test_entries_expire(clock):
+    cache = ProductCache(maxsize=10, ttl=60, negative_ttl=10)
+    cache.set("1", {"code": "1"})
+    cache.set_not_found("2")
+    clock.now += 30
+    assert cache.get("1") == {"code": "1"}
+    assert cache.get("2") is None
+    clock.now += 31
+    assert cache.get("1") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["expirations"]) == (1, 2, 2)
+
+
+def test_zero_ttl_disables_caching():
+    cache = ProductCache(ttl=0, negative_ttl=0)
+    cache.set("1", {"code": "1"})
+    cache.set_not_found("2")
+    assert cache.get("1") is None and cache.get("2") is None
+
+
+def test_disk_tier_survives_a_new_cache(tmp_path, clock):
+    path = str(tmp_path / "products.db")
+    cache = ProductCache(ttl=60, negative_ttl=10, disk_path=path)
+    cache.set("1", {"code": "1", "nutriments": {"sugars_100g": 3.0}})
+    cache.set_not_found("2")
+
+    restarted = ProductCache(ttl=60, negative_ttl=10, disk_path=path)
+    assert restarted.get("1") == {"code": "1", "nutriments": {"sugars_100g": 3.0}}
+    assert restarted.get("2") is NOT_FOUND
+    assert restarted.stats()["disk_hits"] == 2
+
+    clock.now += 61
+    assert ProductCache(disk_path=path).get("1") is None
+    assert restarted.disk.purge_expired() == 2
+
+
+def test_not_found_is_cached(client, fresh_upstream):
+    for _ in range(3):
+        response = client.post("/predict", json={"user": USER, "barcode": "3999999999998"})
+        assert response.status_code == 400
+        assert "Product not found" in response.get_json()["error"]
+    assert fresh_upstream.stats("3999999999998")["requests"] == 1
+
+
+def test_cached_products_are_not_fetched_again(backend, client, fresh_upstream):
+    assert client.post("/predict", json={"user": USER, "barcode": "3000000000001"}).status_code == 200
+    # Without stored features the product is extracted again from the cache
+    backend.product_features.clear()
+    assert client.post("/predict", json={"user": USER, "barcode": "3000000000001"}).status_code == 200
+    assert fresh_upstream.stats("3000000000001")["requests"] == 1
+    assert client.get("/cache/stats").get_json()["hits"] >= 1
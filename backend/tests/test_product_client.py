@@ -0,0 +1,115 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import utils
+from conftest import USER
+from product_client import HTTPConfig, SingleFlight
+
+
+def run_concurrently(n, fn):
+    barrier = threading.Barrier(n)
+
+    def call():
+        barrier.wait()
+        return fn()
+
+    with ThreadPoolExecutor(max_workers=n) as executor:
+        return [future.result() for future in [executor.submit(call) for _ in range(n)]]
+
+
+def test_single_flight_runs_one_call_per_key():
+    flight = SingleFlight()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.2)
+        return {"code": "1"}
+
+    results = run_concurrently(8, lambda: flight.do("1", slow))
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    assert flight.stats() == {"executed": 1, "coalesced": 7}
+
+    # Once the call has finished, the next one runs again
+    flight.do("1", slow)
+    assert len(calls) == 2
+
+
+def test_single_flight_shares_errors():
+    flight = SingleFlight()
+
+    def failing():
+        time.sleep(0.2)
+        raise ValueError("Product not found")
+
+    def call():
+        try:
+            flight.do("1", failing)
+        except ValueError as e:
+            return str(e)
+
+    assert run_concurrently(4, call) == ["Product not found"] * 4
+    assert flight.executed == 1
+
+
+def test_single_flight_keys_are_independent():
+    flight = SingleFlight()
+    assert [flight.do(key, lambda key=key: key * 2) for key in "ab"] == ["aa", "bb"]
+    assert flight.stats() == {"executed": 2, "coalesced": 0}
+
+
+def test_concurrent_lookups_hit_upstream_once(fresh_upstream):
+    fresh_upstream.latency = 0.2
+    products = run_concurrently(8, lambda: utils.get_product_by_barcode("3000000000002"))
+    assert all(product["product_name"] == "Crackers" for product in products)
+    assert fresh_upstream.stats("3000000000002")["requests"] == 1
+
+
+def test_predict_fetches_product_from_upstream(client, fresh_upstream):
+    response = client.post("/predict", json={"user": USER, "barcode": "3000000000001"})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["product_details"]["name"] == "Cola"
+    assert body["computed_features"]["sugar"] == 10.6
+    assert body["computed_features"]["preservative_count"] == 2
+    assert fresh_upstream.stats("3000000000001")["requests"] == 1
+
+
+def test_retries_after_failed_upstream_requests(client, fresh_upstream):
+    # Two failures are within the default NUTRISCORE_HTTP_RETRIES of 2
+    fresh_upstream.fail_first = 2
+    response = client.post("/predict", json={"user": USER, "barcode": "3000000000001"})
+    assert response.status_code == 200
+    assert fresh_upstream.stats("3000000000001")["requests"] == 3
+
+
+def test_upstream_failure_after_retries(client, fresh_upstream):
+    fresh_upstream.fail_first = 3
+    response = client.post("/predict", json={"user": USER, "barcode": "3000000000001"})
+    assert response.status_code == 503
+    assert fresh_upstream.stats("3000000000001")["requests"] == 3
+
+    # Failures are not cached: the next request reaches the recovered upstream
+    response = client.post("/predict", json={"user": USER, "barcode": "3000000000001"})
+    assert response.status_code == 200
+    assert fresh_upstream.stats("3000000000001")["requests"] == 4
+
+
+@pytest.mark.parametrize("barcode", ["abc", "12a4"])
+def test_invalid_barcodes_are_not_looked_up(client, fresh_upstream, barcode):
+    response = client.post("/predict", json={"user": USER, "barcode": barcode})
+    assert response.status_code == 400
+    assert fresh_upstream.stats()["requests"] == 0
+
+
+def test_http_config_from_env(monkeypatch):
+    monkeypatch.setenv("NUTRISCORE_HTTP_POOL_SIZE", "4")
+    monkeypatch.setenv("NUTRISCORE_HTTP_CONNECT_TIMEOUT", "1.5")
+    monkeypatch.setenv("NUTRISCORE_HTTP_READ_TIMEOUT", "7")
+    config = HTTPConfig.from_env()
+    assert config.pool_size == 4
+    assert config.timeout == (1.5, 7.0)
@@ -0,0 +1,107 @@
+import numpy as np
+import pytest
+
+import product_features
+import utils
+from conftest import USER
+from product_features import ProductFeatureStore
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(product_features, "time", clock)
+    return clock
+
+
+def details(sugar, sodium=0.1, ingredients="water"):
+    return {"sugar": sugar, "sodium": sodium, "ingredients": ingredients}
+
+
+def test_lookup_gathers_stored_rows_in_order(clock):
+    store = ProductFeatureStore(capacity=4, ttl=60)
+    assert store.add("1", details(5.0, ingredients="sugar, sodium benzoate")) == (5.0, 0.1, 1)
+    store.add("2", details(7.0))
+
+    values, found = store.lookup(["2", "3", "1"])
+    np.testing.assert_array_equal(values[0], [7.0, 0.1, 0])
+    assert np.isnan(values[1]).all()
+    np.testing.assert_array_equal(values[2], [5.0, 0.1, 1])
+    assert found[0]["sugar"] == 7.0 and found[1] is None
+    assert (store.stats()["hits"], store.stats()["misses"]) == (2, 1)
+
+
+def test_full_store_reuses_the_oldest_row(clock):
+    store = ProductFeatureStore(capacity=2, ttl=60)
+    for barcode, sugar in (("1", 1.0), ("2", 2.0), ("3", 3.0)):
+        store.add(barcode, details(sugar))
+    values, _ = store.lookup(["1", "2", "3"])
+    assert np.isnan(values[0]).all()
+    assert values[1:, 0].tolist() == [2.0, 3.0]
+    assert store.rows["3"] == 0
+    assert (len(store), store.stats()["evictions"]) == (2, 1)
+
+    # Updating a stored barcode keeps its row
+    store.add("2", details(9.0))
+    assert store.rows["2"] == 1
+    assert store.lookup(["2"])[0][0, 0] == 9.0
+
+
+def test_rows_expire(clock):
+    store = ProductFeatureStore(capacity=2, ttl=60)
+    store.add("1", details(1.0))
+    clock.now += 59
+    assert store.lookup(["1"])[1][0] is not None
+    clock.now += 2
+    values, found = store.lookup(["1"])
+    assert np.isnan(values).all() and found == [None]
+
+
+def test_disabled_store_only_computes_values():
+    for store in (ProductFeatureStore(capacity=0), ProductFeatureStore(ttl=0)):
+        assert store.add("1", details(1.0)) == (1.0, 0.1, 0)
+        assert len(store) == 0
+        assert store.lookup(["1"])[1] == [None]
+
+
+def test_clear(clock):
+    store = ProductFeatureStore(capacity=2)
+    store.add("1", details(1.0))
+    store.clear()
+    assert len(store) == 0 and store.lookup(["1"])[1] == [None]
+    store.add("2", details(2.0))
+    assert store.rows == {"2": 0}
+
+
+def test_from_env(monkeypatch):
+    monkeypatch.setenv("NUTRISCORE_PRODUCT_FEATURES_SIZE", "3")
+    monkeypatch.delenv("NUTRISCORE_PRODUCT_FEATURES_TTL", raising=False)
+    monkeypatch.setenv("NUTRISCORE_CACHE_TTL", "30")
+    store = ProductFeatureStore.from_env()
+    assert (store.capacity, store.ttl) == (3, 30.0)
+
+
+def test_stored_products_skip_fetch_and_extraction(backend, client, fresh_upstream, monkeypatch):
+    first = client.post("/predict", json={"user": USER, "barcode": "3000000000001"}).get_json()
+    utils.product_cache.clear()
+
+    def no_extraction(product):
+        raise AssertionError("stored product extracted again")
+
+    monkeypatch.setattr(backend, "extract_product_details", no_extraction)
+    monkeypatch.setattr(utils, "extract_product_details", no_extraction)
+    second = client.post("/predict", json={"user": USER, "barcode": "3000000000001"}).get_json()
+    batch = client.post("/predict/batch", json={"user": USER, "barcodes": ["3000000000001"] * 2}).get_json()
+    assert second["health_score"] == first["health_score"]
+    assert second["computed_features"] == first["computed_features"]
+    assert [result["health_score"] for result in batch["results"]] == [first["health_score"]] * 2
+    assert fresh_upstream.stats("3000000000001")["requests"] == 1
+    assert client.get("/cache/stats").get_json()["product_features"]["hits"] >= 3
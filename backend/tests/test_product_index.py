@@ -0,0 +1,60 @@
+import pytest
+
+from build_product_index import build_index
+from conftest import USER
+from product_features import CatalogFeatures
+from product_index import SALT_TO_SODIUM, ProductIndex
+from utils import extract_product_details
+
+
+@pytest.fixture
+def salt_only_index(tmp_path):
+    dump = tmp_path / "dump.tsv"
+    dump.write_text("code\tproduct_name\tsugars_100g\tsodium_100g\tsalt_100g\tingredients_text\n"
+                    "5000000000001\tSalted nuts\t4.2\t\t1.3\tpeanuts, salt\n"
+                    "5000000000002\tPlain nuts\t4.0\t\t\tpeanuts\n")
+    path = str(tmp_path / "index.db")
+    build_index(str(dump), path)
+    return ProductIndex(path)
+
+
+def test_lookup_returns_an_off_shaped_product(salt_only_index):
+    product = salt_only_index.get("5000000000001")
+    assert product["product_name"] == "Salted nuts"
+    assert product["nutriments"]["salt_100g"] == 1.3
+    assert salt_only_index.get("5000000000003") is None
+
+
+def test_salt_only_products_get_the_same_sodium_from_every_source(salt_only_index):
+    live = extract_product_details({
+        "code": "5000000000001",
+        "product_name": "Salted nuts",
+        "nutriments": {"sugars_100g": 4.2, "salt_100g": 1.3},
+        "ingredients_text": "peanuts, salt"
+    })
+    indexed = extract_product_details(salt_only_index.get("5000000000001"))
+    catalog = CatalogFeatures.from_index(salt_only_index)
+
+    assert live["sodium"] == 1.3 * SALT_TO_SODIUM
+    assert indexed["sodium"] == live["sodium"]
+    assert catalog.values[0, 1] == live["sodium"]
+    # Without salt or sodium the product has no sodium
+    assert extract_product_details(salt_only_index.get("5000000000002"))["sodium"] == 0
+    assert catalog.values[1, 1] == 0
+
+
+def test_upstream_salt_only_product(client, fresh_upstream, monkeypatch):
+    monkeypatch.setitem(fresh_upstream.products, "3000000000009", {
+        "code": "3000000000009",
+        "product_name": "Salted nuts",
+        "nutriments": {"sugars_100g": 4.2, "salt_100g": 1.3}
+    })
+    body = client.post("/predict", json={"user": USER, "barcode": "3000000000009"}).get_json()
+    assert body["computed_features"]["sodium"] == 1.3 * SALT_TO_SODIUM
+
+
+def test_indexed_product_is_served_offline(client, fresh_upstream):
+    response = client.post("/predict", json={"user": USER, "barcode": "4000000000002"})
+    assert response.status_code == 200
+    assert response.get_json()["product_details"]["name"] == "Muesli"
+    assert fresh_upstream.stats()["requests"] == 0
@@ -0,0 +1,106 @@
+import uuid
+
+import pytest
+
+from conftest import USER
+from profiles import ProfileExistsError, ProfileStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ProfileStore(str(tmp_path / "profiles.db"))
+
+
+def new_id():
+    return f"user-{uuid.uuid4().hex[:8]}"
+
+
+def test_store_keeps_only_scoring_fields(store):
+    stored = store.create(dict(USER, name="Ada"), user_id="ada")
+    assert stored["profile"] == USER
+    assert stored["values"] == (30.0, 70.0, 170.0, 90.0, 0, 0)
+    with pytest.raises(ProfileExistsError):
+        store.create(USER, user_id="ada")
+
+
+def test_profiles_survive_a_new_store(store):
+    store.put("ada", USER)
+    restarted = ProfileStore(store.path)
+    assert restarted.get("ada")["profile"] == USER
+    assert restarted.get("nobody") is None
+    assert restarted.stats()["misses"] == 2
+    restarted.get("ada")
+    assert restarted.stats()["hits"] == 1
+
+
+def test_invalid_profiles_are_not_stored(store):
+    with pytest.raises(ValueError, match="Missing required user fields"):
+        store.create({"age": 30})
+    with pytest.raises(ValueError, match="non-empty string"):
+        store.create(USER, user_id="")
+    with pytest.raises(ValueError, match="Invalid numerical values"):
+        store.put("ada", dict(USER, weight=5))
+    assert store.get("ada") is None
+
+
+def test_create_and_get_a_user(client):
+    user_id = new_id()
+    response = client.post("/users", json=dict(USER, user_id=user_id))
+    assert response.status_code == 201
+    assert response.get_json()["user_id"] == user_id
+
+    body = client.get(f"/users/{user_id}").get_json()
+    assert body["profile"] == USER
+    assert "updated_at" in body
+
+    assert client.post("/users", json=dict(USER, user_id=user_id)).status_code == 409
+
+
+def test_generated_user_id(client):
+    response = client.post("/users", json=USER)
+    assert response.status_code == 201
+    user_id = response.get_json()["user_id"]
+    assert client.get(f"/users/{user_id}").status_code == 200
+
+
+def test_invalid_user_requests(client):
+    assert client.post("/users", json={"age": 30}).status_code == 400
+    assert client.post("/users", json=[USER]).status_code == 400
+    assert client.put(f"/users/{new_id()}", json=dict(USER, age=-1)).status_code == 400
+    response = client.get("/users/nobody-here")
+    assert response.status_code == 404
+    assert response.get_json()["error"] == "Unknown user_id: nobody-here"
+
+
+def test_predict_with_a_stored_user(client):
+    user_id = new_id()
+    assert client.put(f"/users/{user_id}", json=USER).status_code == 200
+    stored = client.post("/predict", json={"user_id": user_id, "barcode": "4000000000001"}).get_json()
+    inline = client.post("/predict", json={"user": USER, "barcode": "4000000000001"}).get_json()
+    assert stored["health_score"] == inline["health_score"]
+    assert stored["computed_features"] == inline["computed_features"]
+
+    # A replaced profile is used by the next prediction
+    client.put(f"/users/{user_id}", json=dict(USER, age=70, diabetes=1))
+    updated = client.post("/predict", json={"user_id": user_id, "barcode": "4000000000001"}).get_json()
+    assert updated["computed_features"]["age"] == 70.0
+    assert updated["computed_features"]["diabetes"] == 1
+
+
+def test_unknown_and_conflicting_users(client):
+    response = client.post("/predict", json={"user_id": "nobody-here", "barcode": "4000000000001"})
+    assert response.status_code == 404
+    response = client.post("/predict", json={"user": USER, "user_id": "x", "barcode": "4000000000001"})
+    assert response.status_code == 400
+
+    body = client.post("/predict/batch", json={"user_id": "nobody-here", "barcodes": ["4000000000001"]}).get_json()
+    assert body["results"][0]["status"] == 404
+
+
+def test_rank_with_a_stored_user(client):
+    user_id = new_id()
+    client.put(f"/users/{user_id}", json=USER)
+    stored = client.post("/rank", json={"user_id": user_id, "k": 3}).get_json()
+    inline = client.post("/rank", json={"user": USER, "k": 3}).get_json()
+    assert len(stored["results"]) == 3
+    assert stored["results"] == inline["results"]
@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+
+from conftest import INDEX_PRODUCTS, USER
+from product_features import CatalogFeatures
+from ranking import rank_products
+
+CATEGORIES = {code: categories.split(",") for code, _, _, _, categories in INDEX_PRODUCTS}
+SUGAR = {code: sugars for code, _, sugars, _, _ in INDEX_PRODUCTS}
+SODIUM = {code: sodium for code, _, _, sodium, _ in INDEX_PRODUCTS}
+
+
+def rank(client, **options):
+    response = client.post("/rank", json=dict({"user": USER, "k": 100}, **options))
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def barcodes(ranking):
+    return {result["barcode"] for result in ranking["results"]}
+
+
+def test_rank_scores_every_product(client):
+    ranking = rank(client)
+    assert ranking["scanned"] == len(INDEX_PRODUCTS)
+    assert barcodes(ranking) == set(SUGAR)
+    scores = [result["health_score"] for result in ranking["results"]]
+    assert scores == sorted(scores, reverse=True)
+    assert [result["rank"] for result in ranking["results"]] == list(range(1, len(INDEX_PRODUCTS) + 1))
+
+
+@pytest.mark.parametrize("category", ["en:snacks", "en:breakfast-cereals", "en:cereals", "EN:Salty-Snacks "])
+def test_category_matches_whole_tags(client, category):
+    tag = category.strip().lower()
+    expected = {code for code, tags in CATEGORIES.items() if tag in tags}
+    ranking = rank(client, category=category)
+    assert barcodes(ranking) == expected
+    assert ranking["scanned"] == len(expected)
+
+
+def test_category_is_not_a_substring_match(client):
+    assert barcodes(rank(client, category="en:snacks")) == {"4000000000004", "4000000000006"}
+    assert rank(client, category="snacks")["results"] == []
+
+
+def test_nutrient_limits(client):
+    ranking = rank(client, max_sugar=8, max_sodium=0.6)
+    expected = {code for code in SUGAR if SUGAR[code] <= 8 and SODIUM[code] <= 0.6}
+    assert barcodes(ranking) == expected
+    for result in ranking["results"]:
+        assert result["computed_features"]["sugar"] <= 8
+        assert result["computed_features"]["sodium"] <= 0.6
+
+
+def test_top_k_matches_single_predictions(client):
+    full = rank(client)["results"]
+    top = rank(client, k=3)["results"]
+    assert top == full[:3]
+    for result in top:
+        single = client.post("/predict", json={"user": USER, "barcode": result["barcode"]}).get_json()
+        assert result["health_score"] == single["health_score"]
+
+
+class ConstantModel:
+    def predict(self, X):
+        return np.full(len(X), 50.0)
+
+
+def test_equal_scores_are_ranked_by_barcode(backend):
+    user = (30.0, 70.0, 170.0, 90.0, 0, 0)
+    for chunk_size in (1, 2, 100):
+        ranking = rank_products(backend.get_catalog(), backend.feature_spec, user, ConstantModel(),
+                                k=3, chunk_size=chunk_size)
+        assert [result["barcode"] for result in ranking["results"]] == sorted(SUGAR)[:3]
+
+
+@pytest.mark.parametrize("options", [{"k": 0}, {"k": "many"}, {"max_sugar": "10"}, {"user": "abc"}])
+def test_invalid_rank_requests(client, options):
+    response = client.post("/rank", json=dict({"user": USER}, **options))
+    assert response.status_code == 400
+
+
+def test_category_masks_stay_within_their_byte_budget(backend):
+    index = backend.product_index
+    n = len(INDEX_PRODUCTS)
+    catalog = CatalogFeatures.from_index(index, category_cache_bytes=2 * n)
+    columns = catalog.codes.nbytes + catalog.values.nbytes
+    assert catalog.nbytes == columns
+
+    for category in ("en:snacks", "en:salty-snacks", "en:breakfast-cereals", "en:snacks"):
+        expected = np.array([category in CATEGORIES[code] for code in sorted(SUGAR)])
+        assert np.array_equal(catalog.category_mask(category), expected)
+        assert catalog.nbytes <= columns + 2 * n
+
+    # A budget smaller than one mask caches nothing, with the same results
+    uncached = CatalogFeatures.from_index(index, category_cache_bytes=n - 1)
+    user = (30.0, 70.0, 170.0, 90.0, 0, 0)
+    for _ in range(2):
+        ranking = rank_products(uncached, backend.feature_spec, user, ConstantModel(), category="en:snacks")
+        assert [result["barcode"] for result in ranking["results"]] == ["4000000000004", "4000000000006"]
+    assert uncached.nbytes == columns
@@ -0,0 +1,120 @@
+import json
+import os
+import shutil
+
+import joblib
+import numpy as np
+import pytest
+from sklearn.dummy import DummyRegressor
+
+from conftest import ADMIN_TOKEN, USER
+
+HEADERS = {"X-Admin-Token": ADMIN_TOKEN}
+
+
+@pytest.fixture
+def publish(backend):
+    """Publish a model where the backend reloads from; the original is restored after the test."""
+    registry = backend.model_registry
+    backup = registry.model_path + ".orig"
+    shutil.copy(registry.model_path, backup)
+
+    def publish(model, version=None):
+        joblib.dump(model, registry.model_path)
+        if version is None:
+            if os.path.exists(registry.metadata_path):
+                os.remove(registry.metadata_path)
+        else:
+            with open(registry.metadata_path, "w") as f:
+                json.dump({"version": version, "training_date": None, "metrics": {}}, f)
+
+    yield publish
+    os.replace(backup, registry.model_path)
+    if os.path.exists(registry.metadata_path):
+        os.remove(registry.metadata_path)
+    registry.reload_now()
+
+
+def constant_model(score, n_features):
+    model = DummyRegressor(strategy="constant", constant=score)
+    return model.fit(np.zeros((1, n_features)), [score])
+
+
+def predict(client):
+    return client.post("/predict", json={"user": USER, "barcode": "4000000000001"}).get_json()
+
+
+def reload(client):
+    return client.post("/admin/model/reload?wait=1", headers=HEADERS)
+
+
+def test_reload_requires_the_admin_token(client):
+    assert client.post("/admin/model/reload?wait=1").status_code == 403
+    assert client.post("/admin/model/reload?wait=1", headers={"X-Admin-Token": "wrong"}).status_code == 403
+
+
+def test_reload_rejected_by_canary(backend, client, publish):
+    before = predict(client)
+    publish(constant_model(250.0, len(backend.FEATURE_ORDER)), "out-of-range")
+
+    response = reload(client)
+    assert response.status_code == 422
+    status = response.get_json()
+    assert status["status"] == "failed"
+    assert "outside [0, 100]" in status["error"]
+
+    # The current model keeps serving
+    after = predict(client)
+    assert after["health_score"] == before["health_score"]
+    assert after["model_version"] == before["model_version"]
+
+
+def test_reload_swaps_in_a_valid_model(backend, client, publish):
+    predict(client)
+    publish(constant_model(42.0, len(backend.FEATURE_ORDER)), "constant")
+
+    response = reload(client)
+    assert response.status_code == 200
+    assert response.get_json()["version"] == "constant"
+    # Scores cached for the previous model are not served
+    body = predict(client)
+    assert (body["health_score"], body["model_version"]) == (42.0, "constant")
+
+
+def test_models_without_metadata_do_not_share_cached_scores(backend, client, publish):
+    n_features = len(backend.FEATURE_ORDER)
+    publish(constant_model(42.0, n_features))
+    assert reload(client).get_json()["version"] == "unknown"
+    assert predict(client)["health_score"] == 42.0
+
+    # Same version, different model
+    publish(constant_model(43.0, n_features))
+    assert reload(client).get_json()["version"] == "unknown"
+    body = predict(client)
+    assert (body["health_score"], body["model_version"]) == (43.0, "unknown")
+
+
+def test_failed_self_test_rolls_back(backend, client, publish, monkeypatch):
+    before = predict(client)
+    registry = backend.model_registry
+    run_self_test = backend.health_monitor.check
+
+    def self_test():
+        if registry.current.version == "bad":
+            raise ValueError("Self-test score out of range")
+        run_self_test()
+
+    monkeypatch.setattr(backend.health_monitor, "check", self_test)
+    publish(constant_model(42.0, len(backend.FEATURE_ORDER)), "bad")
+
+    response = reload(client)
+    assert response.status_code == 422
+    status = response.get_json()
+    assert status["rolled_back"] is True
+    assert "Self-test failed after the swap" in status["error"]
+
+    assert registry.current.version == before["model_version"]
+    assert predict(client)["health_score"] == before["health_score"]
+    ready = client.get("/health/ready")
+    assert ready.status_code == 200
+    assert ready.get_json()["model_version"] == before["model_version"]
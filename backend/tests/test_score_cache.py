@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+
+from features import FEATURE_ORDER
+from score_cache import ScoreCache, parse_quantization
+
+
+class CountingModel:
+    """Scores a row as the sum of its features and counts predicted rows."""
+
+    def __init__(self, offset=0.0):
+        self.offset = offset
+        self.rows = 0
+
+    def predict(self, X):
+        self.rows += len(X)
+        return X.sum(axis=1) + self.offset
+
+
+def rows(*values):
+    return np.array([[value] * len(FEATURE_ORDER) for value in values], dtype=np.float64)
+
+
+def test_only_missing_rows_are_predicted():
+    cache = ScoreCache(maxsize=100, model_version="v1")
+    model = CountingModel()
+    first = cache.predict(model, rows(1, 2))
+    second = cache.predict(model, rows(2, 3, 1))
+    assert model.rows == 3
+    assert np.array_equal(second, model.predict(rows(2, 3, 1)))
+    assert np.array_equal(first, second[[2, 0]])
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (2, 3, 3)
+
+
+def test_new_model_version_drops_scores():
+    cache = ScoreCache(maxsize=100, model_version="v1")
+    cache.predict(CountingModel(), rows(1))
+    cache.set_model_version("v1")
+    assert cache.stats()["invalidations"] == 0
+
+    cache.set_model_version("v2")
+    new_model = CountingModel(offset=100)
+    assert cache.predict(new_model, rows(1))[0] == len(FEATURE_ORDER) + 100
+    assert new_model.rows == 1
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_scores_are_cached_under_the_version_used():
+    cache = ScoreCache(maxsize=100, model_version="v1")
+    old_model = CountingModel()
+    # A request that started before the swap caches under the old version
+    cache.set_model_version("v2")
+    cache.predict(old_model, rows(1), version="v1")
+    new_model = CountingModel(offset=100)
+    assert cache.predict(new_model, rows(1))[0] == len(FEATURE_ORDER) + 100
+
+
+def test_cache_is_bounded():
+    cache = ScoreCache(maxsize=2)
+    cache.predict(CountingModel(), rows(1, 2, 3))
+    stats = cache.stats()
+    assert (stats["size"], stats["evictions"]) == (2, 1)
+
+
+def test_disabled_cache_always_predicts():
+    cache = ScoreCache(maxsize=0)
+    model = CountingModel()
+    cache.predict(model, rows(1))
+    cache.predict(model, rows(1))
+    assert model.rows == 2
+    assert cache.stats()["enabled"] is False
+
+
+def test_quantized_neighbours_share_an_entry():
+    steps = parse_quantization("sugar=0.5, age=1", FEATURE_ORDER)
+    cache = ScoreCache(maxsize=100, quantization_steps=steps)
+    model = CountingModel()
+    X = rows(1, 1)
+    X[0, FEATURE_ORDER.index("sugar")] = 10.1
+    X[1, FEATURE_ORDER.index("sugar")] = 9.9
+    X[1, FEATURE_ORDER.index("age")] = 1.2
+    first = cache.predict(model, X[:1])
+    second = cache.predict(model, X[1:])
+    assert model.rows == 1
+    assert first[0] == second[0]
+    assert cache.stats()["quantized"] is True
+
+
+def test_parse_quantization_rejects_bad_specs():
+    assert not parse_quantization("", FEATURE_ORDER).any()
+    with pytest.raises(ValueError, match="Unknown feature"):
+        parse_quantization("salt=1", FEATURE_ORDER)
+    with pytest.raises(ValueError, match="negative"):
+        parse_quantization("sugar=-1", FEATURE_ORDER)
+
+
+def test_from_env(monkeypatch):
+    monkeypatch.setenv("NUTRISCORE_SCORE_CACHE_SIZE", "5")
+    monkeypatch.setenv("NUTRISCORE_SCORE_CACHE_QUANTIZE", "weight=2")
+    cache = ScoreCache.from_env(FEATURE_ORDER, model_version="v1")
+    assert cache.stats()["max_size"] == 5
+    assert cache.steps[FEATURE_ORDER.index("weight")] == 2
+    assert cache.model_version == "v1"
@@ -0,0 +1,76 @@
+import json
+
+import numpy as np
+import pytest
+
+from tuning import FoldCache, Tuner, tune
+
+SEARCH = dict(n_candidates=4, cv=2, min_resources=5, max_resources=15, n_jobs=1, verbose=False)
+
+
+@pytest.fixture(scope="module")
+def data():
+    rng = np.random.default_rng(0)
+    X = rng.uniform(0, 10, size=(120, 4))
+    y = 3 * X[:, 0] - X[:, 1] + rng.normal(0, 0.5, size=120)
+    return X, y
+
+
+def test_halving_search_refits_the_best_candidate(data):
+    X, y = data
+    model, result = tune(X, y, mode="halving", **SEARCH)
+    assert result["best_params"]["n_estimators"] == 15
+    assert model.get_params()["n_estimators"] == 15
+    assert result["candidates_evaluated"] == len(result["report"])
+    assert result["best_cv_r2"] > 0.8
+
+
+def test_repeated_search_is_served_from_the_fold_cache(tmp_path, data):
+    X, y = data
+    _, first = tune(X, y, mode="random", cache_dir=str(tmp_path), refit=False, **SEARCH)
+    _, second = tune(X, y, mode="random", cache_dir=str(tmp_path), refit=False, **SEARCH)
+    assert first["fits"] > 0
+    assert (second["fits"], second["cached_fits"]) == (0, first["fits"])
+    assert second["best_cv_r2"] == first["best_cv_r2"]
+
+
+def test_fold_cache_is_keyed_by_seed(tmp_path, data):
+    X, y = data
+    _, first = tune(X, y, mode="random", cache_dir=str(tmp_path), refit=False, random_state=1, **SEARCH)
+    _, reseeded = tune(X, y, mode="random", cache_dir=str(tmp_path), refit=False, random_state=2, **SEARCH)
+    assert reseeded["cached_fits"] == 0
+
+    # The same candidate under another seed is fitted again
+    params = {"max_depth": None, "min_samples_split": 2, "min_samples_leaf": 1, "max_features": 1.0}
+    scores = []
+    for seed in (1, 2, 1):
+        tuner = Tuner(X, y, cv=2, cache_dir=str(tmp_path), n_jobs=1, random_state=seed, verbose=False)
+        scores.append(tuner.evaluate(0, params, 5))
+    assert scores[0] != scores[1]
+    assert scores[2] == scores[0]
+
+
+def test_warm_started_folds_match_fresh_fits(data):
+    X, y = data
+    params = {"max_depth": 5, "min_samples_split": 2, "min_samples_leaf": 1, "max_features": "sqrt"}
+    warm = Tuner(X, y, cv=2, n_jobs=1, verbose=False)
+    warm.evaluate(0, params, 5, warm_start=True)
+    fresh = Tuner(X, y, cv=2, n_jobs=1, verbose=False)
+    assert warm.evaluate(0, params, 15, warm_start=True) == fresh.evaluate(0, params, 15)
+
+
+def test_fold_cache_key_includes_the_estimator_arguments():
+    params = {"max_depth": 5, "n_estimators": 10}
+    key = json.loads(FoldCache.key(dict(params, random_state=1), 0, 5))
+    assert key["estimator"]["random_state"] == 1
+    assert FoldCache.key(dict(params, random_state=1), 0, 5) != FoldCache.key(dict(params, random_state=2), 0, 5)
+
+
+def test_exhausted_budget_without_candidates(data):
+    with pytest.raises(RuntimeError, match="time budget"):
+        tune(*data, mode="grid", budget_seconds=0.0, refit=False, **SEARCH)
+
+
+def test_unknown_mode(data):
+    with pytest.raises(ValueError, match="Unknown tuning mode"):
+        tune(*data, mode="bayes", **SEARCH)
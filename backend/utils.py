@@ -1,11 +1,87 @@
 # backend/utils.py
 
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 import requests
+from features import FeatureSpec, additive_matcher
+from metrics import MetricsRegistry
+from product_cache import ProductCache, NOT_FOUND
+from product_index import SALT_TO_SODIUM, ProductIndex
+from product_client import HTTPConfig, SingleFlight, create_session
+from product_features import ProductFeatureStore
+
+# Open Food Facts product endpoint. The base URL can point at a local
+# stand-in such as off_server.py
+PRODUCT_API_BASE_URL = os.environ.get("NUTRISCORE_PRODUCT_API_URL", "https://world.openfoodfacts.org").rstrip("/")
+PRODUCT_API_URL = PRODUCT_API_BASE_URL + "/api/v0/product/{barcode}.json"
+
+# Request, stage and upstream latency metrics exposed on /metrics
+metrics = MetricsRegistry.from_env()
+metrics.describe("nutriscore_upstream_request_duration_seconds", "summary",
+                 "Open Food Facts request latency")
+metrics.describe("nutriscore_upstream_requests_total", "counter",
+                 "Open Food Facts requests by outcome")
+
+# Pooled keep-alive session shared by all upstream product lookups
+http_config = HTTPConfig.from_env()
+http_session = create_session(http_config)
+
+# Concurrent lookups of the same barcode share one upstream request
+product_fetches = SingleFlight()
+
+# Maximum product lookups run in parallel for batch requests
+FETCH_CONCURRENCY = int(os.environ.get("NUTRISCORE_FETCH_CONCURRENCY", http_config.pool_size))
+# Seconds a batch waits for all lookups before reporting the rest as timed out
+FETCH_TIMEOUT = float(os.environ.get("NUTRISCORE_FETCH_TIMEOUT", 15))
+
+# Created on first use so no threads exist before a server forks workers
+_fetch_executor = None
+_fetch_executor_lock = threading.Lock()
+
+# Shared product cache in front of Open Food Facts
+product_cache = ProductCache.from_env()
+
+# Optional offline barcode index built by data/build_product_index.py
+PRODUCT_INDEX_PATH = os.environ.get("NUTRISCORE_PRODUCT_INDEX")
+product_index = ProductIndex(PRODUCT_INDEX_PATH) if PRODUCT_INDEX_PATH else None
+
+# Product-side features of recently scored products, keyed by barcode
+product_features = ProductFeatureStore.from_env()
+
+# In offline mode barcodes missing from the index are never looked up upstream
+OFFLINE_MODE = os.environ.get("NUTRISCORE_OFFLINE", "").lower() in ("1", "true", "yes")
+
+# Features in their default order, for callers that want them by name
+default_features = FeatureSpec()
+
+# Only these product fields are used downstream, so only these are cached
+NUTRIMENT_FIELDS = ("sugars_100g", "sodium_100g", "salt_100g")
+
+def slim_product(product):
+    """
+    Reduce an Open Food Facts product record to the fields used by
+    extract_product_details. Absent fields stay absent.
+    """
+    slim = {field: product[field]
+            for field in ("code", "product_name", "ingredients_text")
+            if field in product}
+    if "nutriments" in product:
+        nutriments = product["nutriments"] or {}
+        slim["nutriments"] = {field: nutriments[field]
+                              for field in NUTRIMENT_FIELDS
+                              if field in nutriments}
+    return slim
 
 def get_product_by_barcode(barcode):
     """
     Fetch product details from Open Food Facts using the product barcode.
-    URL format: https://world.openfoodfacts.org/api/v0/product/<barcode>.json
+    URL format: <PRODUCT_API_BASE_URL>/api/v0/product/<barcode>.json
+
+    Barcodes present in the offline product_index are served locally.
+    Other results, including "Product not found" responses, are served
+    from product_cache when available.
     """
     if not barcode:
         raise ValueError("Barcode cannot be empty")
@@ -13,26 +89,113 @@ def get_product_by_barcode(barcode):
         barcode = str(barcode)  # Ensure barcode is a string
         if not barcode.isdigit():
             raise ValueError("Barcode must contain only digits")
-            
-        url = f"https://world.openfoodfacts.org/api/v0/product/{barcode}.json"
-        response = requests.get(url, timeout=10)
-        
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("status") == 1:  # product is found
-                return data.get("product", {})
-            else:
-                raise ValueError(f"Product not found for barcode: {barcode}")
-        else:
-            raise requests.exceptions.HTTPError(
-                f"HTTP {response.status_code} error fetching product data"
-            )
-            
+
+        if product_index is not None:
+            product = product_index.get(barcode)
+            if product is not None:
+                return product
+        if OFFLINE_MODE:
+            raise ValueError(f"Product not found for barcode: {barcode}")
+
+        cached = product_cache.get(barcode)
+        if cached is NOT_FOUND:
+            raise ValueError(f"Product not found for barcode: {barcode}")
+        if cached is not None:
+            return cached
+
+        return product_fetches.do(barcode, lambda: fetch_product(barcode))
+
     except requests.exceptions.RequestException as e:
         raise ConnectionError(f"Failed to fetch product data: {str(e)}")
     except ValueError as e:
         raise ValueError(f"Invalid barcode format: {str(e)}")
 
+def fetch_product(barcode):
+    """
+    Fetch a product from Open Food Facts on the pooled session and store
+    the outcome in product_cache.
+    """
+    url = PRODUCT_API_URL.format(barcode=barcode)
+    start_time = time.perf_counter()
+    try:
+        response = http_session.get(url, timeout=http_config.timeout)
+    except requests.exceptions.RequestException:
+        metrics.inc("nutriscore_upstream_requests_total", outcome="error")
+        raise
+    finally:
+        metrics.observe("nutriscore_upstream_request_duration_seconds", time.perf_counter() - start_time)
+
+    if response.status_code == 200:
+        data = response.json()
+        if data.get("status") == 1:  # product is found
+            metrics.inc("nutriscore_upstream_requests_total", outcome="found")
+            product = slim_product(data.get("product", {}))
+            product_cache.set(barcode, product)
+            return product
+        else:
+            metrics.inc("nutriscore_upstream_requests_total", outcome="not_found")
+            product_cache.set_not_found(barcode)
+            raise ValueError(f"Product not found for barcode: {barcode}")
+    else:
+        metrics.inc("nutriscore_upstream_requests_total", outcome="error")
+        raise requests.exceptions.HTTPError(
+            f"HTTP {response.status_code} error fetching product data"
+        )
+
+def get_fetch_executor():
+    """Get the shared thread pool used for concurrent product lookups"""
+    global _fetch_executor
+    with _fetch_executor_lock:
+        if _fetch_executor is None:
+            _fetch_executor = ThreadPoolExecutor(
+                max_workers=FETCH_CONCURRENCY,
+                thread_name_prefix="product-fetch"
+            )
+        return _fetch_executor
+
+def lookup_product_details(barcode):
+    """
+    Fetch a product and extract the details used for scoring, storing its
+    product-side features in product_features.
+    """
+    details = extract_product_details(get_product_by_barcode(barcode))
+    product_features.add(barcode, details)
+    return details
+
+def fetch_product_details(barcodes, timeout=None):
+    """
+    Resolve many barcodes concurrently on the shared fetch pool.
+
+    Args:
+        barcodes: iterable of barcodes; duplicates are looked up once
+        timeout: seconds to wait for all lookups (defaults to FETCH_TIMEOUT)
+
+    Returns:
+        dict: barcode -> product details, or the exception raised for that
+        barcode. Lookups still running when the timeout expires are
+        reported as ConnectionError.
+    """
+    if timeout is None:
+        timeout = FETCH_TIMEOUT
+    executor = get_fetch_executor()
+    futures = {executor.submit(lookup_product_details, barcode): barcode
+               for barcode in dict.fromkeys(barcodes)}
+
+    done, not_done = wait(futures, timeout=timeout)
+    results = {}
+    for future in done:
+        try:
+            results[futures[future]] = future.result()
+        except Exception as e:
+            # Reported for this barcode only, not for the whole batch
+            results[futures[future]] = e
+    for future in not_done:
+        future.cancel()
+        results[futures[future]] = ConnectionError(
+            f"Timed out fetching product data after {timeout}s"
+        )
+    return results
+
 def extract_product_details(product):
     """
     Extract key product details required by the system.
@@ -57,7 +220,12 @@ def extract_product_details(product):
     nutriments = product.get("nutriments", {})
     try:
         sugar = float(nutriments.get("sugars_100g", 0))
-        sodium = float(nutriments.get("sodium_100g", 0))
+        # Products that only report salt get sodium derived from it, as
+        # the offline product index does
+        sodium = nutriments.get("sodium_100g")
+        if sodium is None and nutriments.get("salt_100g") is not None:
+            sodium = float(nutriments["salt_100g"]) * SALT_TO_SODIUM
+        sodium = float(sodium if sodium is not None else 0)
         
         if sugar < 0 or sodium < 0:
             raise ValueError("Negative values found in nutritional data")
@@ -65,12 +233,15 @@ def extract_product_details(product):
     except (ValueError, TypeError):
         raise ValueError("Invalid numerical values in nutritional data")
         
+    ingredients = product.get("ingredients_text", "")
     details = {
         "barcode": product["code"],
         "name": product["product_name"],
         "sugar": sugar,
         "sodium": sodium,
-        "ingredients": product.get("ingredients_text", "")
+        "ingredients": ingredients,
+        # IDs of the harmful additives found in the ingredients
+        "additives": additive_matcher.match(ingredients)
     }
     return details
 
@@ -85,77 +256,11 @@ def compute_features(user_data, product_details):
     Returns:
         dict: dictionary of computed features
     """
-    if not user_data or not product_details:
-        raise ValueError("Both user data and product details are required")
-        
-    # Validate user data
-    required_user_fields = ["age", "weight", "height", "sugar_level", "diabetes", "hypertension"]
-    missing_fields = [field for field in required_user_fields if field not in user_data]
-    if missing_fields:
-        raise ValueError(f"Missing required user fields: {', '.join(missing_fields)}")
-        
-    try:
-        # Convert all numeric values to float
-        age = float(user_data["age"])
-        weight = float(user_data["weight"])
-        height = float(user_data["height"])
-        sugar_level = float(user_data["sugar_level"])
-        
-        # Validate ranges
-        if not (0 < age <= 150):
-            raise ValueError("Invalid age value")
-        if not (20 <= weight <= 500):
-            raise ValueError("Invalid weight value")
-        if not (50 <= height <= 250):
-            raise ValueError("Invalid height value")
-            
-    except (ValueError, TypeError):
-        raise ValueError("Invalid numerical values in user data")
-        
-    # Get product data
-    sugar = product_details.get("sugar", 0)
-    sodium = product_details.get("sodium", 0)
-    
-    # Compute normalized features
-    sugar_per_kg = sugar / weight if weight > 0 else 0
-    sodium_per_kg = sodium / weight if weight > 0 else 0
-    
-    # Count harmful preservatives
-    harmful_preservatives = [
-        "sodium nitrate", "aspartame", "high fructose corn syrup",
-        "sodium benzoate", "potassium sorbate", "sodium propionate"
-    ]
-    ingredients_text = product_details.get("ingredients", "").lower()
-    preservative_count = sum(1 for pres in harmful_preservatives if pres in ingredients_text)
-    
-    features = {
-        "age": age,
-        "weight": weight,
-        "height": height,
-        "sugar_level": sugar_level,
-        "diabetes": int(bool(user_data["diabetes"])),
-        "hypertension": int(bool(user_data["hypertension"])),
-        "sugar": sugar,
-        "sodium": sodium,
-        "sugar_per_kg": sugar_per_kg,
-        "sodium_per_kg": sodium_per_kg,
-        "preservative_count": preservative_count
-    }
-    return features
-
-# Model versioning
-MODEL_VERSION = "1.0.0"
-MODEL_METADATA = {
-    "version": MODEL_VERSION,
-    "training_date": "2025-04-21",
-    "metrics": {
-        "r2_score": 0.9920,
-        "mse": 0.0700,
-        "mae": 0.1390,
-        "accuracy": 0.9986
-    }
-}
+    return default_features.as_dict(default_features.row(user_data, product_details)[0])
 
-def get_model_metadata():
-    """Get metadata about the current model version"""
-    return MODEL_METADATA
+def get_cache_stats():
+    """Get hit/miss/eviction counters for the product cache"""
+    stats = product_cache.stats()
+    stats["upstream"] = product_fetches.stats()
+    stats["product_features"] = product_features.stats()
+    return stats
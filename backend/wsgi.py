@@ -0,0 +1,9 @@
+# backend/wsgi.py
+"""
+WSGI entry point for production servers:
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+from app import app, health_monitor, model_registry, warm_up
+
+application = app
@@ -0,0 +1,112 @@
+"""
+Benchmark additive detection in ingredients texts.
+
+    python benchmarks/bench_additives.py
+    python benchmarks/bench_additives.py --patterns 6 100 200 1000 --texts 2000
+
+Compares the original loop (lowercase the text, then one substring search
+per preservative) with AdditiveMatcher, forced to its substring scan and
+to its Aho-Corasick automaton, for dictionaries of increasing size. The
+dictionaries start with the six default preservatives and are padded with
+synthetic E-numbers and names; every method must find the same counts.
+"""
+import argparse
+import os
+import random
+import string
+import sys
+import time
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(root_dir, 'backend'))
+from additives import DEFAULT_ADDITIVES, SCAN_THRESHOLD, AdditiveMatcher
+
+INGREDIENTS = [
+    "sugar", "water", "salt", "wheat flour", "palm oil", "skimmed milk powder", "cocoa butter",
+    "emulsifier (soya lecithin)", "glucose syrup", "citric acid", "natural flavouring",
+    "modified maize starch", "yeast", "sunflower oil", "whey powder", "dextrose", "acidity regulator"
+]
+SUFFIXES = ["", " acid", " extract", " gum", " ester"]
+
+
+def make_dictionary(n_patterns, random_state):
+    """The default preservatives plus synthetic additives, one pattern each."""
+    dictionary = {additive_id: list(patterns) for additive_id, patterns in DEFAULT_ADDITIVES.items()}
+    number = 100
+    while len(dictionary) < n_patterns:
+        name = "".join(random_state.choice(string.ascii_lowercase) for _ in range(random_state.randint(5, 12)))
+        dictionary[f"E{number}"] = [name + random_state.choice(SUFFIXES)]
+        number += 1
+    return dict(list(dictionary.items())[:n_patterns])
+
+
+def make_texts(n_texts, dictionary, random_state):
+    """Ingredients lists of 10-60 items, about a third mentioning some additives."""
+    patterns = [pattern for patterns in dictionary.values() for pattern in patterns]
+    texts = []
+    for _ in range(n_texts):
+        items = [random_state.choice(INGREDIENTS) for _ in range(random_state.randint(10, 60))]
+        if random_state.random() < 0.3:
+            items += random_state.sample(patterns, min(3, len(patterns)))
+        random_state.shuffle(items)
+        text = ", ".join(items)
+        texts.append(text.upper() if random_state.random() < 0.2 else text.capitalize())
+    return texts
+
+
+def original_loop(patterns):
+    """The preservative count from the original compute_features."""
+    def count(ingredients_text):
+        ingredients_text = ingredients_text.lower()
+        return sum(1 for pres in patterns if pres in ingredients_text)
+    return count
+
+
+def time_per_text(count, texts, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        for text in texts:
+            count(text)
+        best = min(best, time.perf_counter() - start_time)
+    return best / len(texts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark additive detection")
+    parser.add_argument("--patterns", type=int, nargs="+", default=[6, 100, 200, 1000])
+    parser.add_argument("--texts", type=int, default=2000, help="ingredients texts per run")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per method (the best is reported)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    random_state = random.Random(args.seed)
+    print(f"Automaton used from {SCAN_THRESHOLD} patterns\n")
+    print(f"{'patterns':>8} {'text chars':>10} {'loop us':>9} {'scan us':>9} {'automaton us':>12} "
+          f"{'build ms':>9} {'speed-up':>8}")
+    for n_patterns in args.patterns:
+        dictionary = make_dictionary(n_patterns, random_state)
+        texts = make_texts(args.texts, dictionary, random_state)
+
+        start_time = time.perf_counter()
+        automaton = AdditiveMatcher(dictionary, scan_threshold=0)
+        build_ms = (time.perf_counter() - start_time) * 1000
+        scan = AdditiveMatcher(dictionary, scan_threshold=float("inf"))
+        loop = original_loop([patterns[0] for patterns in dictionary.values()])
+
+        expected = [loop(text) for text in texts]
+        for matcher in (automaton, scan):
+            if [matcher.count(text) for text in texts] != expected:
+                raise SystemExit(f"Counts differ from the original loop at {n_patterns} patterns")
+
+        loop_s = time_per_text(loop, texts, args.repeat)
+        scan_s = time_per_text(scan.count, texts, args.repeat)
+        automaton_s = time_per_text(automaton.count, texts, args.repeat)
+        chosen_s = automaton_s if n_patterns >= SCAN_THRESHOLD else scan_s
+        mean_chars = sum(len(text) for text in texts) / len(texts)
+        print(f"{n_patterns:>8} {mean_chars:>10.0f} {loop_s * 1e6:>9.1f} {scan_s * 1e6:>9.1f} "
+              f"{automaton_s * 1e6:>12.1f} {build_ms:>9.1f} {loop_s / chosen_s:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,475 @@
+"""
+Benchmark suite for the scoring service and the training pipeline.
+
+    python benchmarks/bench_service.py
+    python benchmarks/bench_service.py --only model features --out before.json
+    python benchmarks/bench_service.py --compare before.json
+
+Groups (all run by default):
+    latency     sequential /predict latency over HTTP, for barcodes the
+                backend has not seen (fetched from the local upstream) and
+                for one repeated barcode (served from the caches)
+    throughput  closed-loop /predict clients at 1, 8 and 64 concurrent
+                clients: requests/s, errors and latency percentiles
+    model       model.predict on one row vs batches of rows
+    features    compute_features and extract_product_details per call
+    pipeline    interaction generation, dump ingestion and product index
+                build rows/s on synthetic data
+
+The HTTP groups start the backend (gunicorn, or the threaded werkzeug
+server where gunicorn is unavailable) and backend/off_server.py serving
+synthetic products as subprocesses, so no request leaves the machine.
+The clients run in this process; on small machines they compete with
+the server for CPU.
+
+Results are written as JSON together with the machine, library versions
+and git commit. --compare prints every metric against an earlier run and
+exits with status 1 if any got worse by more than --tolerance. Only
+compare runs made on the same machine.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import timeit
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import requests
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+backend_dir = os.path.join(root_dir, 'backend')
+benchmarks_dir = os.path.join(root_dir, 'benchmarks')
+for path in (backend_dir, os.path.join(root_dir, 'notebooks'), os.path.join(root_dir, 'data')):
+    sys.path.insert(0, path)
+
+GROUPS = ["latency", "throughput", "model", "features", "pipeline"]
+
+# Backend commands, run inside the backend directory
+BACKEND_COMMANDS = {
+    "gunicorn": [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "wsgi:app"],
+    "werkzeug": [sys.executable, "-c", (
+        "import os\n"
+        "from werkzeug.serving import make_server\n"
+        "from app import app\n"
+        "host, port = os.environ['NUTRISCORE_BIND'].rsplit(':', 1)\n"
+        "make_server(host, int(port), app, threaded=True).serve_forever()\n"
+    )]
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_ready(url, process, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"Server exited with status {process.returncode} before becoming ready")
+        try:
+            if requests.get(url, timeout=1).status_code == 200:
+                return
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(0.2)
+    raise SystemExit(f"Server not ready after {timeout}s: {url}")
+
+
+def stop(process):
+    if process.poll() is None:
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def backend_env(bind, workdir, workers, upstream_url):
+    """Environment of an isolated backend: no log file, caches or offline index."""
+    env = dict(os.environ)
+    for name in ("NUTRISCORE_PRODUCT_INDEX", "NUTRISCORE_OFFLINE", "NUTRISCORE_CACHE_PATH"):
+        env.pop(name, None)
+    env.update({
+        "NUTRISCORE_BIND": bind,
+        "NUTRISCORE_PRODUCT_API_URL": upstream_url,
+        "NUTRISCORE_WORKERS": str(workers),
+        "NUTRISCORE_LOG_FILE": "",
+        "NUTRISCORE_LOG_LEVEL": "WARNING",
+        "NUTRISCORE_PROFILE_DB": os.path.join(workdir, "profiles.db")
+    })
+    return env
+
+
+@contextlib.contextmanager
+def running_service(server, workers, upstream_latency, upstream_error_rate=0.0):
+    """Start a local upstream and the backend, and yield the backend URL."""
+    with tempfile.TemporaryDirectory() as workdir:
+        upstream_url = f"http://127.0.0.1:{free_port()}"
+        upstream = subprocess.Popen(
+            [sys.executable, os.path.join(backend_dir, "off_server.py"), "--synthetic",
+             "--port", upstream_url.rsplit(":", 1)[1], "--latency-ms", str(upstream_latency),
+             "--error-rate", str(upstream_error_rate)],
+            stdout=subprocess.DEVNULL
+        )
+        backend = None
+        try:
+            wait_until_ready(upstream_url + "/stats", upstream)
+            port = free_port()
+            backend = subprocess.Popen(
+                BACKEND_COMMANDS[server], cwd=backend_dir,
+                env=backend_env(f"127.0.0.1:{port}", workdir, workers, upstream_url)
+            )
+            base_url = f"http://127.0.0.1:{port}"
+            wait_until_ready(base_url + "/health/ready", backend)
+            yield base_url
+        finally:
+            if backend is not None:
+                stop(backend)
+            stop(upstream)
+
+
+def random_users(n, random_state):
+    """User profiles in the ranges accepted by the backend."""
+    return [{
+        "age": random_state.randint(18, 80),
+        "weight": random_state.randint(50, 120),
+        "height": random_state.randint(150, 200),
+        "sugar_level": random_state.randint(70, 200),
+        "diabetes": random_state.randint(0, 1),
+        "hypertension": random_state.randint(0, 1)
+    } for _ in range(n)]
+
+
+def latency_summary(latencies, errors, seconds):
+    latencies = np.asarray(latencies) * 1000
+    if not len(latencies):
+        latencies = np.array([np.nan])
+    return {
+        "requests": int(len(latencies)) + errors,
+        "errors": errors,
+        "requests_per_second": (len(latencies) + errors) / seconds if seconds else 0.0,
+        "mean_ms": float(np.mean(latencies)),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "max_ms": float(np.max(latencies))
+    }
+
+
+def timed_requests(session, url, payloads):
+    """POST every payload in turn; returns (latencies of 200 responses, errors, seconds)."""
+    latencies = []
+    errors = 0
+    start_time = time.perf_counter()
+    for payload in payloads:
+        request_start = time.perf_counter()
+        try:
+            ok = session.post(url, json=payload, timeout=30).status_code == 200
+        except requests.exceptions.RequestException:
+            ok = False
+        if ok:
+            latencies.append(time.perf_counter() - request_start)
+        else:
+            errors += 1
+    return latencies, errors, time.perf_counter() - start_time
+
+
+def bench_latency(base_url, args, random_state):
+    users = random_users(1, random_state)
+    first_barcode = 3000000000000
+    session = requests.Session()
+    url = base_url + "/predict"
+    results = {}
+
+    cold = [{"user": users[0], "barcode": str(first_barcode + i)} for i in range(args.requests)]
+    results["new_barcode"] = latency_summary(*timed_requests(session, url, cold))
+    warm = [{"user": users[0], "barcode": str(first_barcode)}] * args.requests
+    results["repeated_barcode"] = latency_summary(*timed_requests(session, url, warm))
+    return results
+
+
+def run_clients(url, n_clients, duration, payloads, seed):
+    """Closed-loop clients, each sending its next request as soon as the last one returns."""
+    latencies = [[] for _ in range(n_clients)]
+    errors = [0] * n_clients
+    deadline = time.perf_counter() + duration
+
+    def client(i):
+        session = requests.Session()
+        random_state = random.Random(seed + i)
+        while time.perf_counter() < deadline:
+            request_start = time.perf_counter()
+            try:
+                ok = session.post(url, json=random_state.choice(payloads), timeout=30).status_code == 200
+            except requests.exceptions.RequestException:
+                ok = False
+            if ok:
+                latencies[i].append(time.perf_counter() - request_start)
+            else:
+                errors[i] += 1
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(n_clients)]
+    start_time = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latency_summary([x for client_latencies in latencies for x in client_latencies],
+                           sum(errors), time.perf_counter() - start_time)
+
+
+def bench_throughput(base_url, args, random_state):
+    users = random_users(1000, random_state)
+    barcodes = [str(4000000000000 + i) for i in range(args.barcodes)]
+    url = base_url + "/predict"
+    payloads = [{"user": random_state.choice(users), "barcode": random_state.choice(barcodes)}
+                for _ in range(10000)]
+    # Fetch every barcode once, so the runs measure the service rather
+    # than the upstream
+    timed_requests(requests.Session(), url, [{"user": users[0], "barcode": barcode} for barcode in barcodes])
+
+    results = {}
+    for n_clients in args.clients:
+        results[f"clients_{n_clients}"] = run_clients(url, n_clients, args.duration, payloads, args.seed)
+        print(f"  {n_clients:>3} clients: {results[f'clients_{n_clients}']['requests_per_second']:,.0f} req/s")
+    return results
+
+
+def per_call(function, min_seconds=0.2, repeat=5):
+    """Best-of-repeat seconds per call, with enough calls per run to last min_seconds."""
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    number = max(number, int(number * min_seconds / 0.2))
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def bench_model(args):
+    import app
+    model = app.model_registry.current.model
+    X = app.feature_spec.from_columns(pd.read_csv(os.path.join(root_dir, "data/test_dataset.csv")))
+    while len(X) < max(args.batch_sizes):
+        X = np.concatenate([X, X])
+    results = {"model_version": app.model_registry.current.version}
+    for size in args.batch_sizes:
+        rows = X[:size]
+        seconds = per_call(lambda: model.predict(rows))
+        results[f"batch_{size}"] = {"call_us": seconds * 1e6, "row_us": seconds * 1e6 / size,
+                                    "rows_per_second": size / seconds}
+    return results
+
+
+def bench_features():
+    import app
+    from off_server import synthetic_product
+    from utils import compute_features, extract_product_details
+
+    product = synthetic_product("5018374350930")
+    details = extract_product_details(product)
+    user = app.SELF_TEST_USER
+    row = app.feature_spec.empty(1)[0]
+    user_values = app.user_values(user)
+    product_values = app.product_values(details)
+    return {
+        "extract_product_details_us": per_call(lambda: extract_product_details(product)) * 1e6,
+        "compute_features_us": per_call(lambda: compute_features(user, details)) * 1e6,
+        "feature_spec_fill_us": per_call(lambda: app.feature_spec.fill(row, user_values, product_values)) * 1e6
+    }
+
+
+def synthetic_dump(path, n_rows, random_state):
+    """Tab-separated dump with the Open Food Facts columns the pipeline reads."""
+    codes = 5000000000000 + np.arange(n_rows)
+    ingredients = np.array(["sugar, water, salt", "sugar, water, salt, sodium benzoate",
+                            "sugar, sodium benzoate, potassium sorbate", "water, aspartame", ""])
+    pd.DataFrame({
+        "code": codes.astype(str),
+        "product_name": [f"Product {code}" for code in codes],
+        "sugars_100g": random_state.uniform(0, 60, n_rows).round(1),
+        "salt_100g": random_state.uniform(0, 3, n_rows).round(2),
+        "ingredients_text": ingredients[random_state.randint(0, len(ingredients), n_rows)],
+        "categories_tags": "en:snacks"
+    }).to_csv(path, sep="\t", index=False)
+
+
+def bench_pipeline(args):
+    from build_product_index import build_index
+    from ingest import read_products
+    from interactions import generate_interactions
+
+    random_state = np.random.RandomState(args.seed)
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir, contextlib.redirect_stdout(io.StringIO()):
+        dump_path = os.path.join(workdir, "dump.csv")
+        synthetic_dump(dump_path, args.dump_rows, random_state)
+
+        products, stats = read_products(dump_path, max_products=None)
+        results["ingest"] = {"rows": stats["rows_parsed"], "seconds": stats["seconds"],
+                             "rows_per_second": stats["rows_per_second"]}
+
+        start_time = time.perf_counter()
+        count = build_index(dump_path, os.path.join(workdir, "index.db"))
+        seconds = time.perf_counter() - start_time
+        results["product_index"] = {"rows": count, "seconds": seconds, "rows_per_second": count / seconds}
+
+        for sampler in ("legacy", "fast"):
+            start_time = time.perf_counter()
+            interactions = generate_interactions(products, num_users=args.users, samples_per_user=10,
+                                                 seed=args.seed, sampler=sampler)
+            seconds = time.perf_counter() - start_time
+            results[f"generate_{sampler}"] = {"rows": len(interactions), "seconds": seconds,
+                                              "rows_per_second": len(interactions) / seconds}
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=root_dir,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def machine_info():
+    import sklearn
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "sklearn": sklearn.__version__,
+        "git_commit": git_commit()
+    }
+
+
+def flatten(results, prefix=""):
+    for key, value in results.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            yield from flatten(value, name)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield name, value
+
+
+def better_direction(metric):
+    """1 if higher is better, -1 if lower is better, 0 if the metric is informational."""
+    if metric.endswith("per_second"):
+        return 1
+    if metric.endswith(("_ms", "_us")) or metric.endswith("errors"):
+        return -1
+    return 0
+
+
+def compare(current, baseline, tolerance):
+    """Print every metric against the baseline and return the number of regressions."""
+    if baseline["machine"].get("platform") != current["machine"].get("platform") or \
+            baseline["machine"].get("cpu_count") != current["machine"].get("cpu_count"):
+        print("Warning: the baseline was recorded on a different machine")
+    before = dict(flatten(baseline["results"]))
+    regressions = 0
+    print(f"\n{'metric':<48} {'baseline':>12} {'current':>12} {'change':>8}")
+    for metric, value in flatten(current["results"]):
+        direction = better_direction(metric)
+        if direction == 0 or metric not in before:
+            continue
+        old = before[metric]
+        change = (value - old) / old if old else 0.0
+        flag = ""
+        if change * direction < -tolerance:
+            flag = "  REGRESSION"
+            regressions += 1
+        elif change * direction > tolerance:
+            flag = "  improved"
+        print(f"{metric:<48} {old:>12.2f} {value:>12.2f} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the scoring service and training pipeline")
+    parser.add_argument("--only", nargs="+", choices=GROUPS, default=GROUPS, metavar="GROUP",
+                        help=f"groups to run ({', '.join(GROUPS)})")
+    parser.add_argument("--out", help="results file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--compare", metavar="BASELINE", help="earlier results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="relative change flagged as a regression")
+    parser.add_argument("--server", choices=["gunicorn", "werkzeug"],
+                        default="werkzeug" if sys.platform == "win32" else "gunicorn")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="gunicorn workers")
+    parser.add_argument("--upstream-latency-ms", type=float, default=0.0,
+                        help="delay added by the local Open Food Facts server")
+    parser.add_argument("--requests", type=int, default=200, help="sequential requests per latency case")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 8, 64])
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per throughput level")
+    parser.add_argument("--barcodes", type=int, default=500, help="distinct barcodes in the throughput mix")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 10, 100, 1000, 10000])
+    parser.add_argument("--dump-rows", type=int, default=200000, help="rows of the synthetic dump")
+    parser.add_argument("--users", type=int, default=10000, help="users of the generated interactions")
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    # In-process groups import the backend; keep it from writing logs or
+    # profiles into the working tree
+    os.environ["NUTRISCORE_LOG_FILE"] = ""
+    os.environ["NUTRISCORE_LOG_LEVEL"] = "WARNING"
+    os.environ.setdefault("NUTRISCORE_PROFILE_DB", os.path.join(tempfile.mkdtemp(), "profiles.db"))
+
+    random_state = random.Random(args.seed)
+    results = {}
+    if "latency" in args.only or "throughput" in args.only:
+        print(f"Starting the backend ({args.server}) and a local upstream")
+        with running_service(args.server, args.workers, args.upstream_latency_ms) as base_url:
+            if "latency" in args.only:
+                print("Benchmarking /predict latency")
+                results["latency"] = bench_latency(base_url, args, random_state)
+            if "throughput" in args.only:
+                print("Benchmarking /predict throughput")
+                results["throughput"] = bench_throughput(base_url, args, random_state)
+    if "model" in args.only:
+        print("Benchmarking model.predict")
+        results["model"] = bench_model(args)
+    if "features" in args.only:
+        print("Benchmarking feature extraction")
+        results["features"] = bench_features()
+    if "pipeline" in args.only:
+        print("Benchmarking generation and ingestion")
+        results["pipeline"] = bench_pipeline(args)
+
+    report = {"machine": machine_info(), "config": vars(args), "results": results}
+    out = args.out or os.path.join(benchmarks_dir, "results",
+                                   f"bench-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+
+    for metric, value in flatten(results):
+        print(f"{metric:<48} {value:>12.2f}")
+    print(f"\nResults written to {out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        if regressions:
+            print(f"\n{regressions} metric(s) regressed by more than {args.tolerance:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,289 @@
+"""
+Open-loop load generator that replays barcode scans against the backend.
+
+    # Against a running backend
+    python benchmarks/loadgen.py --url http://127.0.0.1:5000 --rate 50 --duration 60
+
+    # Start the backend and a local upstream with 80 ms of latency, then
+    # step the arrival rate up
+    python benchmarks/loadgen.py --start-backend --upstream-latency-ms 80 --stages 20:30,50:30,100:30
+
+Requests arrive as a Poisson process at the target rate, whatever the
+backend's response times (open loop), so overload shows up as growing
+latency and errors instead of a lower request rate. Latency is measured
+from each request's scheduled arrival, which includes any time it waited
+for a free client thread.
+
+Barcodes follow a Zipf distribution over a catalog. The catalog starts
+with the barcodes of --barcodes, most frequent first, and is padded with
+synthetic barcodes up to --catalog-size. The local upstream started by
+--start-backend (backend/off_server.py) serves every barcode; against
+the real Open Food Facts the synthetic ones are reported as not found.
+
+Users are the profiles of --profiles, or with --users, profiles drawn
+from the distributions the training data was generated with.
+
+Every --interval seconds a line reports the requests sent and completed,
+achieved requests/s, errors and latency percentiles. --out saves the
+summary and the timeline as JSON.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import requests
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(root_dir, 'notebooks'))
+from bench_service import running_service
+from interactions import generate_user_profiles
+
+
+def parse_stages(text):
+    """'20:30,50:30' -> [(20.0, 30.0), (50.0, 30.0)] as (requests/s, seconds)."""
+    stages = []
+    for stage in text.split(","):
+        try:
+            rate, seconds = (float(value) for value in stage.split(":"))
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"Invalid stage '{stage}', expected RATE:SECONDS")
+        if rate <= 0 or seconds <= 0:
+            raise argparse.ArgumentTypeError(f"Invalid stage '{stage}', rate and seconds must be positive")
+        stages.append((rate, seconds))
+    return stages
+
+
+def load_catalog(path, size):
+    """Barcodes of a CSV (most frequent first), padded with synthetic barcodes up to size."""
+    barcodes = []
+    if path:
+        column = "barcode" if "barcode" in pd.read_csv(path, nrows=0).columns else "code"
+        counts = pd.read_csv(path, usecols=[column], dtype=str)[column].dropna().value_counts()
+        barcodes = [barcode for barcode in counts.index if barcode.isdigit()]
+    next_code = 2000000000000
+    while len(barcodes) < size:
+        barcodes.append(str(next_code))
+        next_code += 1
+    return barcodes
+
+
+def zipf_sampler(n, exponent, random_state):
+    """Function drawing ranks 0..n-1 with probability proportional to 1 / (rank + 1) ** exponent."""
+    weights = 1.0 / np.arange(1, n + 1) ** exponent
+    cumulative = np.cumsum(weights / weights.sum())
+    return lambda: min(int(np.searchsorted(cumulative, random_state.random_sample())), n - 1)
+
+
+def load_users(path, n_users, random_state):
+    """User payloads from a user_profiles.csv style file, or n_users drawn like the training data."""
+    if n_users:
+        profiles = generate_user_profiles(n_users, random_state)
+    else:
+        profiles = pd.read_csv(path)
+    return [{
+        # Keep drawn profiles inside the ranges the backend accepts
+        "age": int(np.clip(row.age, 1, 150)),
+        "weight": int(np.clip(row.weight_kg, 20, 500)),
+        "height": int(np.clip(row.height_cm, 50, 250)),
+        "sugar_level": int(row.sugar_level),
+        "diabetes": int(row.diabetes),
+        "hypertension": int(row.hypertension)
+    } for row in profiles.itertuples(index=False)]
+
+
+class LoadRecorder:
+    """Outcomes of completed requests, as (completion time, latency, status) entries."""
+
+    def __init__(self):
+        self.entries = []
+        self.sent = 0
+        self._in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def started(self):
+        with self._lock:
+            self.sent += 1
+            self._in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self._in_flight)
+
+    def finished(self, done, latency, status):
+        with self._lock:
+            self._in_flight -= 1
+            self.entries.append((done, latency, status))
+
+    @property
+    def in_flight(self):
+        return self._in_flight
+
+
+def summarize(entries, seconds):
+    latencies = np.array([latency for _, latency, status in entries if status == 200]) * 1000
+    statuses = Counter(str(status) for _, _, status in entries)
+    errors = len(entries) - statuses.get("200", 0)
+    summary = {
+        "completed": len(entries),
+        "errors": errors,
+        "error_rate": errors / len(entries) if entries else 0.0,
+        "requests_per_second": len(entries) / seconds if seconds else 0.0,
+        "statuses": dict(statuses)
+    }
+    for name, q in (("p50_ms", 50), ("p90_ms", 90), ("p99_ms", 99), ("max_ms", 100)):
+        summary[name] = float(np.percentile(latencies, q)) if len(latencies) else None
+    return summary
+
+
+def format_ms(value):
+    return f"{value:>8.1f}" if value is not None else f"{'-':>8}"
+
+
+def run(args):
+    random_state = np.random.RandomState(args.seed)
+    catalog = load_catalog(args.barcodes, args.catalog_size)
+    draw_rank = zipf_sampler(len(catalog), args.zipf, random_state)
+    users = load_users(args.profiles, args.users, random_state)
+    stages = args.stages or [(args.rate, args.duration)]
+    url = args.url.rstrip("/") + "/predict"
+
+    recorder = LoadRecorder()
+    sessions = threading.local()
+
+    def send(scheduled, payload):
+        session = getattr(sessions, "session", None)
+        if session is None:
+            session = sessions.session = requests.Session()
+        try:
+            status = session.post(url, json=payload, timeout=args.timeout).status_code
+        except requests.exceptions.Timeout:
+            status = "timeout"
+        except requests.exceptions.RequestException:
+            status = "connection_error"
+        done = time.perf_counter()
+        recorder.finished(done, done - scheduled, status)
+
+    timeline = []
+    stop_reporting = threading.Event()
+
+    def report(start_time):
+        reported = 0
+        sent = 0
+        tick = 1
+        print(f"{'time s':>6} {'target/s':>8} {'sent':>6} {'done':>6} {'rps':>7} {'errors':>6} "
+              f"{'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'in-flight':>9}")
+        while not stop_reporting.wait(max(0.0, start_time + tick * args.interval - time.perf_counter())):
+            entries = recorder.entries[reported:]
+            reported += len(entries)
+            interval = summarize(entries, args.interval)
+            interval.update(time=tick * args.interval, target_rate=target_rate(tick * args.interval),
+                            sent=recorder.sent - sent, in_flight=recorder.in_flight)
+            sent = recorder.sent
+            timeline.append(interval)
+            print(f"{interval['time']:>6.0f} {interval['target_rate']:>8.0f} {interval['sent']:>6} "
+                  f"{interval['completed']:>6} {interval['requests_per_second']:>7.1f} "
+                  f"{interval['errors']:>6} {format_ms(interval['p50_ms'])} {format_ms(interval['p90_ms'])} "
+                  f"{format_ms(interval['p99_ms'])} {interval['in_flight']:>9}")
+            tick += 1
+
+    def target_rate(elapsed):
+        for rate, seconds in stages:
+            if elapsed <= seconds:
+                return rate
+            elapsed -= seconds
+        return 0.0
+
+    executor = ThreadPoolExecutor(max_workers=args.concurrency, thread_name_prefix="loadgen")
+    start_time = time.perf_counter()
+    reporter = threading.Thread(target=report, args=(start_time,), daemon=True)
+    reporter.start()
+
+    # Poisson arrivals: exponential gaps at each stage's rate
+    stage_start = 0.0
+    for rate, seconds in stages:
+        arrival = stage_start
+        while True:
+            arrival += random_state.exponential(1.0 / rate)
+            if arrival >= stage_start + seconds:
+                break
+            payload = {"user": users[random_state.randint(len(users))], "barcode": catalog[draw_rank()]}
+            scheduled = start_time + arrival
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            recorder.started()
+            executor.submit(send, scheduled, payload)
+        stage_start += seconds
+
+    executor.shutdown(wait=True)
+    seconds = time.perf_counter() - start_time
+    stop_reporting.set()
+    reporter.join()
+
+    summary = summarize(recorder.entries, seconds)
+    summary.update(sent=recorder.sent, seconds=seconds, max_in_flight=recorder.max_in_flight)
+    print(f"\nSent {summary['sent']} requests in {seconds:.1f}s: {summary['requests_per_second']:.1f} req/s, "
+          f"{summary['errors']} errors ({summary['error_rate']:.1%}), "
+          f"p50 {format_ms(summary['p50_ms']).strip()} ms, p90 {format_ms(summary['p90_ms']).strip()} ms, "
+          f"p99 {format_ms(summary['p99_ms']).strip()} ms, max in flight {summary['max_in_flight']}")
+    print(f"Responses: {', '.join(f'{status}: {count}' for status, count in sorted(summary['statuses'].items()))}")
+    return {"config": vars(args), "summary": summary, "timeline": timeline}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Replay Zipf-distributed barcode scans against the backend")
+    parser.add_argument("--url", default="http://127.0.0.1:5000", help="backend base URL")
+    parser.add_argument("--start-backend", action="store_true",
+                        help="start the backend and a local Open Food Facts server instead of using --url")
+    parser.add_argument("--server", choices=["gunicorn", "werkzeug"],
+                        default="werkzeug" if sys.platform == "win32" else "gunicorn")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="gunicorn workers with --start-backend")
+    parser.add_argument("--upstream-latency-ms", type=float, default=0.0,
+                        help="delay added by the local upstream with --start-backend")
+    parser.add_argument("--upstream-error-rate", type=float, default=0.0,
+                        help="fraction of local upstream requests that fail with --start-backend")
+    parser.add_argument("--rate", type=float, default=20.0, help="arrivals per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds to run at --rate")
+    parser.add_argument("--stages", type=parse_stages,
+                        help="comma-separated RATE:SECONDS stages, replacing --rate and --duration")
+    parser.add_argument("--interval", type=float, default=1.0, help="seconds per reported line")
+    parser.add_argument("--barcodes", default=os.path.join(root_dir, "data/train_dataset.csv"),
+                        help="CSV with a barcode or code column")
+    parser.add_argument("--catalog-size", type=int, default=5000,
+                        help="barcodes in the mix, padded with synthetic ones")
+    parser.add_argument("--zipf", type=float, default=1.1, help="Zipf exponent of barcode popularity")
+    parser.add_argument("--profiles", default=os.path.join(root_dir, "data/user_profiles.csv"),
+                        help="user profiles CSV")
+    parser.add_argument("--users", type=int, default=0,
+                        help="draw this many profiles like the training data instead of using --profiles")
+    parser.add_argument("--concurrency", type=int, default=256, help="maximum requests in flight")
+    parser.add_argument("--timeout", type=float, default=30.0, help="request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="JSON file for the summary and timeline")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.start_backend:
+        print(f"Starting the backend ({args.server}) and a local upstream "
+              f"({args.upstream_latency_ms:g} ms latency, {args.upstream_error_rate:.0%} errors)")
+        with running_service(args.server, args.workers, args.upstream_latency_ms,
+                             args.upstream_error_rate) as base_url:
+            args.url = base_url
+            report = run(args)
+    else:
+        report = run(args)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
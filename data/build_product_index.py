@@ -0,0 +1,136 @@
+"""
+Build an offline barcode index from the Open Food Facts bulk dump.
+
+The dump (products_mega.csv, tab separated) is streamed in chunks and only
+the fields needed by backend/utils.py:extract_product_details are kept.
+Product categories are kept as well when the dump has them, for
+category-filtered ranking. The result is a SQLite file the backend can
+serve lookups from without network access:
+
+    python data/build_product_index.py data/products_mega.csv data/product_index.db
+
+Point the backend at it with NUTRISCORE_PRODUCT_INDEX=data/product_index.db.
+"""
+import argparse
+import os
+import sqlite3
+import time
+
+import pandas as pd
+
+TEXT_COLUMNS = ["code", "product_name", "ingredients_text", "categories"]
+NUMERIC_COLUMNS = ["sugars_100g", "sodium_100g", "salt_100g"]
+INDEX_COLUMNS = ["code", "product_name", "sugars_100g", "sodium_100g", "salt_100g", "ingredients_text",
+                 "categories"]
+
+# Dump columns the categories are read from, in order of preference
+# (categories_tags holds normalised tags such as "en:breakfast-cereals")
+CATEGORY_COLUMNS = ["categories_tags", "categories_en", "categories"]
+
+SCHEMA = """
+CREATE TABLE products (
+    code TEXT PRIMARY KEY,
+    product_name TEXT,
+    sugars_100g REAL,
+    sodium_100g REAL,
+    salt_100g REAL,
+    ingredients_text TEXT,
+    categories TEXT
+) WITHOUT ROWID
+"""
+
+
+def read_header(dump_path, sep):
+    with open(dump_path, 'r', encoding='utf-8') as f:
+        return f.readline().rstrip('\n').split(sep)
+
+
+def iter_chunks(dump_path, chunk_size=100000, sep='\t'):
+    """Yield cleaned DataFrame chunks holding only the indexed columns."""
+    header = read_header(dump_path, sep)
+    if "code" not in header:
+        raise ValueError(f"'code' column not found in {dump_path}")
+    usecols = [column for column in INDEX_COLUMNS if column in header and column != "categories"]
+    category_column = next((column for column in CATEGORY_COLUMNS if column in header), None)
+    if category_column is not None:
+        usecols.append(category_column)
+
+    for chunk in pd.read_csv(dump_path,
+                             sep=sep,
+                             usecols=usecols,
+                             dtype=str,
+                             chunksize=chunk_size,
+                             encoding='utf-8',
+                             on_bad_lines='skip',
+                             low_memory=False):
+        if category_column is not None:
+            chunk["categories"] = chunk.pop(category_column).str.lower()
+        # Columns missing from the dump are stored as NULL
+        for column in INDEX_COLUMNS:
+            if column not in chunk.columns:
+                chunk[column] = None
+        for column in NUMERIC_COLUMNS:
+            chunk[column] = pd.to_numeric(chunk[column], errors='coerce')
+            # Negative nutrient values are data-entry errors in the dump
+            chunk.loc[chunk[column] < 0, column] = float('nan')
+
+        chunk["code"] = chunk["code"].str.strip()
+        chunk = chunk[chunk["code"].str.fullmatch(r"\d+", na=False)]
+        yield chunk[INDEX_COLUMNS]
+
+
+def build_index(dump_path, index_path, chunk_size=100000, sep='\t'):
+    """
+    Stream the dump into a fresh SQLite index at index_path.
+
+    The index is written to a temporary file and moved into place at the
+    end, so a running backend never sees a half-built index.
+
+    Returns:
+        int: number of products in the index
+    """
+    tmp_path = index_path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    conn = sqlite3.connect(tmp_path)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute(SCHEMA)
+
+    placeholders = ", ".join("?" for _ in INDEX_COLUMNS)
+    insert = f"INSERT OR REPLACE INTO products ({', '.join(INDEX_COLUMNS)}) VALUES ({placeholders})"
+
+    start = time.perf_counter()
+    rows_read = 0
+    for chunk in iter_chunks(dump_path, chunk_size, sep):
+        # NaN becomes NULL in SQLite
+        records = chunk.astype(object).where(chunk.notna(), None).itertuples(index=False, name=None)
+        conn.executemany(insert, records)
+        conn.commit()
+        rows_read += len(chunk)
+        elapsed = time.perf_counter() - start
+        print(f"Indexed {rows_read} rows ({rows_read / elapsed:,.0f} rows/s)")
+
+    count = conn.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+    conn.execute("VACUUM")
+    conn.close()
+    os.replace(tmp_path, index_path)
+
+    print(f"Index written to {index_path}: {count} products")
+    return count
+
+
+if __name__ == "__main__":
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+
+    parser = argparse.ArgumentParser(description="Build an offline barcode index from the Open Food Facts dump")
+    parser.add_argument("dump", nargs="?", default=os.path.join(current_dir, "products_mega.csv"),
+                        help="path to the tab-separated Open Food Facts dump")
+    parser.add_argument("index", nargs="?", default=os.path.join(current_dir, "product_index.db"),
+                        help="path of the SQLite index to write")
+    parser.add_argument("--chunk-size", type=int, default=100000, help="rows read per chunk")
+    parser.add_argument("--sep", default="\t", help="field separator of the dump")
+    args = parser.parse_args()
+
+    build_index(args.dump, args.index, chunk_size=args.chunk_size, sep=args.sep)
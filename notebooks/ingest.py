@@ -0,0 +1,195 @@
+"""
+Streaming ingestion of the Open Food Facts dump (products_mega.csv).
+
+Only the columns used for training are read, numeric columns are parsed
+chunk by chunk, and chunks are either collected in a list and
+concatenated once, or written incrementally to a Parquet/CSV file, so
+peak memory stays close to one chunk plus the filtered result.
+"""
+import os
+import sys
+import time
+
+import pandas as pd
+
+# Training column name -> column name in the dump
+COLUMN_MAP = {
+    'code': 'code',  # Barcode
+    'product_name': 'product_name',
+    'sugars_100g': 'sugars_100g',
+    'salt_100g': 'salt_100g',
+    # Preservatives are counted in it with the backend's matcher
+    'ingredients_text': 'ingredients_text'
+}
+NUMERIC_COLUMNS = ['sugars_100g', 'salt_100g']
+TEXT_COLUMNS = ['code', 'product_name', 'ingredients_text']
+# Rows missing any of these are dropped; a missing ingredients list is
+# kept as empty, as the backend treats it
+REQUIRED_COLUMNS = ['code', 'product_name', 'sugars_100g', 'salt_100g']
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MiB, or None if unavailable."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and KiB elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def read_header(dump_path, sep='\t'):
+    with open(dump_path, 'r', encoding='utf-8') as f:
+        return f.readline().rstrip('\n').split(sep)
+
+
+def iter_product_chunks(dump_path, chunk_size=100000, sep='\t'):
+    """
+    Yield (rows parsed, cleaned chunk) pairs, with the chunk using the
+    training column names.
+
+    Rows with a missing value in a required column, or with a non-numeric
+    sugar/salt value, are dropped, as in the original mega_train.py loop.
+    """
+    header = read_header(dump_path, sep)
+    available = {name: source for name, source in COLUMN_MAP.items() if source in header}
+    if not available:
+        return
+
+    reader = pd.read_csv(dump_path,
+                         sep=sep,
+                         usecols=list(available.values()),
+                         dtype=str,
+                         chunksize=chunk_size,
+                         encoding='utf-8',
+                         on_bad_lines='skip',
+                         low_memory=False)
+    for chunk in reader:
+        rows_parsed = len(chunk)
+        chunk = chunk.rename(columns={source: name for name, source in available.items()})
+        chunk = chunk.dropna(subset=[name for name in REQUIRED_COLUMNS if name in chunk.columns])
+        if 'ingredients_text' in chunk.columns:
+            chunk['ingredients_text'] = chunk['ingredients_text'].fillna('')
+        for column in NUMERIC_COLUMNS:
+            if column in chunk.columns:
+                chunk[column] = pd.to_numeric(chunk[column], errors='coerce').astype('float64')
+        yield rows_parsed, chunk[[name for name in COLUMN_MAP if name in chunk.columns]]
+
+
+class ChunkWriter:
+    """Append product chunks to a Parquet or CSV file."""
+
+    def __init__(self, path):
+        self.path = path
+        self.format = 'parquet' if path.endswith('.parquet') else 'csv'
+        self.tmp_path = path + '.tmp'
+        self._parquet = None
+        self._chunks = 0
+        if self.format == 'parquet':
+            try:
+                import pyarrow
+                import pyarrow.parquet
+            except ImportError:
+                raise ImportError("Writing Parquet requires pyarrow: pip install pyarrow")
+            self._pa = pyarrow
+
+    def write(self, chunk):
+        if self.format == 'parquet':
+            table = self._pa.Table.from_pandas(chunk, preserve_index=False)
+            if self._parquet is None:
+                self._parquet = self._pa.parquet.ParquetWriter(self.tmp_path, table.schema)
+            self._parquet.write_table(table)
+        else:
+            chunk.to_csv(self.tmp_path, mode='w' if self._chunks == 0 else 'a',
+                         header=(self._chunks == 0), index=False)
+        self._chunks += 1
+
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+        if self._chunks:
+            os.replace(self.tmp_path, self.path)
+
+
+def read_products(dump_path, chunk_size=100000, max_products=500000, out_path=None, sep='\t'):
+    """
+    Stream the dump into a products table.
+
+    Args:
+        dump_path: tab-separated Open Food Facts dump
+        chunk_size: rows parsed per chunk
+        max_products: stop after this many products (None reads the whole dump)
+        out_path: optional .parquet or .csv file the chunks are written to
+                  instead of being kept in memory
+
+    Returns:
+        (products_df or None, stats dict with rows, rows/s and peak RSS)
+    """
+    start_time = time.perf_counter()
+    rows_parsed = 0
+    rows_read = 0
+    rows_kept = 0
+    chunks = []
+    writer = ChunkWriter(out_path) if out_path else None
+
+    for parsed, chunk in iter_product_chunks(dump_path, chunk_size, sep):
+        rows_parsed += parsed
+        rows_read += len(chunk)
+        # max_products counts rows before numeric filtering, like the
+        # original loop
+        capped = max_products is not None and rows_read >= max_products
+        chunk = chunk.dropna()
+        rows_kept += len(chunk)
+        if writer:
+            writer.write(chunk)
+        else:
+            chunks.append(chunk)
+
+        elapsed = time.perf_counter() - start_time
+        print(f"Processed chunk, current size: {rows_kept} products "
+              f"({rows_parsed / elapsed:,.0f} rows/s)")
+        if capped:
+            break
+
+    if writer:
+        writer.close()
+
+    elapsed = time.perf_counter() - start_time
+    stats = {
+        'rows_parsed': rows_parsed,
+        'products': rows_kept,
+        'seconds': elapsed,
+        'rows_per_second': rows_parsed / elapsed if elapsed else 0.0,
+        'peak_rss_mb': peak_rss_mb()
+    }
+    peak = f"{stats['peak_rss_mb']:.0f} MiB" if stats['peak_rss_mb'] is not None else "n/a"
+    print(f"Ingested {rows_kept} products in {elapsed:.1f}s "
+          f"({stats['rows_per_second']:,.0f} rows/s, peak RSS {peak})")
+
+    if writer:
+        return None, stats
+    if not chunks:
+        return pd.DataFrame(columns=list(COLUMN_MAP)), stats
+    return pd.concat(chunks, ignore_index=True), stats
+
+
+def load_products(path):
+    """Load a products table written by read_products(out_path=...)."""
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path)
+    return pd.read_csv(path, dtype={column: str for column in TEXT_COLUMNS})
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Ingest the Open Food Facts dump into a products table")
+    parser.add_argument("dump", help="tab-separated Open Food Facts dump")
+    parser.add_argument("out", help="output .parquet or .csv file")
+    parser.add_argument("--chunk-size", type=int, default=100000)
+    parser.add_argument("--max-products", type=int, default=None,
+                        help="stop after this many products (default: whole dump)")
+    args = parser.parse_args()
+
+    read_products(args.dump, chunk_size=args.chunk_size, max_products=args.max_products, out_path=args.out)
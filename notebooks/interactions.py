@@ -0,0 +1,180 @@
+"""
+Vectorized generation of the (user, product) interaction dataset used for
+training.
+
+This computes the same health score formula as the original
+iterrows-based loop in mega_train.py, but with NumPy broadcasting over
+user and product arrays, and streams the result to disk in chunks.
+
+With sampler="legacy" the random draws are made in exactly the same order
+as the original loop (user profiles first, then DataFrame.sample per
+user), so for a fixed seed the same users and products are drawn.
+sampler="fast" draws all product indices at once and is meant for very
+large datasets.
+
+Feature columns are built by the backend's own code: product_values() on
+each product and FeatureSpec.fill_products() for every row, so the model
+is trained on exactly the values it is served with. The preservative
+penalty of the label uses the same preservative_count.
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+from features import FEATURE_ORDER, FeatureSpec, product_values
+from product_index import SALT_TO_SODIUM
+
+# Builds the feature columns in FEATURE_ORDER
+feature_spec = FeatureSpec()
+
+# Column order of the generated dataset
+INTERACTION_COLUMNS = [
+    "user_id", "barcode", "product_name", "sugar", "sodium", "sugar_per_kg",
+    "sodium_per_kg", "preservative_count", "age", "weight", "height",
+    "sugar_level", "diabetes", "hypertension", "health_score"
+]
+
+
+def generate_user_profiles(num_users, random_state):
+    """Draw random user profiles (same distributions as mega_train.py)."""
+    return pd.DataFrame({
+        'age': random_state.normal(30, 10, num_users).astype(int),
+        'weight_kg': random_state.normal(70, 15, num_users).astype(int),
+        'height_cm': random_state.normal(170, 10, num_users).astype(int),
+        'sugar_level': random_state.normal(90, 15, num_users).astype(int),
+        'diabetes': random_state.binomial(1, 0.1, num_users),  # 10% chance of diabetes
+        'hypertension': random_state.binomial(1, 0.15, num_users)  # 15% chance of hypertension
+    })
+
+
+def score_interactions(sugar_per_kg, sodium_per_kg, preservative_count, diabetes, hypertension):
+    """
+    Health score formula, vectorized over arrays of equal shape.
+
+    The penalties are subtracted in the same order as the scalar formula
+    so results match it exactly.
+    """
+    score = 100 - np.minimum(30, sugar_per_kg * 2)  # Sugar penalty
+    score = score - np.minimum(20, sodium_per_kg * 0.01)  # Sodium penalty
+    score = score - np.where(preservative_count > 0, 10, 0)  # Preservative penalty
+    score = score - np.where(diabetes == 1, np.minimum(20, sugar_per_kg * 1), 0)  # Diabetes penalty
+    score = score - np.where(hypertension == 1, np.minimum(15, sodium_per_kg * 0.005), 0)  # Hypertension penalty
+    return np.clip(score, 0, 100)
+
+
+def sample_product_indices(num_products, num_users, num_samples, random_state, sampler="legacy"):
+    """
+    Pick num_samples distinct products for every user.
+
+    Returns:
+        np.ndarray: (num_users, num_samples) array of product row positions
+    """
+    if sampler == "legacy":
+        # Same draws as products_df.sample(num_samples, replace=False) per user
+        return np.array([random_state.choice(num_products, size=num_samples, replace=False)
+                         for _ in range(num_users)], dtype=np.intp).reshape(num_users, num_samples)
+
+    if sampler != "fast":
+        raise ValueError(f"Unknown sampler: {sampler}")
+
+    # Draw with replacement in one call, then redraw the few rows that
+    # picked the same product twice
+    indices = random_state.randint(0, num_products, size=(num_users, num_samples))
+    ordered = np.sort(indices, axis=1)
+    duplicated = np.flatnonzero((ordered[:, 1:] == ordered[:, :-1]).any(axis=1))
+    for row in duplicated:
+        indices[row] = random_state.choice(num_products, size=num_samples, replace=False)
+    return indices.astype(np.intp)
+
+
+def iter_interaction_chunks(products_df, num_users=1000, samples_per_user=10, seed=None,
+                            chunk_users=10000, sampler="legacy"):
+    """
+    Yield the interaction dataset as DataFrame chunks of chunk_users users.
+
+    products_df needs the columns code, product_name, sugars_100g,
+    salt_100g and ingredients_text.
+    """
+    random_state = np.random.RandomState(seed)
+    user_profiles = generate_user_profiles(num_users, random_state)
+
+    # Product-side columns are computed once per product
+    sugars_100g = products_df['sugars_100g'].to_numpy(dtype=np.float64)
+    salt_100g = products_df['salt_100g'].to_numpy(dtype=np.float64)
+    ingredients = products_df['ingredients_text'].fillna('').astype(str)
+    # Per kg of product, as used by the scoring formula
+    sugar_per_kg = sugars_100g * 10
+    sodium_per_kg = salt_100g * 1000
+    # Model inputs, as product_values() computes them from extracted product details
+    product_columns = np.array([
+        product_values({"sugar": sugar, "sodium": salt * SALT_TO_SODIUM, "ingredients": text})
+        for sugar, salt, text in zip(sugars_100g, salt_100g, ingredients)
+    ], dtype=np.float64).reshape(-1, 3)
+    preservative_count = product_columns[:, 2]
+    codes = products_df['code'].to_numpy()
+    names = products_df['product_name'].to_numpy()
+
+    num_samples = min(samples_per_user, len(products_df))
+    users = {column: user_profiles[column].to_numpy() for column in user_profiles.columns}
+    # User-side values as user_values() converts them
+    user_columns = (users['age'].astype(np.float64), users['weight_kg'].astype(np.float64),
+                    users['height_cm'].astype(np.float64), users['sugar_level'].astype(np.float64),
+                    (users['diabetes'] != 0).astype(np.float64), (users['hypertension'] != 0).astype(np.float64))
+
+    for start in range(0, num_users, chunk_users):
+        stop = min(start + chunk_users, num_users)
+        sampled = sample_product_indices(len(products_df), stop - start, num_samples,
+                                         random_state, sampler)
+
+        # Broadcast user columns against each user's sampled products
+        user_rows = np.repeat(np.arange(start, stop), num_samples)
+        product_rows = sampled.ravel()
+
+        diabetes = users['diabetes'][user_rows]
+        hypertension = users['hypertension'][user_rows]
+        X = feature_spec.fill_products(feature_spec.empty(len(user_rows)),
+                                       tuple(column[user_rows] for column in user_columns),
+                                       *product_columns[product_rows].T)
+
+        yield pd.DataFrame({
+            'user_id': user_rows,
+            'barcode': codes[product_rows],
+            'product_name': names[product_rows],
+            **{name: X[:, column] for column, name in enumerate(FEATURE_ORDER)},
+            'health_score': score_interactions(sugar_per_kg[product_rows], sodium_per_kg[product_rows],
+                                               preservative_count[product_rows], diabetes, hypertension)
+        }, columns=INTERACTION_COLUMNS)
+
+
+def generate_interactions(products_df, num_users=1000, samples_per_user=10, seed=None,
+                          out_path=None, chunk_users=10000, sampler="legacy"):
+    """
+    Generate the interaction dataset.
+
+    If out_path is given, chunks are appended to that CSV as they are
+    produced and the number of rows written is returned. Otherwise the
+    whole dataset is returned as one DataFrame.
+    """
+    chunks = iter_interaction_chunks(products_df, num_users, samples_per_user, seed,
+                                     chunk_users, sampler)
+    if out_path is None:
+        frames = list(chunks)
+        if not frames:
+            return pd.DataFrame(columns=INTERACTION_COLUMNS)
+        return pd.concat(frames, ignore_index=True)
+
+    start_time = time.perf_counter()
+    rows_written = 0
+    tmp_path = out_path + ".tmp"
+    for i, chunk in enumerate(chunks):
+        chunk.to_csv(tmp_path, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+        rows_written += len(chunk)
+        elapsed = time.perf_counter() - start_time
+        print(f"Wrote {rows_written} interactions ({rows_written / elapsed:,.0f} rows/s)")
+    if rows_written:
+        os.replace(tmp_path, out_path)
+    return rows_written
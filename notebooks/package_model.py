@@ -0,0 +1,137 @@
+"""
+Package the trained model into a memory-mappable artifact for the backend.
+
+    python notebooks/package_model.py
+    python notebooks/package_model.py --float32-thresholds --quantize 16 --out model/health_score_model_q16
+
+The artifact is a directory holding a JSON header (format version, model
+version, feature order from feature_names.pkl) and one .npy file per node
+array. The accuracy of the packaged model is compared against the original
+pickle on the test set and stored in the header.
+"""
+import argparse
+import hashlib
+import os
+import sys
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(root_dir, 'backend'))
+from forest import FlatForest
+from model_registry import METADATA_FILENAME, read_metadata
+
+# Version of the currently published model, used when none is given
+MODEL_VERSION = (read_metadata(os.path.join(root_dir, 'model', METADATA_FILENAME)) or {}).get("version", "unversioned")
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+def evaluate(y_true, y_pred):
+    return {
+        "r2_score": float(r2_score(y_true, y_pred)),
+        "mse": float(mean_squared_error(y_true, y_pred)),
+        "mae": float(mean_absolute_error(y_true, y_pred))
+    }
+
+
+def package_model(model_path, features_path, out_path, test_path=None,
+                  float32_thresholds=False, quantize_bits=None, model_version=MODEL_VERSION):
+    """
+    Export the pickled forest to an artifact at out_path and report how
+    far its predictions drift from the original model.
+
+    Returns:
+        dict: the artifact header
+    """
+    model = joblib.load(model_path)
+    features = list(joblib.load(features_path))
+    if model.n_features_in_ != len(features):
+        raise ValueError(f"Model expects {model.n_features_in_} features, "
+                         f"{features_path} lists {len(features)}")
+
+    forest = FlatForest.from_sklearn(model)
+    forest.feature_names = features
+    metadata = {
+        "model_version": model_version,
+        "source": {
+            "path": os.path.basename(model_path),
+            "sha256": file_sha256(model_path)
+        }
+    }
+    forest.save(out_path, metadata=metadata,
+                float32_thresholds=float32_thresholds, quantize_bits=quantize_bits)
+
+    packaged = FlatForest.load(out_path)
+    if test_path:
+        test_df = pd.read_csv(test_path)
+        X_test = test_df[features].to_numpy(dtype=np.float64)
+        y_test = test_df["health_score"]
+
+        original_pred = model.predict(X_test)
+        packaged_pred = packaged.predict(X_test)
+        original = evaluate(y_test, original_pred)
+        packed = evaluate(y_test, packaged_pred)
+
+        metadata["evaluation"] = {
+            "test_rows": len(X_test),
+            "original": original,
+            "packaged": packed,
+            "delta": {name: packed[name] - original[name] for name in original},
+            "max_abs_prediction_diff": float(np.abs(packaged_pred - original_pred).max()),
+            "identical": bool(np.array_equal(packaged_pred, original_pred))
+        }
+        # Rewrite with the evaluation included in the header
+        forest.save(out_path, metadata=metadata,
+                    float32_thresholds=float32_thresholds, quantize_bits=quantize_bits)
+        packaged = FlatForest.load(out_path)
+
+    header = packaged.header
+    print(f"Artifact written to {out_path}")
+    print(f"Trees: {header['n_estimators']}, nodes: {header['node_count']}, max depth: {header['max_depth']}")
+    print(f"Thresholds: {header['threshold_dtype']}, leaf quantization: {header['value_quantization']}")
+    print(f"Size: {directory_size(out_path) / 1024:.1f} KiB "
+          f"(pickle: {os.path.getsize(model_path) / 1024:.1f} KiB)")
+
+    evaluation = header.get("evaluation")
+    if evaluation:
+        print(f"\nAccuracy on {evaluation['test_rows']} test rows:")
+        for name in ("r2_score", "mse", "mae"):
+            print(f"{name}: original {evaluation['original'][name]:.6f}, "
+                  f"packaged {evaluation['packaged'][name]:.6f}, "
+                  f"delta {evaluation['delta'][name]:+.6f}")
+        print(f"Max absolute prediction difference: {evaluation['max_abs_prediction_diff']:.6g}")
+        print(f"Identical predictions: {evaluation['identical']}")
+    return header
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Package the trained model as a memory-mappable artifact")
+    parser.add_argument("--model", default=os.path.join(root_dir, "model/health_score_model.pkl"))
+    parser.add_argument("--features", default=os.path.join(root_dir, "model/feature_names.pkl"))
+    parser.add_argument("--out", default=os.path.join(root_dir, "model/health_score_model"))
+    parser.add_argument("--test-data", default=os.path.join(root_dir, "data/test_dataset.csv"),
+                        help="CSV used to report the accuracy delta (empty to skip)")
+    parser.add_argument("--float32-thresholds", action="store_true",
+                        help="store split thresholds as float32")
+    parser.add_argument("--quantize", type=int, choices=[8, 16],
+                        help="store leaf values as 8 or 16 bit integers")
+    parser.add_argument("--model-version", default=MODEL_VERSION)
+    args = parser.parse_args()
+
+    package_model(args.model, args.features, args.out, test_path=args.test_data or None,
+                  float32_thresholds=args.float32_thresholds, quantize_bits=args.quantize,
+                  model_version=args.model_version)
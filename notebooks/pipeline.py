@@ -0,0 +1,372 @@
+"""
+Reproducible training pipeline for the health score model.
+
+    python notebooks/pipeline.py --dump data/products_mega.csv
+    python notebooks/pipeline.py --products data/products.parquet --params '{"n_estimators": 200}'
+
+Stages: ingest -> features -> split -> tune -> fit -> evaluate -> package.
+
+Every stage writes its outputs to .pipeline_cache/<stage>/<key>/, where the
+key hashes the stage parameters, the source of the code it runs and the
+content hashes of its inputs. A stage whose key already has outputs is
+skipped, so changing the scoring formula in interactions.py re-runs
+features and everything after it without reading the dump again. The
+dump itself is keyed by path, size and modification time rather than by
+content, so multi-GB dumps are not read just to be hashed.
+
+The package stage publishes health_score_model.pkl, feature_names.pkl,
+the memory-mappable artifact and model_metadata.json to the model
+directory.
+"""
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+
+import joblib
+import pandas as pd
+import sklearn
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.model_selection import train_test_split
+
+from ingest import load_products, read_products
+from interactions import generate_interactions
+from package_model import evaluate, file_sha256, package_model
+from tuning import tune
+
+notebooks_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(notebooks_dir)
+
+sys.path.insert(0, os.path.join(root_dir, 'backend'))
+from features import FEATURE_ORDER, FeatureSpec
+
+# Models are fit on the same matrix layout the backend builds for serving
+FEATURES = FEATURE_ORDER
+feature_spec = FeatureSpec(FEATURES)
+STAGES = ["ingest", "features", "split", "tune", "fit", "evaluate", "package"]
+METADATA_FILENAME = "model_metadata.json"
+
+
+def json_sha256(value):
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def source_sha256(*filenames):
+    """Hash of the notebook modules a stage runs, so code changes invalidate it."""
+    digest = hashlib.sha256()
+    for filename in filenames:
+        digest.update(filename.encode())
+        with open(os.path.join(notebooks_dir, filename), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def accuracy(mae):
+    """Accuracy as reported by the training scripts: 1 - MAE on the 0-100 scale."""
+    return 1 - mae / 100
+
+
+class StageResult:
+    def __init__(self, name, key, path, outputs, cached):
+        self.name = name
+        self.key = key
+        self.path = path
+        self.outputs = outputs
+        self.cached = cached
+
+    @property
+    def hash(self):
+        """Content hash of the stage outputs, used as input to later stages."""
+        return json_sha256(self.outputs)
+
+    def file(self, name):
+        return os.path.join(self.path, name)
+
+
+class Pipeline:
+    """Runs stages whose outputs are cached under content-derived keys."""
+
+    def __init__(self, cache_dir, force=()):
+        self.cache_dir = cache_dir
+        self.force = set(force)
+        self.timings = {}
+
+    def stage(self, name, inputs, build):
+        """
+        Return the outputs of stage `name` for `inputs`, calling
+        build(out_dir) only if they are not cached yet.
+        """
+        key = json_sha256({"stage": name, "inputs": inputs})
+        out_dir = os.path.join(self.cache_dir, name, key[:16])
+        manifest_path = os.path.join(out_dir, "manifest.json")
+
+        if name not in self.force and os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+            print(f"[{name}] cached ({key[:16]})")
+            self.timings[name] = 0.0
+            return StageResult(name, key, out_dir, manifest["outputs"], cached=True)
+
+        print(f"[{name}] running ({key[:16]})")
+        tmp_dir = out_dir + ".tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+
+        start_time = time.perf_counter()
+        build(tmp_dir)
+        elapsed = time.perf_counter() - start_time
+
+        outputs = {filename: file_sha256(os.path.join(tmp_dir, filename))
+                   for filename in sorted(os.listdir(tmp_dir))}
+        with open(os.path.join(tmp_dir, "manifest.json"), "w") as f:
+            json.dump({"stage": name, "key": key, "inputs": inputs, "outputs": outputs,
+                       "seconds": elapsed}, f, indent=2, default=str)
+        shutil.rmtree(out_dir, ignore_errors=True)
+        os.replace(tmp_dir, out_dir)
+
+        print(f"[{name}] done in {elapsed:.1f}s")
+        self.timings[name] = elapsed
+        return StageResult(name, key, out_dir, outputs, cached=False)
+
+
+def run_ingest(pipeline, args):
+    if args.products:
+        # A products table written by ingest.py is used as-is
+        inputs = {"products": file_sha256(args.products)}
+
+        def build(out_dir):
+            extension = os.path.splitext(args.products)[1]
+            shutil.copyfile(args.products, os.path.join(out_dir, "products" + extension))
+        return pipeline.stage("ingest", inputs, build)
+
+    stat = os.stat(args.dump)
+    inputs = {
+        "dump": os.path.abspath(args.dump),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "max_products": args.max_products,
+        "code": source_sha256("ingest.py")
+    }
+
+    def build(out_dir):
+        read_products(args.dump, chunk_size=args.chunk_size, max_products=args.max_products,
+                      out_path=os.path.join(out_dir, "products.csv"))
+    return pipeline.stage("ingest", inputs, build)
+
+
+def run_features(pipeline, args, ingest):
+    inputs = {
+        "products": ingest.hash,
+        "num_users": args.num_users,
+        "samples_per_user": args.samples_per_user,
+        "seed": args.seed,
+        "sampler": args.sampler,
+        "code": source_sha256("interactions.py")
+    }
+
+    def build(out_dir):
+        products_name = next(name for name in ingest.outputs if name.startswith("products"))
+        products_df = load_products(ingest.file(products_name))
+        generate_interactions(products_df, num_users=args.num_users,
+                              samples_per_user=args.samples_per_user, seed=args.seed,
+                              out_path=os.path.join(out_dir, "interactions.csv"), sampler=args.sampler)
+    return pipeline.stage("features", inputs, build)
+
+
+def run_split(pipeline, args, features):
+    inputs = {"interactions": features.hash, "test_size": args.test_size, "seed": args.seed}
+
+    def build(out_dir):
+        interactions_df = pd.read_csv(features.file("interactions.csv"), dtype={"barcode": str})
+        train_df, test_df = train_test_split(
+            interactions_df,
+            test_size=args.test_size,
+            random_state=args.seed,
+            stratify=interactions_df['health_score'].apply(lambda x: int(x/10))  # Stratify by score range
+        )
+        train_df.to_csv(os.path.join(out_dir, "train.csv"), index=False)
+        test_df.to_csv(os.path.join(out_dir, "test.csv"), index=False)
+        print(f"Train set size: {len(train_df)}, test set size: {len(test_df)}")
+    return pipeline.stage("split", inputs, build)
+
+
+def run_tune(pipeline, args, split):
+    if args.params:
+        # Fixed hyperparameters skip the search entirely
+        inputs = {"params": json.loads(args.params)}
+
+        def build(out_dir):
+            with open(os.path.join(out_dir, "best_params.json"), "w") as f:
+                json.dump(inputs["params"], f, indent=2, sort_keys=True)
+        return pipeline.stage("tune", inputs, build)
+
+    inputs = {
+        "train": split.outputs["train.csv"],
+        "mode": args.tuning_mode,
+        "candidates": args.candidates,
+        "budget_seconds": args.budget,
+        "seed": args.seed,
+        "sklearn": sklearn.__version__,
+        "code": source_sha256("tuning.py")
+    }
+
+    def build(out_dir):
+        train_df = pd.read_csv(split.file("train.csv"))
+        _, result = tune(feature_spec.from_columns(train_df), train_df["health_score"], mode=args.tuning_mode,
+                         n_candidates=args.candidates, budget_seconds=args.budget,
+                         cache_dir=os.path.join(args.cache_dir, "folds"),
+                         random_state=args.seed, refit=False)
+        with open(os.path.join(out_dir, "best_params.json"), "w") as f:
+            json.dump(result["best_params"], f, indent=2, sort_keys=True)
+        with open(os.path.join(out_dir, "tuning_report.json"), "w") as f:
+            json.dump(result, f, indent=2)
+    return pipeline.stage("tune", inputs, build)
+
+
+def load_json(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def run_fit(pipeline, args, split, tuned):
+    inputs = {
+        "train": split.outputs["train.csv"],
+        "params": tuned.outputs["best_params.json"],
+        "features": FEATURES,
+        "feature_code": file_sha256(os.path.join(root_dir, "backend", "features.py")),
+        "seed": args.seed,
+        "sklearn": sklearn.__version__
+    }
+
+    def build(out_dir):
+        params = load_json(tuned.file("best_params.json"))
+        train_df = pd.read_csv(split.file("train.csv"))
+        model = RandomForestRegressor(random_state=args.seed, n_jobs=-1, **params)
+        model.fit(feature_spec.from_columns(train_df), train_df["health_score"])
+        # n_jobs is a runtime setting, not part of the model
+        model.set_params(n_jobs=None)
+        joblib.dump(model, os.path.join(out_dir, "health_score_model.pkl"))
+        joblib.dump(FEATURES, os.path.join(out_dir, "feature_names.pkl"))
+    return pipeline.stage("fit", inputs, build)
+
+
+def run_evaluate(pipeline, args, split, fit):
+    inputs = {"model": fit.hash, "train": split.outputs["train.csv"], "test": split.outputs["test.csv"]}
+
+    def build(out_dir):
+        model = joblib.load(fit.file("health_score_model.pkl"))
+        metrics = {}
+        for name in ("train", "test"):
+            df = pd.read_csv(split.file(f"{name}.csv"))
+            scores = evaluate(df["health_score"], model.predict(feature_spec.from_columns(df)))
+            scores["accuracy"] = accuracy(scores["mae"])
+            scores["rows"] = len(df)
+            metrics[name] = scores
+            print(f"{name.title()} R2 {scores['r2_score']:.4f}, MSE {scores['mse']:.4f}, "
+                  f"MAE {scores['mae']:.4f}, accuracy {100 * scores['accuracy']:.2f}%")
+        with open(os.path.join(out_dir, "metrics.json"), "w") as f:
+            json.dump(metrics, f, indent=2)
+    return pipeline.stage("evaluate", inputs, build)
+
+
+def publish_file(src, dst):
+    tmp_path = dst + ".tmp"
+    shutil.copyfile(src, tmp_path)
+    os.replace(tmp_path, dst)
+
+
+def run_package(args, stages):
+    """Publish the model, feature names, artifact and metadata sidecar."""
+    fit, evaluated, tuned = stages["fit"], stages["evaluate"], stages["tune"]
+    model_sha256 = fit.outputs["health_score_model.pkl"]
+    version = args.model_version or f"{datetime.date.today():%Y.%m.%d}-{model_sha256[:8]}"
+    metrics = load_json(evaluated.file("metrics.json"))
+
+    print(f"[package] publishing model {version} to {args.model_dir}")
+    os.makedirs(args.model_dir, exist_ok=True)
+    model_path = os.path.join(args.model_dir, "health_score_model.pkl")
+    features_path = os.path.join(args.model_dir, "feature_names.pkl")
+    publish_file(fit.file("health_score_model.pkl"), model_path)
+    publish_file(fit.file("feature_names.pkl"), features_path)
+    package_model(model_path, features_path, os.path.join(args.model_dir, "health_score_model"),
+                  test_path=stages["split"].file("test.csv"), model_version=version)
+
+    test_metrics = metrics["test"]
+    metadata = {
+        "version": version,
+        "training_date": datetime.date.today().isoformat(),
+        "metrics": {name: test_metrics[name] for name in ("r2_score", "mse", "mae", "accuracy")},
+        "train_metrics": {name: metrics["train"][name] for name in ("r2_score", "mse", "mae", "accuracy")},
+        "rows": {"train": metrics["train"]["rows"], "test": test_metrics["rows"]},
+        "features": FEATURES,
+        "params": load_json(tuned.file("best_params.json")),
+        "model_sha256": model_sha256,
+        "sklearn_version": sklearn.__version__,
+        "pipeline": {name: result.key[:16] for name, result in stages.items()}
+    }
+    # The sidecar is written last, so it never describes a model that is
+    # not in place yet
+    metadata_path = os.path.join(args.model_dir, METADATA_FILENAME)
+    with open(metadata_path + ".tmp", "w") as f:
+        json.dump(metadata, f, indent=2)
+    os.replace(metadata_path + ".tmp", metadata_path)
+    print(f"[package] metadata written to {metadata_path}")
+    return metadata
+
+
+def run(args):
+    pipeline = Pipeline(args.cache_dir, force=args.force)
+    start_time = time.perf_counter()
+
+    stages = {}
+    stages["ingest"] = run_ingest(pipeline, args)
+    stages["features"] = run_features(pipeline, args, stages["ingest"])
+    stages["split"] = run_split(pipeline, args, stages["features"])
+    stages["tune"] = run_tune(pipeline, args, stages["split"])
+    stages["fit"] = run_fit(pipeline, args, stages["split"], stages["tune"])
+    stages["evaluate"] = run_evaluate(pipeline, args, stages["split"], stages["fit"])
+    metadata = run_package(args, stages)
+
+    elapsed = time.perf_counter() - start_time
+    cached = [name for name, result in stages.items() if result.cached]
+    print(f"\nPipeline finished in {elapsed:.1f}s (cached stages: {', '.join(cached) or 'none'})")
+    return metadata
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Train, evaluate and package the health score model")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--dump", default=os.path.join(root_dir, "data/products_mega.csv"),
+                        help="tab-separated Open Food Facts dump")
+    source.add_argument("--products", help="products table written by ingest.py (.csv or .parquet)")
+    parser.add_argument("--max-products", type=int, default=500000,
+                        help="products read from the dump (0 reads the whole dump)")
+    parser.add_argument("--chunk-size", type=int, default=100000)
+    parser.add_argument("--num-users", type=int, default=1000)
+    parser.add_argument("--samples-per-user", type=int, default=10)
+    parser.add_argument("--sampler", choices=["legacy", "fast"], default="legacy")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--test-size", type=float, default=0.3)
+    parser.add_argument("--tuning-mode", choices=["halving", "random", "grid"],
+                        default=os.environ.get("NUTRISCORE_TUNING_MODE", "halving"))
+    parser.add_argument("--candidates", type=int, default=81)
+    parser.add_argument("--budget", type=float, default=os.environ.get("NUTRISCORE_TUNING_BUDGET") or None,
+                        help="tuning wall-clock budget in seconds")
+    parser.add_argument("--params", help="fixed hyperparameters as JSON, skipping the search")
+    parser.add_argument("--model-version", help="version recorded in the metadata (default: date and model hash)")
+    parser.add_argument("--model-dir", default=os.path.join(root_dir, "model"))
+    parser.add_argument("--cache-dir", default=os.path.join(notebooks_dir, ".pipeline_cache"))
+    parser.add_argument("--force", nargs="*", default=[], choices=STAGES[:-1], metavar="STAGE",
+                        help="re-run these stages even if cached")
+    args = parser.parse_args(argv)
+    if args.max_products == 0:
+        args.max_products = None
+    return args
+
+
+if __name__ == "__main__":
+    run(parse_args())
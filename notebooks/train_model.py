@@ -4,14 +4,17 @@ from sklearn.ensemble import RandomForestRegressor
 from sklearn.metrics import mean_squared_error, r2_score
 import joblib
 import numpy as np
+import sys
+
+sys.path.insert(0, '../backend')
+from features import FEATURE_ORDER, FeatureSpec
 
 # Load the merged dataset
 df = pd.read_csv('../data/merged_dataset.csv')
 
 # Define the feature columns and the target variable
-features = ["age", "weight", "height", "sugar_level", "diabetes", "hypertension", 
-            "sugar", "sodium", "sugar_per_kg", "sodium_per_kg", "preservative_count"]
-X = df[features]
+features = FEATURE_ORDER
+X = FeatureSpec(features).from_columns(df)
 y = df["health_score"]
 
 # Split dataset into training and testing sets (80% train, 20% test)
@@ -0,0 +1,312 @@
+"""
+Hyperparameter search for the health score RandomForestRegressor.
+
+Three modes are available:
+
+- "halving": successive halving over randomly sampled candidates, using
+  the number of trees as the resource. Every rung keeps the best third of
+  the candidates and triples their trees. Surviving fold models are grown
+  with warm_start instead of being refit from scratch.
+- "random": randomized search at the full number of trees.
+- "grid": the exhaustive grid previously used in mega_train.py.
+
+All modes respect an optional wall-clock budget, cache fold results on
+disk so repeated runs on the same data are free, and record wall-clock
+and CPU time for every candidate.
+"""
+import hashlib
+import json
+import math
+import os
+import sys
+import time
+
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import r2_score
+from sklearn.model_selection import KFold, ParameterGrid, ParameterSampler
+
+# 'auto' is no longer accepted by sklearn; for regressors it meant all
+# features, which is max_features=1.0
+PARAM_SPACE = {
+    'max_depth': [None, 20, 30, 40, 50],
+    'min_samples_split': [2, 5, 10, 15],
+    'min_samples_leaf': [1, 2, 4, 6],
+    'max_features': [1.0, 'sqrt', 'log2']
+}
+GRID_N_ESTIMATORS = [200, 300, 400, 500]
+
+
+def data_fingerprint(X, y):
+    """Hash of the training data, used to key cached fold results."""
+    digest = hashlib.sha1()
+    digest.update(np.ascontiguousarray(X, dtype=np.float64).tobytes())
+    digest.update(np.ascontiguousarray(y, dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+
+class FoldCache:
+    """
+    On-disk cache of fold scores keyed by data, fold and every argument
+    the fold's estimator is built with, including its random_state.
+    """
+
+    def __init__(self, cache_dir, fingerprint):
+        self.path = None
+        self.entries = {}
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            self.path = os.path.join(cache_dir, f"folds-{fingerprint[:16]}.json")
+            if os.path.exists(self.path):
+                with open(self.path) as f:
+                    self.entries = json.load(f)
+
+    @staticmethod
+    def key(estimator_params, fold, n_splits):
+        return json.dumps({"estimator": estimator_params, "fold": fold, "n_splits": n_splits},
+                          sort_keys=True)
+
+    def get(self, estimator_params, fold, n_splits):
+        return self.entries.get(self.key(estimator_params, fold, n_splits))
+
+    def set(self, estimator_params, fold, n_splits, result):
+        self.entries[self.key(estimator_params, fold, n_splits)] = result
+
+    def save(self):
+        if self.path:
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self.entries, f)
+            os.replace(tmp_path, self.path)
+
+
+class BudgetExceeded(Exception):
+    pass
+
+
+class Tuner:
+    """
+    Cross-validated evaluation of forest candidates with fold caching,
+    warm-started forests and a wall-clock budget.
+    """
+
+    def __init__(self, X, y, cv=5, budget_seconds=None, cache_dir=None, n_jobs=-1,
+                 random_state=42, verbose=True):
+        self.X = np.asarray(X, dtype=np.float64)
+        self.y = np.asarray(y, dtype=np.float64)
+        self.folds = list(KFold(n_splits=cv).split(self.X))
+        self.budget_seconds = budget_seconds
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+        self.verbose = verbose
+        self.cache = FoldCache(cache_dir, data_fingerprint(self.X, self.y))
+        self.start_time = time.perf_counter()
+        # (candidate id, fold) -> fitted forest kept for warm starts
+        self.fold_models = {}
+        self.report = []
+        self.fits = 0
+        self.cached_fits = 0
+
+    def elapsed(self):
+        return time.perf_counter() - self.start_time
+
+    def check_budget(self):
+        if self.budget_seconds is not None and self.elapsed() > self.budget_seconds:
+            raise BudgetExceeded()
+
+    def evaluate(self, candidate_id, params, n_estimators, warm_start=False):
+        """Mean cross-validated R2 of one candidate, recorded in the report."""
+        self.check_budget()
+        full_params = dict(params, n_estimators=n_estimators)
+        # Everything that changes the fitted trees; n_jobs and warm_start
+        # do not, warm-started forests draw the same tree seeds
+        estimator_params = dict(full_params, random_state=self.random_state)
+        scores = []
+        wall = cpu = 0.0
+        cached_folds = 0
+
+        for fold, (train_idx, val_idx) in enumerate(self.folds):
+            cached = self.cache.get(estimator_params, fold, len(self.folds))
+            if cached is not None:
+                scores.append(cached["score"])
+                cached_folds += 1
+                continue
+
+            wall_start, cpu_start = time.perf_counter(), time.process_time()
+            model = self.fold_models.get((candidate_id, fold)) if warm_start else None
+            if model is None:
+                model = RandomForestRegressor(random_state=self.random_state, n_jobs=self.n_jobs,
+                                              warm_start=warm_start, **params)
+            # With warm_start only the additional trees are fitted
+            model.set_params(n_estimators=n_estimators)
+            model.fit(self.X[train_idx], self.y[train_idx])
+            score = r2_score(self.y[val_idx], model.predict(self.X[val_idx]))
+            fold_wall = time.perf_counter() - wall_start
+            fold_cpu = time.process_time() - cpu_start
+
+            if warm_start:
+                self.fold_models[(candidate_id, fold)] = model
+            self.cache.set(estimator_params, fold, len(self.folds),
+                           {"score": score, "wall_seconds": fold_wall, "cpu_seconds": fold_cpu})
+            scores.append(score)
+            wall += fold_wall
+            cpu += fold_cpu
+
+        self.fits += len(self.folds) - cached_folds
+        self.cached_fits += cached_folds
+        self.cache.save()
+
+        entry = {
+            "candidate": candidate_id,
+            "params": full_params,
+            "mean_r2": float(np.mean(scores)),
+            "std_r2": float(np.std(scores)),
+            "wall_seconds": wall,
+            "cpu_seconds": cpu,
+            "cached_folds": cached_folds
+        }
+        self.report.append(entry)
+        if self.verbose:
+            print(f"[{self.elapsed():7.1f}s] candidate {candidate_id:3d} trees={n_estimators:4d} "
+                  f"r2={entry['mean_r2']:.4f} wall={wall:6.2f}s cpu={cpu:6.2f}s "
+                  f"cached={cached_folds}/{len(self.folds)} {params}")
+        return entry["mean_r2"]
+
+    def drop_models(self, candidate_ids):
+        for key in [key for key in self.fold_models if key[0] in candidate_ids]:
+            del self.fold_models[key]
+
+
+def successive_halving(tuner, candidates, min_resources=50, max_resources=500, factor=3):
+    """
+    Evaluate all candidates with few trees, keep the best 1/factor and
+    multiply their trees by factor until one candidate or the maximum
+    number of trees is left.
+    """
+    survivors = list(enumerate(candidates))
+    n_estimators = min_resources
+    best = None
+    try:
+        while True:
+            scored = [(tuner.evaluate(cid, params, n_estimators, warm_start=True), cid, params)
+                      for cid, params in survivors]
+            scored.sort(key=lambda item: item[0], reverse=True)
+            best = (scored[0][2], n_estimators, scored[0][0])
+            if len(scored) == 1 or n_estimators >= max_resources:
+                break
+            keep = max(1, math.ceil(len(scored) / factor))
+            tuner.drop_models({cid for _, cid, _ in scored[keep:]})
+            survivors = [(cid, params) for _, cid, params in scored[:keep]]
+            n_estimators = min(max_resources, n_estimators * factor)
+    except BudgetExceeded:
+        if tuner.verbose:
+            print("Time budget exhausted; keeping the best candidate evaluated so far")
+        if best is None:
+            best = best_from_report(tuner.report)
+    tuner.fold_models.clear()
+    return best
+
+
+def exhaustive(tuner, candidates):
+    """Evaluate every (params, n_estimators) candidate at its full size."""
+    try:
+        for cid, params in enumerate(candidates):
+            params = dict(params)
+            n_estimators = params.pop('n_estimators')
+            tuner.evaluate(cid, params, n_estimators)
+    except BudgetExceeded:
+        if tuner.verbose:
+            print("Time budget exhausted; keeping the best candidate evaluated so far")
+    return best_from_report(tuner.report)
+
+
+def best_from_report(report):
+    if not report:
+        raise RuntimeError("No candidate could be evaluated within the time budget")
+    # Prefer candidates evaluated with more trees, then the higher score
+    entry = max(report, key=lambda e: (e["params"]["n_estimators"], e["mean_r2"]))
+    params = dict(entry["params"])
+    return params, params.pop("n_estimators"), entry["mean_r2"]
+
+
+def tune(X, y, mode="halving", n_candidates=81, cv=5, budget_seconds=None, cache_dir=None,
+         min_resources=50, max_resources=500, factor=3, n_jobs=-1, random_state=42, verbose=True,
+         refit=True):
+    """
+    Search forest hyperparameters and refit the best candidate on all of
+    X, y.
+
+    Returns:
+        (best_model or None if refit is False, result dict with best
+        params, CV score, totals and the per-candidate report)
+    """
+    tuner = Tuner(X, y, cv=cv, budget_seconds=budget_seconds, cache_dir=cache_dir,
+                  n_jobs=n_jobs, random_state=random_state, verbose=verbose)
+
+    if mode == "halving":
+        candidates = list(ParameterSampler(PARAM_SPACE, n_iter=n_candidates, random_state=random_state))
+        best_params, n_estimators, best_score = successive_halving(
+            tuner, candidates, min_resources, max_resources, factor)
+    elif mode == "random":
+        space = dict(PARAM_SPACE, n_estimators=GRID_N_ESTIMATORS)
+        candidates = list(ParameterSampler(space, n_iter=n_candidates, random_state=random_state))
+        best_params, n_estimators, best_score = exhaustive(tuner, candidates)
+    elif mode == "grid":
+        candidates = list(ParameterGrid(dict(PARAM_SPACE, n_estimators=GRID_N_ESTIMATORS)))
+        best_params, n_estimators, best_score = exhaustive(tuner, candidates)
+    else:
+        raise ValueError(f"Unknown tuning mode: {mode}")
+
+    search_wall = tuner.elapsed()
+    search_cpu = sum(entry["cpu_seconds"] for entry in tuner.report)
+
+    best_model = None
+    refit_start = time.perf_counter()
+    if refit:
+        best_model = RandomForestRegressor(random_state=random_state, n_jobs=n_jobs,
+                                           n_estimators=n_estimators, **best_params)
+        best_model.fit(tuner.X, tuner.y)
+    refit_seconds = time.perf_counter() - refit_start
+
+    result = {
+        "mode": mode,
+        "best_params": dict(best_params, n_estimators=n_estimators),
+        "best_cv_r2": best_score,
+        "candidates_evaluated": len(tuner.report),
+        "fits": tuner.fits,
+        "cached_fits": tuner.cached_fits,
+        "search_wall_seconds": search_wall,
+        "search_cpu_seconds": search_cpu,
+        "refit_seconds": refit_seconds,
+        "report": tuner.report
+    }
+    if verbose:
+        print(f"\nTuning ({mode}) finished: {len(tuner.report)} evaluations, {tuner.fits} fold fits "
+              f"({tuner.cached_fits} cached), {search_wall:.1f}s wall, {search_cpu:.1f}s CPU")
+        print(f"Best CV R2 {best_score:.4f} with {result['best_params']}")
+    return best_model, result
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import pandas as pd
+
+    parser = argparse.ArgumentParser(description="Tune the health score model on a training dataset")
+    parser.add_argument("train", help="training dataset CSV (e.g. data/train_dataset.csv)")
+    parser.add_argument("--mode", choices=["halving", "random", "grid"], default="halving")
+    parser.add_argument("--candidates", type=int, default=81, help="sampled candidates (halving/random)")
+    parser.add_argument("--budget", type=float, default=None, help="wall-clock budget in seconds")
+    parser.add_argument("--cache-dir", default=None, help="directory for cached fold scores")
+    parser.add_argument("--report", default=None, help="write the per-candidate report to this JSON file")
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+    from features import FeatureSpec
+
+    train_df = pd.read_csv(args.train)
+    _, result = tune(FeatureSpec().from_columns(train_df), train_df["health_score"], mode=args.mode,
+                     n_candidates=args.candidates, budget_seconds=args.budget, cache_dir=args.cache_dir)
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(result, f, indent=2)
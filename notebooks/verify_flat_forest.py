@@ -0,0 +1,45 @@
+import os
+import sys
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(root_dir, 'backend'))
+from forest import FlatForest
+
+# Load the model, feature names and the held-out test set
+model = joblib.load(os.path.join(root_dir, 'model/health_score_model.pkl'))
+features = joblib.load(os.path.join(root_dir, 'model/feature_names.pkl'))
+test_df = pd.read_csv(os.path.join(root_dir, 'data/test_dataset.csv'))
+X_test = test_df[features].to_numpy(dtype=np.float64)
+
+flat = FlatForest.from_sklearn(model)
+print(f"Exported {flat.n_estimators} trees, {len(flat.value)} nodes, max depth {flat.max_depth}")
+
+# Predictions must match bit for bit
+sklearn_pred = model.predict(X_test)
+flat_pred = flat.predict(X_test)
+print(f"Identical predictions on {len(X_test)} rows: {np.array_equal(sklearn_pred, flat_pred)}")
+print(f"Max absolute difference: {np.abs(sklearn_pred - flat_pred).max()}")
+
+row_pred = np.array([flat.predict(X_test[i:i + 1])[0] for i in range(len(X_test))])
+print(f"Identical single-row predictions: {np.array_equal(sklearn_pred, row_pred)}")
+
+
+def time_call(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+# Compare latency for a single row and for the whole test set
+single_row = X_test[:1]
+print("\nLatency (ms):")
+print(f"sklearn single row: {time_call(lambda: model.predict(single_row), 200):.3f}")
+print(f"flat single row:    {time_call(lambda: flat.predict(single_row), 200):.3f}")
+print(f"sklearn {len(X_test)} rows:  {time_call(lambda: model.predict(X_test), 20):.3f}")
+print(f"flat {len(X_test)} rows:     {time_call(lambda: flat.predict(X_test), 20):.3f}")